@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Ritmo de consulta adaptativo dos monitores.
+
+Em vez de um intervalo fixo (o INTERVALO_SEGUNDOS de cada fonte), o
+próximo ciclo sai de:
+
+    base x calendário x recuo, limitado a [INTERVALO_MIN, INTERVALO_MAX], ± JITTER
+
+- calendário: JANELAS com fator < 1 (sessões do Plenário: consulta mais
+  amiúde); fora do expediente (noite, fim de semana) vale FATOR_FORA.
+- recuo: cada ciclo sem novidade dobra o intervalo (até 2^MAX_DOBRAS; numa
+  janela, até 2^MAX_DOBRAS_JANELA — na sessão o ritmo fica sempre alto);
+  um ciclo com novidade zera o recuo e os CICLOS_RAPIDOS seguintes usam
+  FATOR_APOS_MUDANCA (costuma vir mais coisa logo em seguida).
+- jitter: as fontes não acordam juntas.
+- início de janela: o intervalo nunca passa do início da próxima janela
+  (a 1ª consulta da sessão sai às 08:30, não até uma hora depois).
+
+Uso:
+    ritmo = agenda.Ritmo(INTERVALO_SEGUNDOS)
+    while True:
+        novos = executar_ciclo()
+        sleep(ritmo.proximo(novos))
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Dias: 0 = segunda ... 6 = domingo. "datas" (AAAA-MM-DD) para sessões
+# extraordinárias. Ajuste ao calendário da Casa.
+JANELAS: List[Dict] = [
+    {"nome": "sessao_plenario", "dias": [1, 2, 3], "inicio": "08:30", "fim": "14:00", "fator": 0.25},
+    # {"nome": "extraordinaria", "datas": ["2025-12-16"], "inicio": "08:00", "fim": "20:00", "fator": 0.25},
+]
+EXPEDIENTE = {"dias": [0, 1, 2, 3, 4], "inicio": "07:30", "fim": "19:00"}
+FATOR_FORA = 3.0           # noite e fim de semana
+MAX_DOBRAS = 2             # recuo máximo: 4x
+MAX_DOBRAS_JANELA = 1      # dentro de uma janela: 2x
+FATOR_APOS_MUDANCA = 0.5
+CICLOS_RAPIDOS = 2
+INTERVALO_MIN = 60
+INTERVALO_MAX = 3600
+JITTER = 0.1               # ±10%
+
+
+def _dentro(janela: Dict, quando: datetime) -> bool:
+    if "datas" in janela and quando.strftime("%Y-%m-%d") not in janela["datas"]:
+        return False
+    if "dias" in janela and quando.weekday() not in janela["dias"]:
+        return False
+    return janela["inicio"] <= quando.strftime("%H:%M") < janela["fim"]
+
+
+def proximo_inicio(quando: datetime, janelas: Optional[List[Dict]] = None) -> Optional[datetime]:
+    """Início da próxima janela depois de `quando` (hoje ou amanhã), ou None."""
+    inicios = []
+    for dia in (quando.date(), quando.date() + timedelta(days=1)):
+        for j in (JANELAS if janelas is None else janelas):
+            inicio = datetime.combine(dia, datetime.strptime(j["inicio"], "%H:%M").time())
+            if inicio > quando and _dentro(j, inicio):
+                inicios.append(inicio)
+    return min(inicios, default=None)
+
+
+def fator_calendario(quando: Optional[datetime] = None, janelas: Optional[List[Dict]] = None) -> float:
+    """Menor fator entre as janelas em que `quando` cai; fora do expediente, FATOR_FORA."""
+    return _calendario(quando, janelas)[0]
+
+
+def _calendario(quando: Optional[datetime], janelas: Optional[List[Dict]]):
+    """(fator, está numa janela?)"""
+    quando = quando or datetime.now()
+    fatores = [j["fator"] for j in (JANELAS if janelas is None else janelas) if _dentro(j, quando)]
+    if fatores:
+        return min(fatores), True
+    return (1.0 if _dentro(EXPEDIENTE, quando) else FATOR_FORA), False
+
+
+class Ritmo:
+    """Estado do ritmo de uma fonte (recuo e ciclos rápidos)."""
+
+    def __init__(self, base: float, janelas: Optional[List[Dict]] = None, jitter: float = JITTER,
+                 fixo: bool = False):
+        self.base = base
+        self.janelas = janelas
+        self.jitter = jitter
+        self.fixo = fixo      # só o jitter, como antes
+        self.sem_novidade = 0
+        self.rapidos = 0
+
+    def proximo(self, novos: Optional[int], quando: Optional[datetime] = None) -> float:
+        """Segundos até o próximo ciclo, dado o resultado (novos) do que acabou."""
+        quando = quando or datetime.now()
+        if self.fixo:
+            return self.base * random.uniform(1 - self.jitter, 1 + self.jitter)
+        if novos:
+            self.sem_novidade = 0
+            self.rapidos = CICLOS_RAPIDOS
+        else:
+            self.sem_novidade += 1
+        fator, na_janela = _calendario(quando, self.janelas)
+        if self.rapidos:
+            self.rapidos -= 1
+            fator *= FATOR_APOS_MUDANCA
+        else:
+            fator *= 2 ** min(max(self.sem_novidade - 1, 0), MAX_DOBRAS_JANELA if na_janela else MAX_DOBRAS)
+        intervalo = min(max(self.base * fator, INTERVALO_MIN), INTERVALO_MAX)
+        intervalo *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        inicio = None if na_janela else proximo_inicio(quando, self.janelas)
+        if inicio is not None:
+            # acorda no início da janela (+ um pouco de jitter), não depois
+            ate_inicio = (inicio - quando).total_seconds() + random.uniform(0, self.jitter * INTERVALO_MIN)
+            intervalo = min(intervalo, ate_inicio)
+        return intervalo
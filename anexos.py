@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Anexos (PDF) dos monitores: sondagem de URLs candidatas e download.
+
+- primeiro_pdf(urls): sonda as candidatas em paralelo (HEAD, ou GET só do
+  1º byte quando o servidor não aceita HEAD) num pool limitado ao número de
+  conexões por host do http_cliente; a primeira que responder PDF vence e
+  as que ainda não começaram são canceladas.
+- baixar_stream(url, destino): baixa só a vencedora, em streaming, pelo
+  cache de PDFs compartilhado (cache_pdf.py) — se já estiver lá, nem vai à rede.
+- candidatos_pdf(ano, numero): palpites de URL em tramit{ano}/, ordenados
+  pelos modelos (prefixo, zeros à esquerda, sufixo _yy) que mais acertaram
+  naquele ano/tipo; os acertos ficam gravados na pasta de estado.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import cache_pdf
+import estado
+import http_cliente
+import metricas
+
+MAX_SONDAS = http_cliente.MAX_CONEXOES_POR_HOST
+TIMEOUT_SONDA = (5, 15)       # (conexão, leitura) — sonda não baixa corpo
+
+URL_TRAMIT = "https://www2.al.ce.gov.br/legislativo/tramit{ano}/"
+PREFIXOS_PDF = ["", "pl", "plc", "pdl", "msg", "au"]
+
+_con = None
+_lock = threading.Lock()
+_modelo_por_url: Dict[str, Tuple[str, str, str]] = {}   # url -> (ano, tipo, modelo)
+
+
+def _eh_pdf(resp: requests.Response) -> bool:
+    ctype = (resp.headers.get("Content-Type") or "").lower()
+    return resp.status_code in (200, 206) and "pdf" in ctype
+
+
+def sondar_pdf(url: str, headers: Optional[dict] = None) -> bool:
+    """True se a URL existe e responde application/pdf (sem baixar o corpo)."""
+    try:
+        r = http_cliente.head(url, headers=headers, timeout=TIMEOUT_SONDA)
+        if r.status_code not in (405, 501):
+            return _eh_pdf(r)
+        h = dict(headers or {})
+        h["Range"] = "bytes=0-0"
+        with http_cliente.get(url, headers=h, stream=True, timeout=TIMEOUT_SONDA) as r:
+            return _eh_pdf(r)
+    except requests.RequestException:
+        return False
+
+
+@metricas.etapa("anexos", "sonda")
+def primeiro_pdf(urls: List[str], headers: Optional[dict] = None,
+                 max_workers: int = MAX_SONDAS) -> Optional[str]:
+    """Primeira URL (por ordem de resposta) que devolve um PDF, ou None."""
+    if not urls:
+        return None
+    achou = threading.Event()
+
+    def sonda(url: str) -> Optional[str]:
+        if achou.is_set():
+            return None
+        print("⇣ Sondando:", url)
+        if sondar_pdf(url, headers):
+            achou.set()
+            metricas.contar("sondas", resultado="pdf")
+            return url
+        metricas.contar("sondas", resultado="nao_pdf")
+        return None
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    try:
+        futuros = [pool.submit(sonda, u) for u in urls]
+        for fut in as_completed(futuros):
+            url = fut.result()
+            if url:
+                return url
+        return None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def baixar_stream(url: str, destino: str, headers: Optional[dict] = None) -> Optional[str]:
+    """Baixa em streaming para destino (via cache); None se não veio PDF ou veio vazio."""
+    return cache_pdf.baixar(url, destino, headers)
+
+
+# =========== Palpites de URL com aprendizado ===========
+def _db():
+    global _con
+    if _con is None:
+        con = estado.conectar("anexos.sqlite3")
+        con.execute("""CREATE TABLE IF NOT EXISTS padroes_pdf (
+                           ano TEXT, tipo TEXT, modelo TEXT, acertos INTEGER, ultimo TEXT,
+                           PRIMARY KEY (ano, tipo, modelo))""")
+        con.commit()
+        _con = con
+    return _con
+
+
+def _candidatos_fixos(ano: str, numero: str) -> List[Tuple[str, str]]:
+    """(modelo, url) na ordem fixa antiga. modelo = 'prefixo|largura|yy'."""
+    ano = str(ano)
+    yy = ano[-2:]
+    n = str(numero or "").strip().replace(".", "")
+    base = URL_TRAMIT.format(ano=ano)
+    nums = [(0, n)] + [(w, n.zfill(w)) for w in (3, 4, 5)]
+    saida, vistos = [], set()
+    for largura, num in nums:
+        opcoes = [("", largura, "", f"{num}.pdf"), ("", largura, "yy", f"{num}_{yy}.pdf")]
+        opcoes += [(p, largura, "yy", f"{p}{num}_{yy}.pdf") for p in PREFIXOS_PDF[1:]]
+        for prefixo, w, suf, arq in opcoes:
+            url = base + arq
+            if url not in vistos:
+                vistos.add(url)
+                saida.append((f"{prefixo}|{w}|{suf}", url))
+    return saida
+
+
+def acertos_por_modelo(ano: str, tipo: str = "mensagem") -> Dict[str, Tuple[int, int]]:
+    """modelo -> (acertos no ano, acertos em todos os anos) para o tipo."""
+    with _lock:
+        linhas = _db().execute("SELECT ano, modelo, acertos FROM padroes_pdf WHERE tipo = ?",
+                               (tipo,)).fetchall()
+    saida: Dict[str, Tuple[int, int]] = {}
+    for a, modelo, n in linhas:
+        no_ano, total = saida.get(modelo, (0, 0))
+        saida[modelo] = (no_ano + (n if a == str(ano) else 0), total + n)
+    return saida
+
+
+def candidatos_pdf(ano: str, numero: str, tipo: str = "mensagem") -> List[str]:
+    """URLs candidatas, as dos modelos que mais acertaram primeiro."""
+    fixos = _candidatos_fixos(ano, numero)
+    placar = acertos_por_modelo(ano, tipo)
+    ordem = sorted(range(len(fixos)),
+                   key=lambda i: (-placar.get(fixos[i][0], (0, 0))[0],
+                                  -placar.get(fixos[i][0], (0, 0))[1], i))
+    urls = []
+    for i in ordem:
+        modelo, url = fixos[i]
+        _modelo_por_url[url] = (str(ano), tipo, modelo)
+        urls.append(url)
+    return urls
+
+
+def palpite_aprendido(url: str) -> bool:
+    """True se a URL vem de um modelo que já acertou antes."""
+    info = _modelo_por_url.get(url)
+    if not info:
+        return False
+    placar = acertos_por_modelo(info[0], info[1]).get(info[2], (0, 0))
+    return placar[1] > 0
+
+
+def registrar_acerto(url: str):
+    """Conta um acerto para o modelo que gerou a URL (se veio de candidatos_pdf)."""
+    info = _modelo_por_url.get(url)
+    if not info:
+        return
+    ano, tipo, modelo = info
+    with _lock:
+        con = _db()
+        con.execute("""INSERT INTO padroes_pdf (ano, tipo, modelo, acertos, ultimo) VALUES (?, ?, ?, 1, ?)
+                       ON CONFLICT (ano, tipo, modelo)
+                       DO UPDATE SET acertos = acertos + 1, ultimo = excluded.ultimo""",
+                    (ano, tipo, modelo, datetime.now().isoformat(timespec="seconds")))
+        con.commit()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Simulação de uma semana de consultas: intervalo fixo x ritmo adaptativo (agenda.py).
+
+Novidades aparecem no site em horários sorteados — a maioria durante as
+sessões do Plenário (agenda.JANELAS), algumas no resto do expediente e
+poucas fora dele. Para cada política conta quantos ciclos (≈ requisições
+e bateria) foram feitos na semana e quanto tempo cada novidade esperou até
+o ciclo seguinte (atraso do alerta).
+
+Antes da simulação confere que o ritmo acorda no início de cada janela
+(ex.: recuo máximo às 07:50 ou às 08:29 de uma terça -> acorda às 08:30).
+
+Uso (da raiz do repositório):
+  python bench/bench_agenda.py                     # base 600 s (urgência)
+  python bench/bench_agenda.py --base 1800 -n 40   # 40 novidades por semana
+"""
+
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+from statistics import mean, median
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(AQUI))
+
+import agenda   # noqa: E402
+
+SEGUNDA = datetime(2025, 10, 13)      # uma semana qualquer, começando na segunda
+SEMANA = 7 * 24 * 3600
+
+
+def sortear_novidades(n: int, rnd: random.Random) -> list:
+    """Segundos desde SEGUNDA: 70% nas sessões, 20% no expediente, 10% em qualquer hora."""
+    saida = []
+    while len(saida) < n:
+        t = rnd.uniform(0, SEMANA)
+        quando = SEGUNDA + timedelta(seconds=t)
+        sorteio = rnd.random()
+        na_sessao = any(agenda._dentro(j, quando) for j in agenda.JANELAS)
+        no_expediente = agenda._dentro(agenda.EXPEDIENTE, quando)
+        if (sorteio < 0.7 and na_sessao) or (0.7 <= sorteio < 0.9 and no_expediente and not na_sessao) \
+                or sorteio >= 0.9:
+            saida.append(t)
+    return sorted(saida)
+
+
+def simular(ritmo: agenda.Ritmo, novidades: list) -> dict:
+    t, ciclos, atrasos, i = 0.0, 0, [], 0
+    while t < SEMANA:
+        ciclos += 1
+        novos = 0
+        while i < len(novidades) and novidades[i] <= t:
+            atrasos.append(t - novidades[i])
+            novos += 1
+            i += 1
+        t += ritmo.proximo(novos, SEGUNDA + timedelta(seconds=t))
+    return {"ciclos": ciclos, "atrasos": atrasos}
+
+
+def conferir_inicio_janela(base: float):
+    """Com recuo máximo, quem dorme antes de uma janela acorda no início dela."""
+    for j in agenda.JANELAS:
+        inicio = agenda.proximo_inicio(SEGUNDA, [j])
+        if inicio is None:
+            continue
+        for antes in (40 * 60, 60, 1):
+            quando = inicio - timedelta(seconds=antes)
+            ritmo = agenda.Ritmo(base, janelas=[j])
+            ritmo.sem_novidade = agenda.MAX_DOBRAS + 1
+            acorda = quando + timedelta(seconds=ritmo.proximo(0, quando))
+            folga = agenda.JITTER * agenda.INTERVALO_MIN
+            assert acorda <= inicio + timedelta(seconds=folga), \
+                f"{j['nome']}: dormindo às {quando:%a %H:%M:%S}, acordou às {acorda:%H:%M:%S} (início {inicio:%H:%M})"
+        print(f"✔️ {j['nome']}: acorda até {inicio:%H:%M}+{folga:.0f}s mesmo com recuo máximo")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base", type=float, default=600, help="INTERVALO_SEGUNDOS da fonte")
+    ap.add_argument("-n", type=int, default=30, help="novidades na semana")
+    ap.add_argument("--semente", type=int, default=1)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.semente)
+    random.seed(args.semente)
+    conferir_inicio_janela(args.base)
+    novidades = sortear_novidades(args.n, rnd)
+    sessao = [t for t in novidades
+              if any(agenda._dentro(j, SEGUNDA + timedelta(seconds=t)) for j in agenda.JANELAS)]
+
+    print(f"base {args.base:.0f}s, {len(novidades)} novidades ({len(sessao)} em sessão)")
+    print(f"{'política':<12}{'ciclos':>8}{'atraso méd':>12}{'mediana':>10}{'máx':>8}{'sessão méd':>12}  (min)")
+    for nome, ritmo in (("fixo", agenda.Ritmo(args.base, fixo=True)), ("adaptativo", agenda.Ritmo(args.base))):
+        r = simular(ritmo, novidades)
+        atrasos = r["atrasos"]
+        em_sessao = [a for a, t in zip(atrasos, novidades) if t in sessao]
+        print(f"{nome:<12}{r['ciclos']:>8}{mean(atrasos) / 60:>12.1f}{median(atrasos) / 60:>10.1f}"
+              f"{max(atrasos) / 60:>8.1f}{(mean(em_sessao) / 60 if em_sessao else 0):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
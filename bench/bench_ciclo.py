@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark offline de ponta a ponta dos monitores (sem tocar no site real).
+
+Cada fonte roda num subprocesso próprio, com estado zerado numa pasta
+temporária, contra o site falso (bench/stub_alece.py servindo as fixtures
+de bench/fixtures/) e um sender falso no protocolo do sender_daemon.js.
+São medidos ciclos seguidos:
+- frio:     registro vazio, tudo é novo (busca, parse, download e envio de tudo)
+- quente:   nada mudou (GET condicional / dedupe)
+- novidade: poucos itens novos no topo das listas (fixtures/novidade/), o
+            caso comum do dia a dia
+
+Relatório por ciclo: tempo total, alertas, requisições, tempo por etapa
+(busca, parse, filtro, dedupe, download, envio — tempo exclusivo, somado
+entre threads; com a varredura antecipada e a esteira de download/envio
+a soma pode passar do total) e pico de RSS do processo. O total inclui
+esperar a esteira (fila.py) esvaziar.
+
+Uso (da raiz do repositório):
+  python bench/bench_ciclo.py                        # urgencia, expediente, avulso
+  python bench/bench_ciclo.py urgencia -r 5          # mediana de 5 rodadas
+  python bench/bench_ciclo.py --latencia 80 --latencia-envio 500
+  python bench/bench_ciclo.py --agrupar 5            # modo resumo (AGRUPAR_ENVIOS = 5 s)
+  python bench/bench_ciclo.py --salvar base.json     # guarda a linha de base
+  python bench/bench_ciclo.py --comparar base.json   # compara com ela
+
+As pausas dos monitores (sleep entre envios) e o rclone (sincronia.py) não
+são executados: só contados/cronometrados na etapa "sync"; os uploads em
+segundo plano são forçados no fim do ciclo.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+import functools
+import importlib
+import contextlib
+import subprocess
+from collections import Counter, defaultdict
+from datetime import datetime
+from statistics import median
+from time import perf_counter
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(AQUI)
+PASTA_FIXTURES = os.path.join(AQUI, "fixtures")
+
+ETAPAS = ["busca", "parse", "filtro", "dedupe", "download", "envio"]
+FONTES = {
+    "urgencia": {
+        "modulo": "monitor_urgencia_androi",
+        "etapas": {"baixar_pagina": "busca", "parse_linhas": "parse",
+                   "verificar_data_menor": "filtro",
+                   "extrair_numeros_proposicao": "filtro",
+                   "carregar_existentes": "dedupe", "salvar_novo": "dedupe",
+                   "baixar_via_plenario": "download", "chamar_sender": "envio"},
+    },
+    "expediente": {
+        "modulo": "monitor_expediente_android",
+        "etapas": {"baixar_pagina": "busca", "coletar_mensagens": "parse",
+                   "normalize": "filtro",
+                   "enviados_carregar": "dedupe", "enviados_salvar": "dedupe",
+                   "download_pdf": "download", "enviar_mensagem": "envio"},
+    },
+    "avulso": {
+        "modulo": "monitor_avulso_android",
+        "etapas": {"baixar_pagina": "busca", "coletar_mensagens": "parse",
+                   "enviados_carregar": "dedupe", "enviados_salvar": "dedupe",
+                   "download_pdf": "download", "enviar_mensagem": "envio"},
+    },
+}
+
+# =========== Cronômetro por etapa (tempo exclusivo) ===========
+_tempos = defaultdict(float)
+_chamadas = Counter()
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def medido(etapa: str, funcao):
+    @functools.wraps(funcao)
+    def envolvida(*args, **kw):
+        pilha = getattr(_local, "pilha", None)
+        if pilha is None:
+            pilha = _local.pilha = []
+        pilha.append(0.0)          # tempo gasto nas etapas internas
+        t0 = perf_counter()
+        try:
+            return funcao(*args, **kw)
+        finally:
+            dt = perf_counter() - t0
+            internas = pilha.pop()
+            if pilha:
+                pilha[-1] += dt
+            with _lock:
+                _tempos[etapa] += dt - internas
+                _chamadas[etapa] += 1
+    return envolvida
+
+
+def _data_fixa(hoje: str):
+    """datetime com today()/now() congelados (as fixtures têm datas fixas)."""
+    fixa = datetime.strptime(hoje, "%d/%m/%Y")
+
+    class DataFixa(datetime):
+        @classmethod
+        def today(cls):
+            return fixa
+
+        @classmethod
+        def now(cls, tz=None):
+            return fixa
+
+    return DataFixa
+
+
+def _hoje_das_fixtures(urg) -> str:
+    with open(os.path.join(PASTA_FIXTURES, "consultas_1.html"), encoding="utf-8", errors="replace") as f:
+        datas = [l["data"] for l in urg.parse_linhas(f.read())]
+    validas = []
+    for d in datas:
+        try:
+            validas.append(datetime.strptime(d[:10], "%d/%m/%Y"))
+        except ValueError:
+            pass
+    return max(validas).strftime("%d/%m/%Y") if validas else datetime.today().strftime("%d/%m/%Y")
+
+
+# =========== Uma fonte (subprocesso) ===========
+def rodar_fonte(nome: str, latencia: float, latencia_envio: float, verboso: bool, agrupar: float = 0) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench_ciclo_")
+    os.chdir(tmp)  # os monitores criam pastas relativas ao serem importados
+    os.environ["MONITOR_AL_ESTADO"] = os.path.join(tmp, "estado")
+    sys.path.insert(0, AQUI)
+    sys.path.insert(0, RAIZ)
+
+    import stub_alece
+    import fila
+    import sincronia
+    import regras
+    import registro
+    import sender_servico
+
+    _, url_base = stub_alece.iniciar_site(PASTA_FIXTURES, latencia)
+    _, porta = stub_alece.iniciar_sender(latencia_envio)
+    sender_servico.PORTA = porta
+
+    cfg = FONTES[nome]
+    mod = importlib.import_module(cfg["modulo"])
+    stub_alece.redirecionar(mod, url_base)
+    sender_js = os.path.join(tmp, "sender_baileys.js")
+    open(sender_js, "w").close()
+    mod.SENDER_CANDIDATOS = [sender_js]
+    mod.ARQ_REGISTRO = os.path.join(tmp, "registro.sqlite3")
+    mod.ARQ_EXCEL = os.path.join(tmp, "registro.xlsx")
+    for pasta in ("PASTA_PDFS", "PASTA_ANEXO"):
+        if hasattr(mod, pasta):
+            setattr(mod, pasta, os.path.join(tmp, "pdfs"))
+            os.makedirs(getattr(mod, pasta), exist_ok=True)
+    mod.AGRUPAR_ENVIOS = agrupar
+    if nome == "urgencia":
+        mod.datetime = _data_fixa(_hoje_das_fixtures(mod))
+
+    pausas = []
+    if hasattr(mod, "sleep"):
+        mod.sleep = pausas.append
+    sincronia.rclone = medido("sync", lambda args: (0, "[]"))
+    for funcao, etapa in cfg["etapas"].items():
+        setattr(mod, funcao, medido(etapa, getattr(mod, funcao)))
+    regras.avaliar = medido("filtro", regras.avaliar)
+    for classe in (registro.RegistroSQLite, registro.RegistroLog):
+        classe.__contains__ = medido("dedupe", classe.__contains__)
+
+    ciclos = []
+    nomes = ["frio", "quente"]
+    if os.path.isdir(os.path.join(PASTA_FIXTURES, "novidade")):
+        nomes.append("novidade")
+    for ciclo in nomes:
+        stub_alece.variante = "novidade" if ciclo == "novidade" else ""
+        _tempos.clear()
+        _chamadas.clear()
+        stub_alece.zerar()
+        del pausas[:]
+        saida = contextlib.nullcontext() if verboso else contextlib.redirect_stdout(open(os.devnull, "w"))
+        t0 = perf_counter()
+        with saida:
+            novos = mod.executar_ciclo()
+            fila.aguardar_todas()   # download/envio terminam nas threads da esteira
+            sincronia.aguardar()
+        total = perf_counter() - t0
+        ciclos.append({
+            "ciclo": ciclo,
+            "total_ms": total * 1000,
+            "novos": novos,
+            "etapas_ms": {e: _tempos.get(e, 0.0) * 1000 for e in ETAPAS + ["sync"] if e in _tempos or e in ETAPAS},
+            "requisicoes": {" ".join(map(str, k)): v for k, v in sorted(stub_alece.contagem.items(), key=str)},
+            "pausas_s": sum(pausas),
+        })
+
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+    return {"fonte": nome, "ciclos": ciclos, "pico_rss_mb": rss_mb, "agrupar_s": agrupar,
+            "latencia_ms": latencia * 1000, "latencia_envio_ms": latencia_envio * 1000}
+
+
+# =========== Relatório ===========
+def _rodada(nome: str, args) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--fonte", nome,
+           "--latencia", str(args.latencia), "--latencia-envio", str(args.latencia_envio),
+           "--agrupar", str(args.agrupar)]
+    if args.verboso:
+        cmd.append("-v")
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"fonte {nome} falhou (código {proc.returncode})")
+    linhas = proc.stdout.strip().splitlines()
+    if args.verboso:
+        print("\n".join(linhas[:-1]))
+    return json.loads(linhas[-1])
+
+
+def imprimir(res: dict, base: dict = None):
+    print(f"\n== {res['fonte']} ==  (latência site {res['latencia_ms']:.0f} ms, "
+          f"envio {res['latencia_envio_ms']:.0f} ms, pico RSS {res['pico_rss_mb']:.1f} MB"
+          + (f", resumo {res['agrupar_s']:g} s" if res.get("agrupar_s") else "") + ")")
+    print(f"{'ciclo':<8}{'total ms':>10}{'novos':>7}{'reqs':>6}"
+          + "".join(f"{e:>10}" for e in ETAPAS) + (f"{'Δ base':>10}" if base else ""))
+    for c in res["ciclos"]:
+        reqs = sum(v for k, v in c["requisicoes"].items() if not k.startswith("sender"))
+        linha = (f"{c['ciclo']:<8}{c['total_ms']:>10.1f}{c['novos']:>7}{reqs:>6}"
+                 + "".join(f"{c['etapas_ms'].get(e, 0.0):>10.1f}" for e in ETAPAS))
+        if base:
+            ant = next((b for b in base["ciclos"] if b["ciclo"] == c["ciclo"]), None)
+            if ant and ant["total_ms"]:
+                linha += f"{(c['total_ms'] / ant['total_ms'] - 1) * 100:>+9.1f}%"
+        print(linha)
+    for c in res["ciclos"]:
+        detalhes = ", ".join(f"{k} ×{v}" for k, v in c["requisicoes"].items())
+        print(f"  {c['ciclo']}: {detalhes or 'nenhuma requisição'}"
+              + (f" | pausas puladas {c['pausas_s']:.0f}s" if c["pausas_s"] else ""))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("fontes", nargs="*", default=list(FONTES), help="fontes (padrão: todas)")
+    ap.add_argument("-r", "--rodadas", type=int, default=1, help="rodadas por fonte (usa a mediana)")
+    ap.add_argument("--latencia", type=float, default=50, help="ms por resposta do site falso")
+    ap.add_argument("--latencia-envio", type=float, default=200, help="ms por envio no sender falso")
+    ap.add_argument("--agrupar", type=float, default=0, help="s de janela do modo resumo (0 = desligado)")
+    ap.add_argument("--salvar", help="grava os resultados (JSON) como linha de base")
+    ap.add_argument("--comparar", help="compara com uma linha de base gravada")
+    ap.add_argument("-v", "--verboso", action="store_true", help="mostra a saída dos monitores")
+    ap.add_argument("--fonte", help=argparse.SUPPRESS)   # uso interno (subprocesso)
+    args = ap.parse_args()
+
+    if args.fonte:
+        res = rodar_fonte(args.fonte, args.latencia / 1000, args.latencia_envio / 1000, args.verboso, args.agrupar)
+        print(json.dumps(res, ensure_ascii=False))
+        return
+
+    if not os.path.isfile(os.path.join(PASTA_FIXTURES, "consultas_1.html")):
+        sys.exit("Sem fixtures: rode antes  python bench/gerar_fixtures.py")
+    base = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = {r["fonte"]: r for r in json.load(f)}
+
+    resultados = []
+    for nome in args.fontes:
+        if nome not in FONTES:
+            sys.exit(f"Fonte desconhecida: {nome} (opções: {', '.join(FONTES)})")
+        rodadas = [_rodada(nome, args) for _ in range(max(1, args.rodadas))]
+        rodadas.sort(key=lambda r: r["ciclos"][0]["total_ms"])
+        res = rodadas[len(rodadas) // 2]
+        res["rodadas_frio_ms"] = [r["ciclos"][0]["total_ms"] for r in rodadas]
+        if len(rodadas) > 1:
+            res["mediana_frio_ms"] = median(res["rodadas_frio_ms"])
+        imprimir(res, base.get(nome))
+        resultados.append(res)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print("\n💾 Linha de base gravada em", args.salvar)
+
+
+if __name__ == "__main__":
+    main()
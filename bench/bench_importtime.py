@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Partida a frio dos monitores: quanto custa importar cada ponto de entrada
+(estilo `python -X importtime`) e quanto falta até o 1º ciclo poder rodar.
+
+Cada alvo roda num processo novo, com `-X importtime` e pasta de estado
+temporária. Relatório por alvo: tempo do processo inteiro (o que o Termux
+paga a cada reinício), tempo até "pronto" (imports + montagem das fontes,
+como no monitor_al.main), e quais dependências pesadas já foram carregadas
+(e a que custo) nesse ponto — o ideal é que bs4/lxml/openpyxl/http.server
+só apareçam quando forem usados de fato.
+
+Uso (da raiz do repositório):
+  python bench/bench_importtime.py                   # todos os alvos, mediana de 5
+  python bench/bench_importtime.py -n 10 --top 15    # + 15 módulos mais caros por alvo
+  python bench/bench_importtime.py --alvo monitor_al --cru importtime.txt
+"""
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+from time import perf_counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# nome -> código executado depois de `import time; t0 = time.perf_counter()`
+ALVOS = {
+    "monitor_al": "import monitor_al\n"
+                  "fontes = [monitor_al.carregar_fonte(c) for c in monitor_al.FONTES]",
+    "urgencia": "import monitor_urgencia_androi as m\nm.esteira()",
+    "expediente": "import monitor_expediente_android as m\nm.esteira()",
+    "avulso": "import monitor_avulso_android as m\nm.esteira()",
+    "registro": "import registro",
+    "indice_pdf": "import indice_pdf",
+}
+PESADOS = ("requests", "urllib3", "bs4", "lxml", "selectolax", "openpyxl", "http.server", "asyncio", "pypdf")
+RX_LINHA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def rodar(codigo: str, estado: str):
+    """(ms do processo, ms até pronto, {módulo: (self_us, cumulativo_us, profundidade)}, saída crua)."""
+    script = ("import sys, time\nt0 = time.perf_counter()\nsys.path.insert(0, %r)\n%s\n"
+              "print('PRONTO', (time.perf_counter() - t0) * 1000)\n" % (RAIZ, codigo))
+    env = dict(os.environ, MONITOR_AL_ESTADO=estado)
+    t0 = perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=estado, env=env,
+                          capture_output=True, text=True, timeout=120)
+    total = (perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    pronto = float(next(l.split()[1] for l in proc.stdout.splitlines() if l.startswith("PRONTO")))
+    modulos = {}
+    for linha in proc.stderr.splitlines():
+        m = RX_LINHA.match(linha)
+        if m:
+            modulos[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return total, pronto, modulos, proc.stderr
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--alvo", action="append", choices=sorted(ALVOS), help="(repetível) padrão: todos")
+    ap.add_argument("-n", type=int, default=5, help="execuções por alvo (mediana)")
+    ap.add_argument("--top", type=int, default=0, help="listar os N módulos de maior tempo próprio")
+    ap.add_argument("--cru", help="grava a saída -X importtime da última execução de cada alvo aqui")
+    args = ap.parse_args()
+
+    print(f"{'alvo':<12}{'processo ms':>12}{'pronto ms':>11}{'módulos':>9}  pesados já carregados (cumulativo ms)")
+    cru = []
+    for nome in args.alvo or list(ALVOS):
+        medidas = []
+        for _ in range(max(1, args.n)):
+            with tempfile.TemporaryDirectory(prefix="bench_importtime_") as estado:
+                medidas.append(rodar(ALVOS[nome], estado))
+        total = median(m[0] for m in medidas)
+        pronto = median(m[1] for m in medidas)
+        modulos = medidas[-1][2]
+        pesados = [f"{p} {modulos[p][1] / 1000:.0f}" for p in PESADOS if p in modulos]
+        print(f"{nome:<12}{total:>12.0f}{pronto:>11.0f}{len(modulos):>9}  {', '.join(pesados) or '-'}")
+        if args.top:
+            for mod, (proprio, cumul, _) in sorted(modulos.items(), key=lambda kv: -kv[1][0])[:args.top]:
+                print(f"{'':<14}{proprio / 1000:>7.1f} ms próprio {cumul / 1000:>7.1f} ms cumul.  {mod}")
+        cru.append(f"### {nome}\n{medidas[-1][3]}")
+    if args.cru:
+        with open(args.cru, "w", encoding="utf-8") as f:
+            f.write("\n".join(cru))
+        print("Saída crua em", args.cru)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da normalização usada nos filtros de palavra-chave.
+
+Compara, sobre os textos de links/linhas das fixtures:
+- antigo:      NFD + laço Python por caractere (unicodedata.category) + lower()
+- dobrar:      normalizacao.dobrar sem memo (1ª vez que o texto aparece)
+- dobrar+memo: o mesmo texto de novo (ciclos seguidos, páginas repetidas)
+- palavras:    contem_alguma com 5 palavras (um regex) vs. 5 buscas no texto dobrado
+
+Uso (da raiz do repositório):
+  python bench/bench_normalizacao.py [-n 20]
+"""
+
+import os
+import sys
+import glob
+import argparse
+from time import perf_counter
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(AQUI))
+
+import parser_html    # noqa: E402
+import normalizacao   # noqa: E402
+
+PALAVRAS = ["urgência", "mensagem", "leitura", "projeto de lei", "veto"]
+
+
+def textos_das_fixtures():
+    textos = []
+    for arq in sorted(glob.glob(os.path.join(AQUI, "fixtures", "*.html"))):
+        with open(arq, encoding="utf-8", errors="replace") as f:
+            soup = parser_html.soup(f.read())
+        textos += [a.get_text(" ", strip=True) for a in soup.find_all("a")]
+        textos += [td.get_text(" ", strip=True) for td in soup.find_all("td")]
+    return [t for t in textos if t]
+
+
+def medir(funcao, textos, n: int) -> float:
+    t0 = perf_counter()
+    for _ in range(n):
+        for t in textos:
+            funcao(t)
+    return (perf_counter() - t0) / (n * len(textos)) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=20, help="repetições")
+    args = ap.parse_args()
+
+    textos = textos_das_fixtures()
+    if not textos:
+        sys.exit("Sem fixtures: rode antes  python bench/gerar_fixtures.py")
+    sem_memo = normalizacao.dobrar.__wrapped__
+    dobradas = [normalizacao.dobrar(p) for p in PALAVRAS]
+
+    def varias_buscas(t):
+        d = sem_memo(t)
+        return any(p in d for p in dobradas)
+
+    def um_regex(t):
+        rx, _, _ = normalizacao._compilar(tuple(PALAVRAS))
+        return rx.search(sem_memo(t)) is not None
+
+    print(f"{len(textos)} textos, n={args.n} (µs por texto)")
+    print(f"{'antigo':<14}{medir(normalizacao._dobrar_lento, textos, args.n):>8.2f}")
+    print(f"{'dobrar':<14}{medir(sem_memo, textos, args.n):>8.2f}")
+    for t in textos:
+        normalizacao.dobrar(t)
+    print(f"{'dobrar+memo':<14}{medir(normalizacao.dobrar, textos, args.n):>8.2f}")
+    print(f"{'5 buscas':<14}{medir(varias_buscas, textos, args.n):>8.2f}")
+    print(f"{'1 regex':<14}{medir(um_regex, textos, args.n):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do parse de HTML por backend (html.parser, lxml, selectolax).
+
+Mede o tempo por página de:
+- parse_linhas (consultas.php, monitor de urgência)
+- coletar_mensagens (expediente e avulso)
+
+Uso (da raiz do repositório):
+  python bench/bench_parser.py                 # páginas sintéticas
+  python bench/bench_parser.py -n 50           # repetições por medida
+  python bench/bench_parser.py --consultas a.html --expediente b.html --avulso c.html
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import importlib
+from time import perf_counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import parser_html  # noqa: E402
+
+
+def pagina_consultas(linhas: int = 50) -> str:
+    trs, inputs = [], []
+    for i in range(linhas):
+        trs.append(
+            "<tr><td><span><strong>%02d/10/2025</strong></span></td>"
+            "<td><span><strong>Dep. Fulano %d - REQUERIMENTO %04d/2025</strong></span></td>"
+            "<td><span>Requer regime de urgência para o projeto de lei nº %d/2025 que dispõe sobre"
+            " assunto de interesse público</span></td></tr>" % (1 + i % 28, i, 1000 + i, 300 + i))
+        inputs.append('<input type="hidden" name="leg_id" value="%d">' % (90000 + i))
+    return ("<html><body><form>%s</form><table>%s</table></body></html>"
+            % ("".join(inputs), "".join(trs)))
+
+
+def pagina_expediente(links: int = 300) -> str:
+    partes = []
+    for i in range(links):
+        tipo = "Mensagem nº %d.%03d - %d/2025" % (9, i, 800 + i) if i % 3 == 0 else \
+               "Projeto de Indicação %d/2025" % (100 + i)
+        partes.append('<b><a href="https://www2.al.ce.gov.br/legislativo/tramit2025/%d.pdf">%s</a></b>'
+                      ' - Dispõe sobre a criação de programa estadual nº %d. <br>' % (9000 + i, tipo, i))
+    return ("<html><body><main><div><div><div><h3>EXPEDIENTE DA SESSÃO<br>%s</h3>"
+            "</div></div></div></main></body></html>" % "".join(partes))
+
+
+def medir(funcao, n: int) -> float:
+    funcao()  # aquecimento
+    t0 = perf_counter()
+    for _ in range(n):
+        funcao()
+    return (perf_counter() - t0) / n * 1000
+
+
+def usar_backend(nome: str):
+    parser_html.FORCADO = nome
+    parser_html._padrao = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=20, help="repetições por medida")
+    ap.add_argument("--consultas")
+    ap.add_argument("--expediente")
+    ap.add_argument("--avulso")
+    args = ap.parse_args()
+
+    def ler(caminho, gerar):
+        if caminho:
+            with open(caminho, encoding="utf-8", errors="replace") as f:
+                return f.read()
+        return gerar()
+
+    html_cons = ler(args.consultas, pagina_consultas)
+    html_exp = ler(args.expediente, pagina_expediente)
+    html_avu = ler(args.avulso, pagina_expediente)
+
+    # os monitores criam pastas ao serem importados: isola num diretório temporário
+    os.chdir(tempfile.mkdtemp(prefix="bench_parser_"))
+    urg = importlib.import_module("monitor_urgencia_androi")
+    exp = importlib.import_module("monitor_expediente_android")
+    avu = importlib.import_module("monitor_avulso_android")
+
+    backends = parser_html.backends_disponiveis()[::-1]   # html.parser primeiro
+    try:
+        import selectolax  # noqa: F401
+        backends.append("selectolax")
+    except ImportError:
+        pass
+
+    print(f"{'backend':<12} {'consultas':>12} {'expediente':>12} {'avulso':>12}   (ms/página, n={args.n})")
+    for b in backends:
+        usar_backend(b)
+        t_cons = medir(lambda: urg.parse_linhas(html_cons), args.n)
+        if b == "selectolax":
+            # expediente/avulso navegam na árvore (parent/next_siblings): só BeautifulSoup
+            t_exp = t_avu = None
+        else:
+            t_exp = medir(lambda: exp.coletar_mensagens(html_exp), args.n)
+            t_avu = medir(lambda: avu.coletar_mensagens(html_avu), args.n)
+        fmt = lambda t: f"{t:>12.2f}" if t is not None else f"{'n/a':>12}"
+        print(f"{b:<12} {fmt(t_cons)} {fmt(t_exp)} {fmt(t_avu)}")
+
+
+if __name__ == "__main__":
+    main()
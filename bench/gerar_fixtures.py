@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures HTML do benchmark offline (bench/fixtures/).
+
+- consultas_<n>.html: páginas do consultas.php (pdr, lista de urgência)
+- expediente.html:    /legislativo/expediente
+- avulso.html:        /legislativo/ordem-do-dia/avulso-de-projeto
+- plenario.html:      resposta HTML do consulta_plenario.php (link p/ o PDF)
+- documento.pdf:      opcional; sem ele o stub gera um PDF sintético
+- novidade/:          as mesmas páginas com NOVIDADES itens novos no topo
+                      (ciclo incremental do bench_ciclo.py)
+
+Uso (da raiz do repositório):
+  python bench/gerar_fixtures.py              # gera páginas sintéticas (determinísticas)
+  python bench/gerar_fixtures.py --gravar     # grava as páginas reais do site (precisa de rede)
+
+As páginas sintéticas seguem a estrutura que os parsers dos monitores
+esperam e usam datas fixas (a mais nova é HOJE_FIXTURES); o bench_ciclo.py
+congela o "hoje" do monitor de urgência nessa data.
+"""
+
+import os
+import sys
+import random
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, RAIZ)
+
+HOJE_FIXTURES = "15/10/2025"
+LINHAS_POR_PAGINA = 20
+PAGINAS_CONSULTAS = 3
+SEMENTE = 2025
+NOVIDADES = 2
+
+ASSUNTOS = [
+    "Requer regime de urgência para o Projeto de Lei nº {n:04d}/2025, que dispõe sobre {tema}.",
+    "Requer a inclusão em pauta do Projeto de Indicação nº {n}/2025, que trata de {tema}.",
+    "Requer voto de congratulações pela {tema}.",
+    "Requer informações à Secretaria sobre {tema}.",
+]
+TEMAS = [
+    "a política estadual de saneamento básico", "o programa de regularização fundiária",
+    "a criação do fundo estadual de inovação", "a segurança hídrica no semiárido",
+    "o transporte intermunicipal de passageiros", "a merenda escolar na rede estadual",
+]
+
+
+def _linha_consultas(i: int, data: str) -> str:
+    # cada linha depende só do índice: a variante "novidade" só desloca a lista
+    rnd = random.Random(SEMENTE * 1000 + i)
+    urgente = i % 4 == 0 or i < 0
+    modelo = ASSUNTOS[0] if urgente else rnd.choice(ASSUNTOS[1:])
+    conteudo = modelo.format(n=300 + i, tema=rnd.choice(TEMAS))
+    autor = "Dep. %s - REQUERIMENTO Nº %04d/2025" % (rnd.choice(["Ana Lima", "João Alves", "Maria Sá"]), 1000 + i)
+    return (
+        "<tr>"
+        "<td><span><strong>%s</strong></span></td>"
+        "<td><span>%s</span></td>"
+        "<td><span>%s</span></td>"
+        "<td><form method=\"post\" action=\"consulta_plenario.php\" target=\"_blank\">"
+        "<input type=\"hidden\" name=\"leg_id\" value=\"%d\">"
+        "<input type=\"hidden\" name=\"pg\" value=\"publico\">"
+        "<input type=\"submit\" name=\"visualizar\" value=\"Visualizar\"></form></td>"
+        "</tr>" % (data, autor, conteudo, 91000 - i)   # mais nova no topo, maior leg_id
+    )
+
+
+def pagina_consultas(pagina: int, novas: int = 0) -> str:
+    corte = (PAGINAS_CONSULTAS - 1) * LINHAS_POR_PAGINA + LINHAS_POR_PAGINA // 2
+    linhas = []
+    for j in range(LINHAS_POR_PAGINA):
+        i = (pagina - 1) * LINHAS_POR_PAGINA + j - novas
+        # metade da última página já é do dia anterior (corte por data)
+        data = "14/10/2025" if i >= corte else HOJE_FIXTURES
+        linhas.append(_linha_consultas(i, data))
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>PDR - Consultas</title></head><body>"
+        "<div id=\"conteudo\"><h2>Proposições</h2>"
+        "<table class=\"tabela\"><tr><th>Data</th><th>Autor</th><th>Conteúdo</th><th></th></tr>%s</table>"
+        "<div class=\"paginacao\">%s</div></div></body></html>"
+        % ("".join(linhas),
+           " ".join('<a href="consultas.php?pagina=%d">%d</a>' % (p, p) for p in range(1, PAGINAS_CONSULTAS + 1)))
+    )
+
+
+def pagina_expediente(itens: int = 60, novas: int = 0) -> str:
+    partes = []
+    for i in range(-novas, itens):
+        rnd = random.Random(SEMENTE * 1000 + i)
+        if i % 5 == 0 or i < 0:
+            tipo = "Mensagem nº %d.%03d - %d/2025" % (9, 400 + i, 80 + i)
+        else:
+            tipo = "Projeto de Indicação nº %d/2025" % (200 + i)
+        partes.append(
+            '<b><a href="https://www2.al.ce.gov.br/legislativo/tramit2025/%d.pdf">%s</a></b>'
+            " - Dispõe sobre %s. <br>" % (9400 + i, tipo, rnd.choice(TEMAS)))
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Expediente</title></head><body>"
+        "<main><div class=\"container\"><div class=\"row\"><div class=\"col\">"
+        "<h3>EXPEDIENTE DA SESSÃO DELIBERATIVA<br>%s</h3>"
+        "</div></div></div></main></body></html>" % "".join(partes)
+    )
+
+
+def pagina_avulso(itens: int = 40, novas: int = 0) -> str:
+    partes = []
+    for i in range(-novas, itens):
+        rnd = random.Random(SEMENTE * 1000 + i)
+        if i % 4 == 0 or i < 0:
+            titulo = "Projeto de Lei nº %d/2025 - Mensagem nº %d" % (70 + i, 120 + i)
+        else:
+            titulo = "Projeto de Lei nº %d/2025" % (70 + i)
+        partes.append(
+            '<p><b><a href="https://www.al.ce.gov.br/images/avulsos/%d.pdf">%s</a></b>'
+            " Autoria: Poder Executivo. Dispõe sobre %s.</p>" % (5000 + i, titulo, rnd.choice(TEMAS)))
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Avulso de Projeto</title></head><body>"
+        "<main><h2>Ordem do Dia — Avulso de Projeto</h2>%s</main></body></html>" % "".join(partes)
+    )
+
+
+def pagina_plenario() -> str:
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Plenário</title></head><body>"
+        "<p>Documento da proposição:</p>"
+        "<a href=\"documentos/requerimento.pdf\">Visualizar PDF</a></body></html>"
+    )
+
+
+def escrever(nome: str, conteudo):
+    caminho = os.path.join(PASTA, nome)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    modo, kw = ("wb", {}) if isinstance(conteudo, bytes) else ("w", {"encoding": "utf-8"})
+    with open(caminho, modo, **kw) as f:
+        f.write(conteudo)
+    print("💾", nome, len(conteudo), "bytes")
+
+
+def gerar_sinteticas():
+    for pasta, novas in (("", 0), ("novidade/", NOVIDADES)):
+        for p in range(1, PAGINAS_CONSULTAS + 1):
+            escrever(pasta + "consultas_%d.html" % p, pagina_consultas(p, novas))
+        escrever(pasta + "expediente.html", pagina_expediente(novas=novas))
+        escrever(pasta + "avulso.html", pagina_avulso(novas=novas))
+    escrever("plenario.html", pagina_plenario())
+
+
+def gravar(paginas: int):
+    """Grava as páginas reais (rode no celular/PC com acesso ao site)."""
+    import http_cliente
+    import monitor_urgencia_androi as urg
+    import monitor_expediente_android as exp
+    import monitor_avulso_android as avu
+
+    leg_id = None
+    for p in range(1, paginas + 1):
+        params = dict(urg.PARAM_FIXOS, pagina=str(p))
+        r = http_cliente.get(urg.URL_BASE_LISTA, params=params, headers=urg.HEADERS)
+        r.raise_for_status()
+        escrever("consultas_%d.html" % p, r.content)
+        leg_id = leg_id or next((l["leg_id"] for l in urg.parse_linhas(r.text) if l["leg_id"]), None)
+    for nome, url, kw in (("expediente.html", exp.URL, {"verify": False}), ("avulso.html", avu.URL, {})):
+        r = http_cliente.get(url, **kw)
+        r.raise_for_status()
+        escrever(nome, r.content)
+    if leg_id:
+        r = http_cliente.post(urg.URL_PLENARIO, data={"leg_id": leg_id, "pg": "publico", "visualizar": "Visualizar"})
+        r.raise_for_status()
+        pdf = "pdf" in (r.headers.get("Content-Type") or "").lower()
+        escrever("documento.pdf" if pdf else "plenario.html", r.content)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--gravar", action="store_true", help="grava as páginas reais do site")
+    ap.add_argument("--paginas", type=int, default=PAGINAS_CONSULTAS, help="páginas do consultas.php a gravar")
+    args = ap.parse_args()
+    if args.gravar:
+        gravar(args.paginas)
+    else:
+        gerar_sinteticas()
+
+
+if __name__ == "__main__":
+    main()
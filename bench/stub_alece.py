@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Stubs locais para o benchmark offline: site da ALECE e sender do WhatsApp.
+
+- iniciar_site(pasta, latencia): servidor HTTP (127.0.0.1, porta livre) que
+  responde com as fixtures gravadas:
+    GET  /pdr/consultas.php?pagina=N         -> consultas_N.html (tabela vazia depois da última)
+    POST /pdr/consulta_plenario.php (leg_id) -> PDF se o leg_id for múltiplo de 3,
+                                               senão plenario.html (link p/ o PDF)
+    GET  /legislativo/expediente             -> expediente.html
+    GET  /legislativo/ordem-do-dia/avulso-de-projeto -> avulso.html
+    GET/HEAD *.pdf                           -> documento.pdf (ou PDF sintético)
+  Os links absolutos do site nas páginas são reescritos para o stub, e as
+  respostas trazem ETag (If-None-Match -> 304), como um servidor real.
+- iniciar_sender(latencia): fala o mesmo protocolo do sender_daemon.js
+  (uma linha JSON por pedido) sem WhatsApp nenhum.
+- contagem: requisições por (método, rota, status) e envios recebidos.
+- variante: subpasta das fixtures servida por cima da principal (ex.:
+  "novidade", com itens novos no topo das listas).
+"""
+
+import os
+import json
+import hashlib
+import threading
+import socketserver
+from collections import Counter
+from time import sleep
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOSTS_SITE = ("https://www2.al.ce.gov.br", "https://www.al.ce.gov.br",
+              "http://www2.al.ce.gov.br", "http://www.al.ce.gov.br")
+TAMANHO_PDF_KB = 120
+
+contagem: Counter = Counter()
+variante = ""
+_lock = threading.Lock()
+
+
+def contar(chave):
+    with _lock:
+        contagem[chave] += 1
+
+
+def zerar():
+    with _lock:
+        contagem.clear()
+
+
+def pdf_sintetico(kb: int = TAMANHO_PDF_KB) -> bytes:
+    """PDF válido de uma página, com um fluxo de enchimento até ~kb KB."""
+    enchimento = b"% " + b"x" * 78 + b"\n"
+    conteudo = b"BT /F1 12 Tf 72 720 Td (Documento de teste) Tj ET\n" + enchimento * (kb * 1024 // 81)
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"endstream",
+    ]
+    saida, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, o in enumerate(objs, 1):
+        offsets.append(len(saida))
+        saida += b"%d 0 obj\n" % i + o + b"\nendobj\n"
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(saida)
+
+
+# =========== Site ===========
+def _criar_handler(pasta: str, latencia: float, url_base: dict):
+    cache = {}
+
+    def fixture(nome: str):
+        chave = (variante, nome)
+        if chave not in cache:
+            caminho = os.path.join(pasta, variante, nome)
+            if not os.path.isfile(caminho):
+                caminho = os.path.join(pasta, nome)
+            if not os.path.isfile(caminho):
+                cache[chave] = None
+            else:
+                with open(caminho, "rb") as f:
+                    corpo = f.read()
+                if not nome.endswith(".pdf"):
+                    for h in HOSTS_SITE:
+                        corpo = corpo.replace(h.encode(), url_base["url"].encode())
+                cache[chave] = corpo
+        return cache[chave]
+
+    def documento() -> bytes:
+        return fixture("documento.pdf") or cache.setdefault("_pdf", pdf_sintetico())
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, como o site
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, rota: str, status: int, corpo: bytes = b"", tipo: str = "text/html; charset=utf-8"):
+            if latencia:
+                sleep(latencia)
+            etag = '"%s"' % hashlib.sha1(corpo).hexdigest()[:16]
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, corpo = 304, b""
+            contar((self.command, rota, status))
+            self.send_response(status)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+            if status in (200, 304):
+                self.send_header("ETag", etag)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(corpo)
+
+        def _rotear(self, form: dict):
+            u = urlparse(self.path)
+            q = parse_qs(u.query)
+            if u.path.endswith("/consultas.php"):
+                pagina = (q.get("pagina") or ["1"])[0]
+                corpo = fixture("consultas_%s.html" % pagina) or b"<html><body><table></table></body></html>"
+                return self._responder("consultas.php", 200, corpo)
+            if u.path.endswith("/consulta_plenario.php"):
+                leg_id = (form.get("leg_id") or [""])[0]
+                if leg_id.isdigit() and int(leg_id) % 3 == 0:
+                    return self._responder("consulta_plenario.php", 200, documento(), "application/pdf")
+                return self._responder("consulta_plenario.php", 200, fixture("plenario.html") or b"<html></html>")
+            if u.path.lower().endswith(".pdf"):
+                return self._responder("*.pdf", 200, documento(), "application/pdf")
+            if u.path.rstrip("/").endswith("/legislativo/expediente"):
+                return self._responder("expediente", 200, fixture("expediente.html") or b"")
+            if u.path.rstrip("/").endswith("/avulso-de-projeto"):
+                return self._responder("avulso-de-projeto", 200, fixture("avulso.html") or b"")
+            return self._responder(u.path, 404, b"nao encontrado")
+
+        def do_GET(self):
+            self._rotear({})
+
+        def do_HEAD(self):
+            self._rotear({})
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            self._rotear(parse_qs(self.rfile.read(n).decode("utf-8", "replace")))
+
+    return Handler
+
+
+def iniciar_site(pasta: str, latencia: float = 0.0):
+    """Sobe o site falso numa thread. Devolve (servidor, url_base)."""
+    url_base = {"url": ""}
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _criar_handler(pasta, latencia, url_base))
+    srv.daemon_threads = True
+    url_base["url"] = "http://127.0.0.1:%d" % srv.server_address[1]
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, url_base["url"]
+
+
+def redirecionar(modulo, url_base: str):
+    """Troca o host do site em todas as constantes str do módulo (URL, URL_PLENARIO...)."""
+    for nome, valor in list(vars(modulo).items()):
+        if nome.isupper() and isinstance(valor, str):
+            for h in HOSTS_SITE:
+                if valor.startswith(h):
+                    setattr(modulo, nome, url_base + valor[len(h):])
+                    break
+
+
+# =========== Sender ===========
+def iniciar_sender(latencia: float = 0.0):
+    """Sender falso no protocolo do sender_daemon.js. Devolve (servidor, porta)."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for linha in self.rfile:
+                pedido = json.loads(linha)
+                if pedido.get("op") == "ping":
+                    resp = {"ok": True, "estado": "open"}
+                elif pedido.get("op") == "enviar":
+                    if latencia:
+                        sleep(latencia)
+                    contar(("sender", "enviar", "resumo" if pedido.get("resumo") else
+                            "pdfs" if pedido.get("pdfs") else
+                            "pdf" if pedido.get("pdf") else "texto"))
+                    resp = {"ok": True}
+                else:
+                    resp = {"ok": False, "erro": "op desconhecida"}
+                self.wfile.write((json.dumps(resp) + "\n").encode("utf-8"))
+
+    srv = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, srv.server_address[1]
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de PDFs compartilhado pelos monitores, endereçado por conteúdo.
+
+    chave (URL, ou "plenario:<leg_id>") --> sha256 --> <estado>/pdfs/<sha256>.pdf
+
+- baixar(url, destino): se a chave já tem conteúdo no cache, conferido há
+  menos de VALIDADE_URL, nenhuma requisição é feita — o arquivo só é
+  colocado em destino (hardlink, ou cópia quando o armazenamento não aceita
+  link, como o /storage do Android). Passado isso, um GET condicional (ETag /
+  Last-Modified guardados com a chave) confirma a cópia ou traz a nova.
+  Senão baixa em streaming, calculando o SHA-256 enquanto grava.
+- O mesmo conteúdo vindo de URLs diferentes (a Mensagem que aparece no
+  expediente e no avulso) fica uma vez só; a mesma URL pedida por duas
+  threads ao mesmo tempo é baixada uma vez só.
+- guardar(resp, chaves) / procurar(chave) / materializar(...): para quem
+  tem um caminho próprio até o PDF (POST do plenário).
+- resolver(chave, url, tipo, ttl) / resolucao(chave): lembra, com validade,
+  a que URL (e Content-Type) uma chave levou — ou que ainda não leva a PDF
+  nenhum (url None, cache negativo) —, para não refazer o caminho (POST +
+  HTML) enquanto valer.
+- Limpeza: depois de cada PDF novo, apaga os menos usados até caber em
+  MAX_MB e os não usados há mais de MAX_DIAS. No limite só conta o PDF que
+  só existe no cache (com hardlink numa pasta de monitor, apagá-lo não
+  libera espaço); o usado há menos de EM_USO s (o recém-guardado, o que
+  está sendo materializado) fica.
+
+O índice fica em "cache_pdf.sqlite3" na pasta de estado.
+"""
+
+import os
+import uuid
+import shutil
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+import requests
+
+import estado
+import http_cliente
+import metricas
+
+MAX_MB = 300
+MAX_DIAS = 60
+VALIDADE_URL = 24 * 3600   # s até reconferir no servidor o PDF de uma URL
+EM_USO = 300               # s em que um PDF recém-usado não sai do cache por tamanho
+PEDACO = 65536
+
+_con = None
+_lock = threading.Lock()
+_lock_chaves = threading.Lock()
+_por_chave: Dict[str, threading.Lock] = {}
+
+
+def pasta() -> str:
+    p = estado.caminho("pdfs")
+    os.makedirs(p, exist_ok=True)
+    return p
+
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _db():
+    global _con
+    if _con is None:
+        con = estado.conectar("cache_pdf.sqlite3")
+        con.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                           sha TEXT PRIMARY KEY, tamanho INTEGER, criado TEXT, usado TEXT)""")
+        con.execute("""CREATE TABLE IF NOT EXISTS chaves (
+                           chave TEXT PRIMARY KEY, sha TEXT NOT NULL, criado TEXT)""")
+        colunas = [c[1] for c in con.execute("PRAGMA table_info(chaves)")]
+        for coluna in ("etag", "modificado", "validado"):
+            if coluna not in colunas:
+                con.execute(f"ALTER TABLE chaves ADD COLUMN {coluna} TEXT")
+        con.execute("CREATE INDEX IF NOT EXISTS chaves_sha ON chaves (sha)")
+        con.execute("""CREATE TABLE IF NOT EXISTS resolucoes (
+                           chave TEXT PRIMARY KEY, url TEXT, tipo TEXT, quando TEXT, expira TEXT)""")
+        con.commit()
+        _con = con
+    return _con
+
+
+def _arquivo(sha: str) -> str:
+    return os.path.join(pasta(), sha + ".pdf")
+
+
+def _trava(chave: str) -> threading.Lock:
+    with _lock_chaves:
+        return _por_chave.setdefault(chave, threading.Lock())
+
+
+# =========== Consulta ===========
+def procurar(chave: str) -> Optional[str]:
+    """Caminho do PDF no cache para a chave, ou None (sem tocar a rede)."""
+    with _lock:
+        linha = _db().execute("SELECT sha FROM chaves WHERE chave = ?", (chave,)).fetchone()
+        if not linha:
+            metricas.contar("cache_pdf", resultado="falta")
+            return None
+        caminho = _arquivo(linha[0])
+        if not os.path.isfile(caminho):
+            _db().execute("DELETE FROM chaves WHERE sha = ?", (linha[0],))
+            _db().execute("DELETE FROM blobs WHERE sha = ?", (linha[0],))
+            _db().commit()
+            metricas.contar("cache_pdf", resultado="falta")
+            return None
+        _db().execute("UPDATE blobs SET usado = ? WHERE sha = ?", (_agora(), linha[0]))
+        _db().commit()
+    metricas.contar("cache_pdf", resultado="acerto")
+    return caminho
+
+
+def _validadores(chave: str) -> Optional[Dict]:
+    """{"etag", "modificado", "validado"} da chave (None se não estiver no cache)."""
+    with _lock:
+        linha = _db().execute("SELECT etag, modificado, validado FROM chaves WHERE chave = ?",
+                              (chave,)).fetchone()
+    return dict(zip(("etag", "modificado", "validado"), linha)) if linha else None
+
+
+def _revalidada(chave: str):
+    with _lock:
+        _db().execute("UPDATE chaves SET validado = ? WHERE chave = ?", (_agora(), chave))
+        _db().commit()
+
+
+def materializar(origem: str, destino: str) -> str:
+    """Põe o PDF do cache em destino (link, ou cópia se o sistema de arquivos não deixar)."""
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    try:
+        if os.path.samefile(origem, destino):
+            return destino
+    except OSError:
+        pass
+    tmp = destino + ".part"
+    try:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        os.link(origem, tmp)
+    except OSError:
+        shutil.copyfile(origem, tmp)
+    os.replace(tmp, destino)
+    return destino
+
+
+# =========== Gravação ===========
+def guardar(resp: requests.Response, chaves: Iterable[str]) -> Optional[str]:
+    """Grava o corpo (em streaming) no cache e associa as chaves. None se veio vazio."""
+    tmp = os.path.join(pasta(), f".{uuid.uuid4().hex}.part")
+    h, tamanho = hashlib.sha256(), 0
+    try:
+        with open(tmp, "wb") as f:
+            for pedaco in resp.iter_content(PEDACO):
+                if pedaco:
+                    h.update(pedaco)
+                    f.write(pedaco)
+                    tamanho += len(pedaco)
+        if tamanho == 0:
+            return None
+        sha = h.hexdigest()
+        caminho = _arquivo(sha)
+        if os.path.isfile(caminho):
+            print("♻️ PDF já estava no cache (mesmo conteúdo):", sha[:12])
+            metricas.contar("cache_pdf", resultado="mesmo_conteudo")
+        else:
+            os.replace(tmp, caminho)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    associar(sha, tamanho, chaves, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    limpar()
+    return caminho
+
+
+def associar(sha: str, tamanho: int, chaves: Iterable[str],
+             etag: Optional[str] = None, modificado: Optional[str] = None):
+    agora = _agora()
+    with _lock:
+        _db().execute("""INSERT INTO blobs (sha, tamanho, criado, usado) VALUES (?, ?, ?, ?)
+                         ON CONFLICT (sha) DO UPDATE SET usado = excluded.usado""",
+                      (sha, tamanho, agora, agora))
+        _db().executemany("""INSERT OR REPLACE INTO chaves (chave, sha, criado, etag, modificado, validado)
+                             VALUES (?, ?, ?, ?, ?, ?)""",
+                          [(c, sha, agora, etag, modificado, agora) for c in chaves])
+        _db().commit()
+
+
+def baixar(url: str, destino: str, headers: Optional[dict] = None,
+           chaves_extra: Iterable[str] = ()) -> Optional[str]:
+    """
+    PDF da URL em destino, pelo cache. None se a resposta não for PDF, vier
+    vazia ou der erro de rede (como o download antigo) — a menos que haja
+    uma cópia no cache esperando reconferência: aí fica a cópia.
+    """
+    with _trava(url):
+        em_cache = procurar(url)
+        condicional = {}
+        if em_cache:
+            v = _validadores(url) or {}
+            limite = (datetime.now() - timedelta(seconds=VALIDADE_URL)).isoformat(timespec="seconds")
+            if (v.get("validado") or "") >= limite:
+                print("📦 PDF do cache:", url)
+                return _do_cache(em_cache, destino, chaves_extra)
+            if v.get("etag"):
+                condicional["If-None-Match"] = v["etag"]
+            if v.get("modificado"):
+                condicional["If-Modified-Since"] = v["modificado"]
+        try:
+            with http_cliente.get(url, headers={**(headers or {}), **condicional}, stream=True) as r:
+                if r.status_code == 304 and em_cache:
+                    print("📦 PDF do cache (conferido, 304):", url)
+                    metricas.contar("cache_pdf", resultado="revalidado")
+                    _revalidada(url)
+                    return _do_cache(em_cache, destino, chaves_extra)
+                if r.status_code != 200:
+                    print(f"❌ HTTP {r.status_code} ao baixar {url}")
+                    return _do_cache(em_cache, destino, chaves_extra) if em_cache else None
+                if "pdf" not in (r.headers.get("Content-Type") or "").lower():
+                    print("⚠️ Não veio PDF:", url)
+                    return _do_cache(em_cache, destino, chaves_extra) if em_cache else None
+                caminho = guardar(r, [url, *chaves_extra])
+        except (requests.RequestException, OSError) as e:
+            print("⚠️ Falha ao baixar", url, "-", e)
+            return _do_cache(em_cache, destino, chaves_extra) if em_cache and os.path.isfile(em_cache) else None
+    if not caminho:
+        print("⚠️ PDF 0B:", url)
+        return None
+    return materializar(caminho, destino)
+
+
+def _do_cache(em_cache: str, destino: str, chaves_extra: Iterable[str]) -> str:
+    if chaves_extra:
+        associar(os.path.basename(em_cache)[:-4], os.path.getsize(em_cache), chaves_extra)
+    return materializar(em_cache, destino)
+
+
+# =========== Resoluções (chave -> URL do PDF) ===========
+def resolucao(chave: str) -> Optional[Dict]:
+    """{"url", "tipo", "quando"} se a chave tem resolução válida (url None = sem PDF), senão None."""
+    with _lock:
+        linha = _db().execute("SELECT url, tipo, quando, expira FROM resolucoes WHERE chave = ?",
+                              (chave,)).fetchone()
+    if not linha or linha[3] < _agora():
+        return None
+    return {"url": linha[0], "tipo": linha[1], "quando": linha[2]}
+
+
+def resolver(chave: str, url: Optional[str], tipo: Optional[str], ttl: float):
+    """Grava a resolução da chave por ttl segundos (url None: ainda sem PDF)."""
+    agora = datetime.now()
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO resolucoes (chave, url, tipo, quando, expira) VALUES (?, ?, ?, ?, ?)",
+                      (chave, url, tipo, agora.isoformat(timespec="seconds"),
+                       (agora + timedelta(seconds=ttl)).isoformat(timespec="seconds")))
+        _db().commit()
+
+
+def esquecer(chave: str):
+    with _lock:
+        _db().execute("DELETE FROM resolucoes WHERE chave = ?", (chave,))
+        _db().commit()
+
+
+# =========== Limpeza ===========
+def limpar(max_mb: float = MAX_MB, max_dias: int = MAX_DIAS) -> int:
+    """
+    Apaga do cache os PDFs velhos e, se passar do limite, os menos usados. Devolve quantos.
+    No limite só contam os PDFs sem outro link (st_nlink == 1); os usados há
+    menos de EM_USO s nunca saem por tamanho.
+    """
+    agora = datetime.now()
+    limite_data = (agora - timedelta(days=max_dias)).isoformat(timespec="seconds")
+    em_uso = (agora - timedelta(seconds=EM_USO)).isoformat(timespec="seconds")
+    with _lock:
+        linhas = _db().execute("SELECT sha, tamanho, usado FROM blobs ORDER BY usado DESC").fetchall()
+        total, apagar = 0, []
+        for sha, tamanho, usado in linhas:
+            try:
+                so_no_cache = os.stat(_arquivo(sha)).st_nlink == 1
+            except OSError:
+                apagar.append(sha)   # arquivo sumiu: só limpa o índice
+                continue
+            if so_no_cache:
+                total += tamanho or 0
+            if usado < limite_data or (so_no_cache and usado < em_uso and total > max_mb * 1024 * 1024):
+                apagar.append(sha)
+        for sha in apagar:
+            try:
+                os.remove(_arquivo(sha))
+            except OSError:
+                pass
+            _db().execute("DELETE FROM chaves WHERE sha = ?", (sha,))
+            _db().execute("DELETE FROM blobs WHERE sha = ?", (sha,))
+        vencidas = _db().execute("DELETE FROM resolucoes WHERE expira < ?", (_agora(),)).rowcount
+        if apagar or vencidas:
+            _db().commit()
+    metricas.definir("cache_pdf_bytes", sum(t or 0 for s, t, _ in linhas if s not in apagar))
+    if apagar:
+        print(f"🧹 Cache de PDFs: {len(apagar)} arquivo(s) removido(s)")
+    return len(apagar)
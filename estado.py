@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Pasta de estado local compartilhada pelos monitores (caches, índices...).
+
+Padrão: ~/.monitor_al (no Termux: /data/data/com.termux/files/home/.monitor_al),
+trocável pela variável de ambiente MONITOR_AL_ESTADO.
+"""
+
+import os
+import sqlite3
+
+DIR_ESTADO = os.environ.get("MONITOR_AL_ESTADO") or os.path.join(os.path.expanduser("~"), ".monitor_al")
+
+
+def caminho(nome: str) -> str:
+    os.makedirs(DIR_ESTADO, exist_ok=True)
+    return os.path.join(DIR_ESTADO, nome)
+
+
+def conectar(nome: str) -> sqlite3.Connection:
+    """Conexão SQLite em modo WAL dentro da pasta de estado (uso com lock próprio)."""
+    con = sqlite3.connect(caminho(nome), check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
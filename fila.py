@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Esteira de trabalho dos monitores: a raspagem só enfileira; o download do
+anexo e o envio pelo WhatsApp rodam em pools de threads separados.
+
+    raspagem --enfileirar--> [download] --N threads--> [envio] --M threads--> feito
+
+- Cada etapa tem fila limitada (backpressure: enfileirar() bloqueia quando
+  a fila de download está cheia; o download espera vaga na fila de envio)
+  e um número próprio de trabalhadores. Um PDF lento ou uma sessão do
+  WhatsApp travada não seguram a detecção nem os itens seguintes.
+- Item = dict serializável em JSON (mensagem, destinos, dados do anexo...);
+  a fonte decide o que fazer com ele pelas funções baixar(item) -> caminho
+  do PDF (ou None) e enviar(item, caminho_pdf). O que baixar() mudar no
+  item é gravado junto com o PDF.
+
+Caixa de saída durável (estado "fila.sqlite3", synchronous=FULL):
+
+    pendente -> baixando -> enviando -> enviado
+                    \\___________\\____-> erro (depois de MAX_TENTATIVAS)
+
+- (fonte, chave) é único: enfileirar() de um item já conhecido não faz
+  nada. Por isso o monitor grava na caixa de saída ANTES de marcar o item
+  como visto — se cair entre as duas coisas, a próxima varredura só marca.
+- Falha no download/envio conta uma tentativa e o item volta à etapa
+  depois de ESPERA_BASE * 2^(tentativas-1) segundos.
+- Ao subir, obter() recoloca tudo que não terminou na etapa em que estava,
+  sem precisar raspar de novo. Quem estava "enviando" é reenviado com o
+  mesmo item["id_envio"] — o sender_daemon.js ignora o que já entregou.
+- Linhas "enviado" ficam GUARDAR_ENVIADOS_DIAS dias (dedupe) e somem.
+
+Modo resumo (agrupar=s > 0): o envio espera até s segundos por mais itens
+prontos (ou até não haver mais nada a caminho) e junta os de mesmos
+destinos num só envio: mensagem = juntar_mensagens(...), caminho_pdf =
+lista dos PDFs e item["resumo"] = {"titulo", "separador", "partes": [{"id",
+"texto", "pdf"}]} com o id_envio de cada item. O sender_daemon.js monta o
+resumo por número só com as partes que ele ainda não recebeu, então o lote
+não tem id próprio: se falhar, cada item volta sozinho para nova tentativa
+(e pode cair noutro lote) sem repetir o que já foi entregue. Menos execuções
+do sender, menos pausas e menos chance de limite de envio no WhatsApp.
+
+Uso num monitor:
+    esteira = fila.obter("urgencia", baixar_anexo, enviar_alerta)
+    if esteira.enfileirar(chave, {"mensagem": ..., "destinos": [...], "leg_id": ...}):
+        ...  # item novo
+"""
+
+import json
+import queue
+import threading
+from time import monotonic
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import estado
+import metricas
+
+TRABALHADORES_DOWNLOAD = 3
+TRABALHADORES_ENVIO = 1       # o sender manda uma mensagem por vez
+MAX_NA_FILA = 20              # por etapa
+MAX_TENTATIVAS = 5
+ESPERA_BASE = 30              # s antes da 2ª tentativa (dobra a cada falha)
+GUARDAR_ENVIADOS_DIAS = 30
+MAX_LOTE = 10                 # itens por resumo
+TITULO_RESUMO = "📋 {n} novos itens"
+SEPARADOR = "\n\n— — —\n\n"
+
+_con = None
+_lock = threading.Lock()
+_lock_criar = threading.Lock()
+_esteiras: Dict[str, "Esteira"] = {}
+
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _migrar(con):
+    """Tabela da versão sem tentativas/unicidade (etapas download|envio|erro)."""
+    colunas = [c[1] for c in con.execute("PRAGMA table_info(fila)")]
+    if not colunas or "tentativas" in colunas:
+        return
+    con.execute("ALTER TABLE fila RENAME TO fila_antiga")
+    _criar(con)
+    con.execute("""INSERT OR IGNORE INTO fila (fonte, chave, etapa, item, pdf, erro, criado, atualizado)
+                   SELECT fonte, chave, CASE etapa WHEN 'envio' THEN 'enviando'
+                                               WHEN 'download' THEN 'pendente' ELSE etapa END,
+                          item, pdf, erro, criado, atualizado FROM fila_antiga ORDER BY id""")
+    con.execute("DROP TABLE fila_antiga")
+
+
+def _criar(con):
+    con.execute("""CREATE TABLE IF NOT EXISTS fila (
+                       id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       fonte TEXT NOT NULL, chave TEXT NOT NULL,
+                       etapa TEXT NOT NULL,   -- pendente | baixando | enviando | enviado | erro
+                       item TEXT NOT NULL, pdf TEXT, erro TEXT,
+                       tentativas INTEGER NOT NULL DEFAULT 0,
+                       criado TEXT, atualizado TEXT,
+                       UNIQUE (fonte, chave))""")
+    con.execute("CREATE INDEX IF NOT EXISTS fila_etapa ON fila (fonte, etapa)")
+
+
+def _db():
+    global _con
+    if _con is None:
+        con = estado.conectar("fila.sqlite3")
+        con.execute("PRAGMA synchronous=FULL")   # caixa de saída: commit = no disco
+        _migrar(con)
+        _criar(con)
+        limite = (datetime.now() - timedelta(days=GUARDAR_ENVIADOS_DIAS)).isoformat(timespec="seconds")
+        con.execute("DELETE FROM fila WHERE etapa = 'enviado' AND atualizado < ?", (limite,))
+        con.commit()
+        _con = con
+    return _con
+
+
+def juntar_mensagens(mensagens: List[str]) -> str:
+    return TITULO_RESUMO.format(n=len(mensagens)) + SEPARADOR + SEPARADOR.join(mensagens)
+
+
+def _executar(sql: str, args=()):
+    with _lock:
+        cur = _db().execute(sql, args)
+        _db().commit()
+        return cur
+
+
+class Esteira:
+    def __init__(self, fonte: str, baixar: Callable[[Dict], Optional[str]],
+                 enviar: Callable[[Dict, Optional[str]], None],
+                 trabalhadores_download: int = TRABALHADORES_DOWNLOAD,
+                 trabalhadores_envio: int = TRABALHADORES_ENVIO,
+                 max_na_fila: int = MAX_NA_FILA, agrupar: float = 0):
+        self.fonte = fonte
+        self.baixar = baixar
+        self.enviar = enviar
+        self.agrupar = agrupar
+        self._download: queue.Queue = queue.Queue(max_na_fila)
+        self._envio: queue.Queue = queue.Queue(max_na_fila)
+        self._em_andamento = 0
+        self._cond = threading.Condition()
+        for i in range(trabalhadores_download):
+            threading.Thread(target=self._trabalhar_download, name=f"{fonte}-download-{i}", daemon=True).start()
+        for i in range(trabalhadores_envio):
+            threading.Thread(target=self._trabalhar_envio, name=f"{fonte}-envio-{i}", daemon=True).start()
+        self._retomar()
+
+    # ---- entrada
+    def enfileirar(self, chave: str, item: Dict) -> Optional[int]:
+        """
+        Grava o item na caixa de saída e o põe na fila de download (bloqueia
+        se a fila estiver cheia). None se a chave já estava lá (nada a fazer).
+        """
+        item = dict(item, id_envio=f"{self.fonte}:{chave}")
+        cur = _executar("INSERT OR IGNORE INTO fila (fonte, chave, etapa, item, criado, atualizado) "
+                        "VALUES (?, ?, 'pendente', ?, ?, ?)",
+                        (self.fonte, chave, json.dumps(item, ensure_ascii=False), _agora(), _agora()))
+        if not cur.rowcount:
+            return None
+        self._colocar(self._download, (cur.lastrowid, chave, item, None))
+        return cur.lastrowid
+
+    def _retomar(self):
+        """Itens que ficaram pela metade numa execução anterior."""
+        with _lock:
+            linhas = _db().execute("SELECT id, chave, etapa, item, pdf FROM fila WHERE fonte = ? "
+                                   "AND etapa IN ('pendente', 'baixando', 'enviando') ORDER BY id",
+                                   (self.fonte,)).fetchall()
+        if not linhas:
+            return
+        print(f"♻️ [{self.fonte}] retomando {len(linhas)} item(ns) da caixa de saída")
+        # contados já (aguardar() os espera); o put, que bloqueia com a fila
+        # cheia, fica numa thread — obter() ainda segura _lock_criar aqui
+        with self._cond:
+            self._em_andamento += len(linhas)
+        threading.Thread(target=self._recolocar, args=(linhas,), name=f"{self.fonte}-retomar", daemon=True).start()
+
+    def _recolocar(self, linhas):
+        for id_, chave, etapa, item, pdf in linhas:
+            destino = self._envio if etapa == "enviando" else self._download
+            destino.put((id_, chave, json.loads(item), pdf))
+            self._medir()
+
+    def _colocar(self, fila_etapa: queue.Queue, tarefa):
+        with self._cond:
+            self._em_andamento += 1
+        fila_etapa.put(tarefa)
+        self._medir()
+
+    def _concluir(self):
+        with self._cond:
+            self._em_andamento -= 1
+            self._cond.notify_all()
+        self._medir()
+
+    def _medir(self):
+        metricas.definir("fila_profundidade", self._download.qsize(), fonte=self.fonte, etapa="download")
+        metricas.definir("fila_profundidade", self._envio.qsize(), fonte=self.fonte, etapa="envio")
+        metricas.definir("fila_em_andamento", self._em_andamento, fonte=self.fonte)
+
+    # ---- trabalhadores
+    def _falhou(self, tarefa, etapa: str, e: Exception):
+        """Conta a tentativa; devolve a tarefa à etapa mais tarde, ou desiste."""
+        id_, chave = tarefa[0], tarefa[1]
+        with _lock:
+            _db().execute("UPDATE fila SET tentativas = tentativas + 1, erro = ?, atualizado = ? WHERE id = ?",
+                          (f"{etapa}: {e}", _agora(), id_))
+            tentativas = _db().execute("SELECT tentativas FROM fila WHERE id = ?", (id_,)).fetchone()[0]
+            if tentativas >= MAX_TENTATIVAS:
+                _db().execute("UPDATE fila SET etapa = 'erro' WHERE id = ?", (id_,))
+            _db().commit()
+        metricas.contar("fila_falhas", fonte=self.fonte, etapa=etapa,
+                        resultado="desistiu" if tentativas >= MAX_TENTATIVAS else "nova_tentativa")
+        if tentativas >= MAX_TENTATIVAS:
+            print(f"✖️ [{self.fonte}] {etapa} de {chave} falhou {tentativas}x — desistindo:", e)
+            self._concluir()
+            return
+        espera = ESPERA_BASE * 2 ** (tentativas - 1)
+        print(f"⚠️ [{self.fonte}] {etapa} de {chave} falhou ({tentativas}/{MAX_TENTATIVAS}); "
+              f"nova tentativa em {espera}s:", e)
+        fila_etapa = self._download if etapa == "download" else self._envio
+        t = threading.Timer(espera, fila_etapa.put, (tarefa,))   # continua "em andamento"
+        t.daemon = True
+        t.start()
+
+    def _trabalhar_download(self):
+        while True:
+            tarefa = self._download.get()
+            id_, chave, item, _ = tarefa
+            try:
+                _executar("UPDATE fila SET etapa = 'baixando', atualizado = ? WHERE id = ?", (_agora(), id_))
+                with metricas.tempo(self.fonte, "download"):
+                    pdf = self.baixar(item)
+                # baixar() pode completar o item (ex.: destinos das regras do corpo do PDF)
+                _executar("UPDATE fila SET etapa = 'enviando', item = ?, pdf = ?, atualizado = ? WHERE id = ?",
+                          (json.dumps(item, ensure_ascii=False), pdf, _agora(), id_))
+            except Exception as e:
+                self._falhou(tarefa, "download", e)
+                continue
+            # passa adiante (espera vaga na fila de envio); continua "em andamento"
+            self._envio.put((id_, chave, item, pdf))
+
+    def _trabalhar_envio(self):
+        while True:
+            lote = [self._envio.get()]
+            if self.agrupar:
+                lote += self._juntar_lote(len(lote))
+            grupos: Dict[tuple, list] = {}
+            for tarefa in lote:
+                grupos.setdefault(tuple(tarefa[2].get("destinos") or ()), []).append(tarefa)
+            for tarefas in grupos.values():
+                self._enviar_tarefas(tarefas)
+
+    def _juntar_lote(self, ja: int) -> list:
+        """Mais tarefas prontas dentro da janela; para antes se nada mais estiver a caminho."""
+        mais, limite = [], monotonic() + self.agrupar
+        while ja + len(mais) < MAX_LOTE:
+            with self._cond:
+                a_caminho = self._em_andamento - ja - len(mais) - self._envio.qsize()
+            resta = limite - monotonic()
+            if resta <= 0 or (a_caminho <= 0 and self._envio.empty()):
+                break
+            try:
+                mais.append(self._envio.get(timeout=min(resta, 0.25)))
+            except queue.Empty:
+                pass
+        return mais
+
+    def _enviar_tarefas(self, tarefas: list):
+        if len(tarefas) == 1:
+            id_, chave, item, pdf = tarefas[0]
+        else:
+            itens = [t[2] for t in tarefas]
+            # sem id_envio do lote: o daemon deduplica parte a parte (id de cada item)
+            partes = [{"id": i.get("id_envio"), "texto": i["mensagem"], "pdf": t[3]} for i, t in zip(itens, tarefas)]
+            item = {k: v for k, v in itens[0].items() if k != "id_envio"}
+            item.update(mensagem=juntar_mensagens([i["mensagem"] for i in itens]), lote=[t[1] for t in tarefas],
+                        resumo={"titulo": TITULO_RESUMO, "separador": SEPARADOR, "partes": partes})
+            pdf = [t[3] for t in tarefas if t[3]]
+            print(f"📋 [{self.fonte}] resumo com {len(tarefas)} itens para {item.get('destinos')}")
+        try:
+            with metricas.tempo(self.fonte, "envio"):
+                self.enviar(item, pdf)
+        except Exception as e:
+            for tarefa in tarefas:
+                self._falhou(tarefa, "envio", e)
+            return
+        metricas.contar("envios", len(tarefas), fonte=self.fonte, resultado="ok")
+        metricas.contar("envios_sender", fonte=self.fonte, resumo=len(tarefas) > 1)
+        with _lock:
+            for tarefa in tarefas:
+                _db().execute("UPDATE fila SET etapa = 'enviado', erro = NULL, atualizado = ? WHERE id = ?",
+                              (_agora(), tarefa[0]))
+            _db().commit()
+        for _ in tarefas:
+            self._concluir()
+
+    # ---- controle
+    def pendentes(self) -> int:
+        with self._cond:
+            return self._em_andamento
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a esteira esvaziar. False se o tempo acabou antes."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._em_andamento == 0, timeout)
+
+
+def obter(fonte: str, baixar: Callable[[Dict], Optional[str]],
+          enviar: Callable[[Dict, Optional[str]], None], **limites) -> Esteira:
+    """Esteira da fonte (uma por processo; criada e retomada no 1º uso)."""
+    with _lock_criar:
+        if fonte not in _esteiras:
+            _esteiras[fonte] = Esteira(fonte, baixar, enviar, **limites)
+        return _esteiras[fonte]
+
+
+def aguardar_todas(timeout: Optional[float] = None) -> bool:
+    with _lock_criar:
+        esteiras = list(_esteiras.values())
+    return all(e.aguardar(timeout) for e in esteiras)
+
+
+def com_erro(fonte: Optional[str] = None):
+    """(fonte, chave, erro, tentativas, atualizado) dos itens em que a esteira desistiu."""
+    sql = "SELECT fonte, chave, erro, tentativas, atualizado FROM fila WHERE etapa = 'erro'"
+    with _lock:
+        if fonte:
+            return _db().execute(sql + " AND fonte = ? ORDER BY id", (fonte,)).fetchall()
+        return _db().execute(sql + " ORDER BY id").fetchall()
+
+
+def reenviar_erros(fonte: Optional[str] = None) -> int:
+    """Devolve os itens em 'erro' à caixa de saída (tentativas zeradas); vale no próximo início."""
+    sql = "UPDATE fila SET etapa = 'pendente', tentativas = 0, atualizado = ? WHERE etapa = 'erro'"
+    if fonte:
+        return _executar(sql + " AND fonte = ?", (_agora(), fonte)).rowcount
+    return _executar(sql, (_agora(),)).rowcount
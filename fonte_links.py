@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Fonte genérica "página com links para PDF" do monitor_al.py.
+
+Para vigiar mais uma página da ALECE basta uma entrada em FONTES:
+
+  {"nome": "ordem_do_dia", "tipo": "links",
+   "url": "https://www.al.ce.gov.br/legislativo/ordem-do-dia/avulso-de-projeto",
+   "palavras": ["projeto de lei"], "destinos": ["5585..."],
+   "intervalo": 1800, "pasta_pdfs": ".../mensagens",
+   "prefixo": "Novo item:", "sender_candidatos": [".../sender_baileys.js"],
+   "agrupar": 0}   # s; >0 = modo resumo (ver fila.py)
+
+Cada <a href="*.pdf"> cujo texto (link + pai) contenha alguma das palavras
+vira um item; a chave de dedupe é o número/ano do texto ou o nome do PDF.
+Em vez de "palavras", a fonte pode ter "regras" (ver regras.py; campos
+"titulo" e "texto"), cada uma com seus destinatários. O download do PDF e
+o envio vão para a esteira da fonte (fila.py).
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import urljoin, urlparse
+
+import anexos
+import estado
+import fila
+import http_cliente
+import indice_pdf
+import metricas
+import parser_html
+import regras
+import registro
+import sender_servico
+
+RX_NUM_ANO = re.compile(r"\b(\d{1,5})/(\d{4})\b")
+SENDER_PADRAO = ["/storage/emulated/0/Documents/escaner/sender_baileys.js"]
+
+
+def coletar_links(html: str, url_base: str, compiladas: Optional[Dict] = None) -> List[Dict]:
+    """Links para PDF que casam com as regras (sem regras: todos)."""
+    soup = parser_html.soup(html)
+    itens, chaves = [], set()
+    for a in soup.find_all("a", href=True):
+        href = a["href"].strip()
+        if not href.lower().endswith(".pdf"):
+            continue
+        titulo = a.get_text(" ", strip=True)
+        texto = titulo + " " + (a.parent.get_text(" ", strip=True) if a.parent else "")
+        casadas = regras.avaliar({"titulo": titulo, "texto": texto}, compiladas) if compiladas else []
+        if compiladas and not casadas:
+            continue
+        pdf_url = urljoin(url_base, href)
+        m = RX_NUM_ANO.search(texto)
+        chave = f"{m.group(1)}/{m.group(2)}" if m else os.path.basename(urlparse(pdf_url).path)
+        if chave in chaves:
+            continue
+        chaves.add(chave)
+        itens.append({"chave": chave, "titulo": titulo, "texto": texto.strip(), "pdf_url": pdf_url,
+                      "regras": casadas})
+    return itens
+
+
+def criar_ciclo(cfg: Dict) -> Callable[[], int]:
+    """Monta o executar_ciclo() de uma fonte 'links' a partir da configuração."""
+    nome = cfg["nome"]
+    url = cfg["url"]
+    lista = cfg.get("regras") or regras.de_palavras(nome, cfg.get("palavras"), ["texto"])
+    compiladas = regras.compilar(lista) if lista else None
+    destinos = cfg["destinos"]
+    pasta_pdfs = cfg.get("pasta_pdfs")
+    prefixo = cfg.get("prefixo", "Novo item:")
+    candidatos = cfg.get("sender_candidatos") or SENDER_PADRAO
+    arq_registro = cfg.get("registro") or estado.caminho(f"fonte_{nome}.sqlite3")
+
+    def baixar_anexo(item: Dict) -> Optional[str]:
+        if not pasta_pdfs:
+            return None
+        nome_arq = os.path.basename(urlparse(item["pdf_url"]).path)
+        pdf = anexos.baixar_stream(item["pdf_url"], os.path.join(pasta_pdfs, nome_arq))
+        indice_pdf.aplicar_regras(item, pdf, lista)
+        return pdf
+
+    def enviar_alerta(item: Dict, caminho_pdf: Union[str, List[str], None]):
+        sender_servico.enviar_com_candidatos(item["destinos"], item["mensagem"], caminho_pdf, candidatos,
+                                             item.get("id_envio"), item.get("resumo"))
+        print(f"✅ [{nome}] Enviado:", item["chave"])
+
+    esteira = fila.obter(nome, baixar_anexo, enviar_alerta, agrupar=cfg.get("agrupar", 0))   # retoma a caixa de saída já ao montar
+
+    def executar_ciclo() -> int:
+        enviados = registro.abrir(arq_registro)
+        with metricas.tempo(nome, "busca"):
+            resp = http_cliente.get_se_mudou(url)
+        if resp is None:
+            print(f"⏸️ [{nome}] página sem mudanças.")
+            return 0
+        with metricas.tempo(nome, "parse"):
+            itens = coletar_links(resp.text, url, compiladas)
+        print(f"🔎 [{nome}] {len(itens)} link(s) para as regras {[r['nome'] for r in lista]}")
+        novos = 0
+        for it in itens:
+            if it["chave"] in enviados:
+                continue
+            mensagem = f"{regras.prefixo(it['regras'], prefixo)} {it['titulo']}".strip()
+            # caixa de saída antes do registro (queda entre os dois não perde nem repete)
+            if esteira.enfileirar(it["chave"], {
+                    "mensagem": mensagem, "chave": it["chave"], "pdf_url": it["pdf_url"],
+                    "destinos": regras.destinos(it["regras"], destinos) if it["regras"] else destinos}):
+                novos += 1
+            enviados.add(it["chave"])
+            print(f"📥 [{nome}] Na fila e registrado:", it["chave"])
+        http_cliente.confirmar(resp)
+        return novos
+
+    return executar_ciclo
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartilhado pelos monitores (Requests).
+
+Uma única Session por processo, com pool de conexões keep-alive, para que
+páginas e PDFs de www2.al.ce.gov.br / www.al.ce.gov.br reaproveitem a mesma
+conexão TCP+TLS em vez de refazer o handshake a cada requisição.
+
+- limite de conexões por host (pool_block: quem passar do limite espera)
+- novas tentativas limitadas com backoff exponencial em 5xx, falha de
+  conexão e timeout de leitura
+- timeouts separados de conexão e de leitura
+- GET condicional (get_se_mudou): guarda ETag/Last-Modified e o hash do
+  corpo por URL+params e devolve None quando a página não mudou, para o
+  monitor nem chegar a fazer o parse
+- métricas (metricas.py): requisições por host/método/status, bytes,
+  latência e o resultado de cada GET condicional
+"""
+
+import hashlib
+import threading
+from datetime import datetime
+from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import estado
+import metricas
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36"
+}
+TIMEOUT = (10, 60)            # (conexão, leitura) em segundos
+MAX_CONEXOES_POR_HOST = 4
+TENTATIVAS = 3
+BACKOFF = 1.0                 # 1s, 2s, 4s...
+STATUS_REPETIR = (500, 502, 503, 504)
+
+_sessao: Optional[requests.Session] = None
+_lock = threading.Lock()
+_cache_con = None
+_cache_lock = threading.Lock()
+
+
+def sessao() -> requests.Session:
+    global _sessao
+    if _sessao is None:
+        with _lock:
+            if _sessao is None:
+                retry = Retry(
+                    total=TENTATIVAS,
+                    connect=TENTATIVAS,
+                    read=TENTATIVAS,
+                    status=TENTATIVAS,
+                    backoff_factor=BACKOFF,
+                    status_forcelist=STATUS_REPETIR,
+                    # o POST do consulta_plenario.php é só consulta
+                    allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONEXOES_POR_HOST,
+                                      pool_block=True, max_retries=retry)
+                s = requests.Session()
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update(HEADERS)
+                s.hooks["response"].append(_medir)
+                _sessao = s
+    return _sessao
+
+
+def _medir(r: requests.Response, *args, **kw):
+    host = urlparse(r.url).hostname or ""
+    metodo = r.request.method if r.request is not None else ""
+    metricas.contar("http_requisicoes", metodo=metodo, host=host, status=r.status_code)
+    metricas.contar("http_bytes", int(r.headers.get("Content-Length") or 0), host=host)
+    metricas.observar("http_segundos", r.elapsed.total_seconds(), metodo=metodo, host=host)
+
+
+def get(url: str, **kw) -> requests.Response:
+    kw.setdefault("timeout", TIMEOUT)
+    return sessao().get(url, **kw)
+
+
+def post(url: str, **kw) -> requests.Response:
+    kw.setdefault("timeout", TIMEOUT)
+    return sessao().post(url, **kw)
+
+
+def head(url: str, **kw) -> requests.Response:
+    kw.setdefault("timeout", TIMEOUT)
+    kw.setdefault("allow_redirects", True)
+    return sessao().head(url, **kw)
+
+
+# =========== GET condicional ===========
+def _cache():
+    global _cache_con
+    if _cache_con is None:
+        con = estado.conectar("http_cache.sqlite3")
+        con.execute("""CREATE TABLE IF NOT EXISTS http_cache (
+                           chave TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,
+                           hash TEXT, atualizado TEXT)""")
+        con.commit()
+        _cache_con = con
+    return _cache_con
+
+
+def chave_cache(url: str, params: Optional[dict] = None) -> str:
+    if not params:
+        return url
+    return url + "?" + urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+def _cache_ler(chave: str):
+    with _cache_lock:
+        return _cache().execute(
+            "SELECT etag, last_modified, hash FROM http_cache WHERE chave = ?", (chave,)).fetchone()
+
+
+def get_se_mudou(url: str, params: Optional[dict] = None, forcar: bool = False,
+                 **kw) -> Optional[requests.Response]:
+    """
+    GET com If-None-Match/If-Modified-Since. Devolve None se o servidor
+    respondeu 304 ou se o corpo tem o mesmo hash da última versão confirmada.
+    A nova versão só passa a valer depois de confirmar(resp), isto é, depois
+    que o monitor terminou de processar a página sem erro.
+    forcar=True sempre devolve a resposta (varredura completa), mas ela
+    continua podendo ser confirmada.
+    """
+    chave = chave_cache(url, params)
+    anterior = None if forcar else _cache_ler(chave)
+    headers = dict(kw.pop("headers", None) or {})
+    if anterior:
+        etag, last_modified, _ = anterior
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    r = get(url, params=params, headers=headers, **kw)
+    if r.status_code == 304:
+        metricas.contar("get_condicional", resultado="304")
+        return None
+    r.raise_for_status()
+    r.chave_cache = chave
+    r.hash_corpo = hashlib.sha256(r.content).hexdigest()
+    if anterior and anterior[2] == r.hash_corpo:
+        metricas.contar("get_condicional", resultado="mesmo_hash")
+        confirmar(r)  # atualiza validadores (o servidor pode ter trocado o ETag)
+        return None
+    metricas.contar("get_condicional", resultado="forcado" if forcar else "mudou")
+    return r
+
+
+def confirmar(resp: requests.Response):
+    """Grava validadores e hash da resposta devolvida por get_se_mudou."""
+    chave = getattr(resp, "chave_cache", None)
+    if not chave:
+        return
+    with _cache_lock:
+        con = _cache()
+        con.execute("INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?)",
+                    (chave, resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+                     resp.hash_corpo, datetime.now().isoformat(timespec="seconds")))
+        con.commit()
+
+
+def fechar():
+    global _sessao
+    with _lock:
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de texto completo (SQLite FTS5) dos PDFs baixados pelos monitores.
+
+- indexar(alvos): extrai o texto só dos PDFs novos ou alterados (tamanho e
+  data de cada caminho ficam gravados; o texto é guardado por SHA-256, então
+  a mesma Mensagem em duas pastas é extraída uma vez).
+- em_segundo_plano(alvos): roda o indexar num processo Python à parte (com
+  prioridade baixa), um por vez — a extração não disputa CPU/GIL com os
+  monitores. Padrão: a pasta do cache de PDFs (cache_pdf.py), por onde
+  passa tudo o que os monitores baixam.
+- buscar(consulta): resultados por relevância (bm25) com um trecho, em ms.
+- texto_de(caminho) / aplicar_regras(item, caminho_pdf, REGRAS): regras com
+  "campos": ["texto_pdf"] (regras.CAMPO_PDF) casam com o corpo do PDF dos
+  itens que a listagem já escolheu (não trazem itens novos; ver regras.py).
+
+Extração: pypdf (pip install pypdf) ou, sem ele, o pdftotext do poppler
+(pkg install poppler). Sem nenhum dos dois, nada é indexado.
+
+Uso:
+  python indice_pdf.py indexar [pasta_ou_pdf ...]   # padrão: cache de PDFs
+  python indice_pdf.py buscar "saúde pública"
+
+O índice fica em "indice_pdf.sqlite3" na pasta de estado.
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import hashlib
+import threading
+import subprocess
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional
+
+import estado
+import regras
+
+TIMEOUT_EXTRACAO = 120     # s para um PDF (processo à parte)
+TAMANHO_TRECHO = 16        # palavras no trecho de cada resultado
+
+_con = None
+_lock = threading.Lock()
+_proc: Optional[subprocess.Popen] = None
+
+
+class SemExtrator(RuntimeError):
+    """Nem pypdf nem pdftotext disponíveis."""
+
+
+def _db():
+    global _con
+    if _con is None:
+        con = estado.conectar("indice_pdf.sqlite3")
+        con.execute("""CREATE TABLE IF NOT EXISTS arquivos (
+                           caminho TEXT PRIMARY KEY, tamanho INTEGER, mtime REAL, sha TEXT)""")
+        con.execute("CREATE INDEX IF NOT EXISTS arquivos_sha ON arquivos (sha)")
+        con.execute("""CREATE TABLE IF NOT EXISTS documentos (
+                           id INTEGER PRIMARY KEY, sha TEXT UNIQUE NOT NULL, indexado TEXT, caracteres INTEGER)""")
+        con.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS textos
+                           USING fts5 (texto, tokenize = 'unicode61 remove_diacritics 2')""")
+        con.commit()
+        _con = con
+    return _con
+
+
+def _sha(caminho: str) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for pedaco in iter(lambda: f.read(65536), b""):
+            h.update(pedaco)
+    return h.hexdigest()
+
+
+# =========== Extração ===========
+def extrair_texto(caminho: str) -> str:
+    """Texto do PDF ("" se não tiver texto ou estiver corrompido). Levanta SemExtrator."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+    if PdfReader is not None:
+        try:
+            return "\n".join(p.extract_text() or "" for p in PdfReader(caminho).pages)
+        except Exception as e:
+            print("⚠️ PDF ilegível:", caminho, "-", e)
+            return ""
+    if shutil.which("pdftotext"):
+        try:
+            proc = subprocess.run(["pdftotext", "-q", "-enc", "UTF-8", caminho, "-"],
+                                  capture_output=True, timeout=TIMEOUT_EXTRACAO)
+        except subprocess.TimeoutExpired:
+            print("⚠️ pdftotext demorou demais:", caminho)
+            return ""
+        return proc.stdout.decode("utf-8", "replace") if proc.returncode == 0 else ""
+    raise SemExtrator("instale pypdf (pip install pypdf) ou poppler (pkg install poppler)")
+
+
+# =========== Indexação ===========
+def _listar(alvos: Iterable[str]) -> List[str]:
+    saida = []
+    for alvo in alvos:
+        if os.path.isdir(alvo):
+            for raiz, _, nomes in os.walk(alvo):
+                saida += [os.path.join(raiz, n) for n in nomes if n.lower().endswith(".pdf")]
+        elif os.path.isfile(alvo):
+            saida.append(alvo)
+    return saida
+
+
+def indexar(alvos: Optional[Iterable[str]] = None) -> int:
+    """Indexa os PDFs novos/alterados das pastas ou arquivos dados. Devolve quantos textos novos."""
+    if alvos is None:
+        import cache_pdf
+        alvos = [cache_pdf.pasta()]
+    novos = 0
+    for caminho in _listar(alvos):
+        caminho = os.path.abspath(caminho)
+        try:
+            st = os.stat(caminho)
+            with _lock:
+                linha = _db().execute("SELECT tamanho, mtime FROM arquivos WHERE caminho = ?",
+                                      (caminho,)).fetchone()
+            if linha and linha[0] == st.st_size and linha[1] == st.st_mtime:
+                continue
+            sha = _sha(caminho)
+            with _lock:
+                conhecido = _db().execute("SELECT 1 FROM documentos WHERE sha = ?", (sha,)).fetchone()
+            if not conhecido:
+                texto = extrair_texto(caminho)
+                with _lock:
+                    # outro processo pode ter indexado o mesmo sha nesse meio-tempo
+                    cur = _db().execute("INSERT OR IGNORE INTO documentos (sha, indexado, caracteres) VALUES (?, ?, ?)",
+                                        (sha, datetime.now().isoformat(timespec="seconds"), len(texto)))
+                    if cur.rowcount:
+                        _db().execute("INSERT INTO textos (rowid, texto) VALUES (?, ?)", (cur.lastrowid, texto))
+                if cur.rowcount:
+                    novos += 1
+            with _lock:
+                _db().execute("INSERT OR REPLACE INTO arquivos (caminho, tamanho, mtime, sha) VALUES (?, ?, ?, ?)",
+                              (caminho, st.st_size, st.st_mtime, sha))
+                _db().commit()
+        except SemExtrator as e:
+            print("⚠️ Sem extrator de texto de PDF:", e)
+            break
+        except OSError as e:
+            print("⚠️ Não indexei", caminho, "-", e)
+        except sqlite3.Error as e:
+            with _lock:
+                _db().rollback()
+            print("⚠️ Não indexei", caminho, "-", e)
+    if novos:
+        print(f"🗂️ {novos} PDF(s) novo(s) no índice")
+    return novos
+
+
+def em_segundo_plano(alvos: Optional[List[str]] = None) -> bool:
+    """Dispara indexar(alvos) num processo à parte, se nenhum estiver rodando. True se disparou."""
+    global _proc
+    if _proc is not None and _proc.poll() is None:
+        return False
+    _proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "indexar", *(alvos or [])])
+    return True
+
+
+def texto_de(caminho: str) -> Optional[str]:
+    """Texto do PDF pelo índice; se ainda não estiver lá, indexa só ele (processo à parte)."""
+    caminho = os.path.abspath(caminho)
+    for tentativa in range(2):
+        with _lock:
+            linha = _db().execute("""SELECT t.texto FROM arquivos a
+                                     JOIN documentos d ON d.sha = a.sha
+                                     JOIN textos t ON t.rowid = d.id
+                                     WHERE a.caminho = ? AND a.tamanho = ?""",
+                                  (caminho, os.path.getsize(caminho))).fetchone()
+        if linha or tentativa:
+            break
+        try:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "indexar", caminho],
+                           timeout=TIMEOUT_EXTRACAO)
+        except subprocess.TimeoutExpired:
+            print("⚠️ Extração de texto demorou demais:", caminho)
+            return None
+    return linha[0] if linha else None
+
+
+# =========== Consulta ===========
+def _consulta_fts(consulta: str) -> str:
+    """Cada palavra entre aspas (pontuação como "123/2025" não vira sintaxe do FTS5)."""
+    return " ".join('"%s"' % p.replace('"', '""') for p in consulta.split())
+
+
+def buscar(consulta: str, limite: int = 20, bruta: bool = False) -> List[Dict]:
+    """
+    Documentos com todas as palavras da consulta, mais relevantes primeiro:
+    {"sha", "trecho", "caminhos"}. bruta=True passa a consulta direto ao FTS5
+    (OR, NEAR, "frase exata", prefixo*).
+    """
+    with _lock:
+        linhas = _db().execute(
+            """SELECT d.sha, snippet(textos, 0, '[', ']', ' … ', ?) FROM textos
+               JOIN documentos d ON d.id = textos.rowid
+               WHERE textos MATCH ? ORDER BY bm25(textos) LIMIT ?""",
+            (TAMANHO_TRECHO, consulta if bruta else _consulta_fts(consulta), limite)).fetchall()
+        saida = []
+        for sha, trecho in linhas:
+            caminhos = [c for (c,) in _db().execute("SELECT caminho FROM arquivos WHERE sha = ?", (sha,))]
+            saida.append({"sha": sha, "trecho": " ".join(trecho.split()), "caminhos": caminhos})
+    return saida
+
+
+# =========== Regras sobre o corpo do PDF ===========
+def aplicar_regras(item: Dict, caminho_pdf: Optional[str], lista: List[Dict]) -> List[Dict]:
+    """
+    Regras da lista que olham o corpo do PDF (regras.do_pdf) contra o anexo de
+    um item já escolhido pela listagem. As que casarem somam seus destinos aos
+    do item e são citadas na mensagem. Devolve as regras casadas.
+    """
+    do_pdf = regras.do_pdf(lista)
+    if not do_pdf or not caminho_pdf or "regras_pdf" in item:
+        return []
+    texto = texto_de(caminho_pdf)
+    if not texto:
+        return []
+    casadas = regras.avaliar({regras.CAMPO_PDF: texto}, regras.compilar(do_pdf))
+    item["regras_pdf"] = regras.nomes(casadas)
+    if casadas:
+        destinos = list(item.get("destinos") or [])
+        destinos += [n for n in regras.destinos(casadas, destinos) if n not in destinos]
+        item["destinos"] = destinos
+        item["mensagem"] = f"{item['mensagem']}\n📄 No PDF: {', '.join(item['regras_pdf'])}"
+        print("📄 Regras casadas no corpo do PDF:", ", ".join(item["regras_pdf"]))
+    return casadas
+
+
+def main(args: List[str]):
+    if args[:1] == ["indexar"]:
+        if hasattr(os, "nice"):
+            os.nice(10)
+        indexar(args[1:] or None)
+    elif args[:1] == ["buscar"] and len(args) > 1:
+        t0 = perf_counter()
+        resultados = buscar(" ".join(args[1:]))
+        ms = (perf_counter() - t0) * 1000
+        for r in resultados:
+            print(f"• {r['caminhos'][0] if r['caminhos'] else r['sha'][:12]}\n    {r['trecho']}")
+        print(f"{len(resultados)} resultado(s) em {ms:.1f} ms")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
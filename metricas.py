@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas dos monitores (leve, sem dependências): contadores, medidores e
+histogramas de latência por etapa, com rótulos.
+
+- contar("http_requisicoes", metodo="GET", status=200)
+- definir("fila_profundidade", 3, fonte="urgencia", etapa="envio")
+- observar("etapa_segundos", 0.12, fonte="urgencia", etapa="parse")
+- @etapa("urgencia", "busca") ou `with tempo("urgencia", "busca"):` —
+  mede a duração de uma etapa em etapa_segundos{fonte, etapa}
+
+Saídas:
+- texto_prometheus(): formato de exposição do Prometheus; servir(porta)
+  o publica em http://127.0.0.1:<porta>/metrics (thread em segundo plano)
+- gravar_jsonl(): acrescenta um retrato de tudo numa linha de
+  <estado>/metricas.jsonl, girando o arquivo em MAX_BYTES (GUARDAR cópias)
+
+Nomes das etapas: busca, parse, filtro, dedupe, planilha, sonda, download,
+envio, sync, ciclo (as mesmas do bench/bench_ciclo.py).
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import estado
+
+BALDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)   # segundos
+PORTA = int(os.environ.get("MONITOR_AL_METRICAS_PORTA") or 0)   # 0 = sem endpoint
+ARQUIVO = "metricas.jsonl"
+MAX_BYTES = 2 * 1024 * 1024
+GUARDAR = 3
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_contadores: Dict[Tuple[str, Rotulos], float] = {}
+_medidores: Dict[Tuple[str, Rotulos], float] = {}
+_histogramas: Dict[Tuple[str, Rotulos], list] = {}   # [contagens por balde..., soma, total]
+_servidor = None   # http.server.ThreadingHTTPServer, importado só em servir()
+
+
+def _rotulos(rotulos: Dict) -> Rotulos:
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+# =========== Registro ===========
+def contar(nome: str, valor: float = 1, **rotulos):
+    chave = (nome, _rotulos(rotulos))
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def definir(nome: str, valor: float, **rotulos):
+    with _lock:
+        _medidores[(nome, _rotulos(rotulos))] = valor
+
+
+def observar(nome: str, valor: float, **rotulos):
+    chave = (nome, _rotulos(rotulos))
+    with _lock:
+        h = _histogramas.get(chave)
+        if h is None:
+            h = _histogramas[chave] = [0] * len(BALDES) + [0.0, 0]
+        for i, limite in enumerate(BALDES):
+            if valor <= limite:
+                h[i] += 1
+                break
+        h[-2] += valor
+        h[-1] += 1
+
+
+@contextmanager
+def tempo(fonte: str, nome_etapa: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar("etapa_segundos", time.perf_counter() - t0, fonte=fonte, etapa=nome_etapa)
+
+
+def etapa(fonte: str, nome_etapa: str):
+    """Decorador: mede cada chamada da função como uma etapa da fonte."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kw):
+            with tempo(fonte, nome_etapa):
+                return funcao(*args, **kw)
+        return medida
+    return decorador
+
+
+def zerar():
+    with _lock:
+        _contadores.clear()
+        _medidores.clear()
+        _histogramas.clear()
+
+
+# =========== Saídas ===========
+def retrato() -> Dict:
+    """Tudo o que foi medido até agora, em estruturas simples (JSON)."""
+    with _lock:
+        def lista(d):
+            return [{"nome": n, "rotulos": dict(r), "valor": v} for (n, r), v in sorted(d.items())]
+        hist = []
+        for (n, r), h in sorted(_histogramas.items()):
+            hist.append({"nome": n, "rotulos": dict(r), "baldes": dict(zip(map(str, BALDES), h[:-2])),
+                         "soma": round(h[-2], 6), "total": h[-1]})
+        return {"quando": datetime.now().isoformat(timespec="seconds"),
+                "contadores": lista(_contadores), "medidores": lista(_medidores), "histogramas": hist}
+
+
+def _fmt(rotulos: Rotulos, extra: Rotulos = ()) -> str:
+    todos = rotulos + extra
+    if not todos:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in todos) + "}"
+
+
+def texto_prometheus() -> str:
+    linhas = []
+    with _lock:
+        for tipo, dados in (("counter", _contadores), ("gauge", _medidores)):
+            vistos = set()
+            for (n, r), v in sorted(dados.items()):
+                if n not in vistos:
+                    vistos.add(n)
+                    linhas.append(f"# TYPE monitor_al_{n} {tipo}")
+                linhas.append(f"monitor_al_{n}{_fmt(r)} {v:g}")
+        vistos = set()
+        for (n, r), h in sorted(_histogramas.items()):
+            if n not in vistos:
+                vistos.add(n)
+                linhas.append(f"# TYPE monitor_al_{n} histogram")
+            acumulado = 0
+            for limite, c in zip(BALDES, h[:-2]):
+                acumulado += c
+                linhas.append(f"monitor_al_{n}_bucket{_fmt(r, (('le', f'{limite:g}'),))} {acumulado}")
+            linhas.append(f"monitor_al_{n}_bucket{_fmt(r, (('le', '+Inf'),))} {h[-1]}")
+            linhas.append(f"monitor_al_{n}_sum{_fmt(r)} {h[-2]:.6f}")
+            linhas.append(f"monitor_al_{n}_count{_fmt(r)} {h[-1]}")
+    return "\n".join(linhas) + "\n"
+
+
+def servir(porta: int = 0) -> Optional[int]:
+    """Sobe o endpoint /metrics em 127.0.0.1 (uma vez por processo). Devolve a porta."""
+    global _servidor
+    porta = porta or PORTA
+    if not porta:
+        return None
+    if _servidor is not None:
+        return _servidor.server_address[1]
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            corpo = texto_prometheus().encode("utf-8")
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    _servidor = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+    _servidor.daemon_threads = True
+    threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
+    print(f"📊 Métricas em http://127.0.0.1:{_servidor.server_address[1]}/metrics")
+    return _servidor.server_address[1]
+
+
+def gravar_jsonl(caminho: Optional[str] = None):
+    """
+    Acrescenta um retrato ao JSONL, girando (.1, .2, ...) quando passa de
+    MAX_BYTES. Falha de disco só é avisada (métrica não derruba o monitor).
+    """
+    caminho = caminho or estado.caminho(ARQUIVO)
+    linha = json.dumps(retrato(), ensure_ascii=False) + "\n"
+    try:
+        with _lock:
+            if os.path.exists(caminho) and os.path.getsize(caminho) + len(linha) > MAX_BYTES:
+                for i in range(GUARDAR - 1, 0, -1):
+                    if os.path.exists(f"{caminho}.{i}"):
+                        os.replace(f"{caminho}.{i}", f"{caminho}.{i + 1}")
+                os.replace(caminho, f"{caminho}.1")
+            with open(caminho, "a", encoding="utf-8") as f:
+                f.write(linha)
+    except OSError as e:
+        print("⚠️ Não gravei as métricas:", e)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Monitor ALECE — executor único (Android/Termux)
+
+Roda todos os monitores num só processo Python, em vez de um `while True`
++ sleep por script: cada fonte registrada aqui (módulo com executar_ciclo()
+ou fonte genérica de links) é agendada com seu próprio ritmo e os ciclos
+são executados um de cada vez. O ritmo parte do intervalo da fonte e se
+adapta (agenda.py): mais rápido nas sessões do Plenário e logo depois de
+uma novidade, mais lento à noite, no fim de semana e enquanto nada muda.
+"fixo": True numa entrada de FONTES mantém o intervalo fixo (com jitter).
+
+Depois de um ciclo com novidades, os PDFs novos entram no índice de texto
+(indice_pdf.py) num processo à parte.
+
+Métricas (metricas.py): depois de cada ciclo um retrato vai para
+<estado>/metricas.jsonl; com MONITOR_AL_METRICAS_PORTA=9464 também ficam em
+http://127.0.0.1:9464/metrics (formato Prometheus).
+
+Uso:
+  python monitor_al.py                   # todas as fontes de FONTES
+  python monitor_al.py urgencia avulso   # só as fontes escolhidas
+
+Os scripts monitor_*.py continuam funcionando sozinhos (main_loop).
+"""
+
+import sys
+import heapq
+import importlib
+from time import sleep, monotonic
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import agenda
+import indice_pdf
+import metricas
+import sender_servico
+
+# =========== CONFIG ===========
+# "modulo": script com executar_ciclo() (o intervalo padrão é o INTERVALO_SEGUNDOS dele)
+# "tipo": "links": página nova, sem script próprio (ver fonte_links.py)
+# opcionais: "janelas" (calendário próprio, ver agenda.JANELAS), "fixo": True (sem ritmo adaptativo)
+FONTES: List[Dict] = [
+    {"nome": "urgencia",   "modulo": "monitor_urgencia_androi"},
+    {"nome": "expediente", "modulo": "monitor_expediente_android"},
+    {"nome": "avulso",     "modulo": "monitor_avulso_android"},
+    # {"nome": "ordem_do_dia", "tipo": "links",
+    #  "url": "https://www.al.ce.gov.br/legislativo/ordem-do-dia/avulso-de-projeto",
+    #  "palavras": ["projeto de lei"], "destinos": ["558588227227"], "intervalo": 1800},
+]
+ESCALONAR_INICIO = 5  # s entre os primeiros ciclos de cada fonte
+
+
+def carregar_fonte(cfg: Dict) -> Dict:
+    """Transforma uma entrada de FONTES em {nome, ciclo, intervalo, ritmo}."""
+    if cfg.get("tipo") == "links":
+        import fonte_links
+        ciclo: Callable[[], int] = fonte_links.criar_ciclo(cfg)
+        intervalo = cfg.get("intervalo", 1800)
+    else:
+        mod = importlib.import_module(cfg["modulo"])
+        ciclo = mod.executar_ciclo
+        if hasattr(mod, "esteira"):
+            mod.esteira()   # retoma a caixa de saída já, sem esperar o 1º ciclo
+        intervalo = cfg.get("intervalo") or getattr(mod, "INTERVALO_SEGUNDOS", 1800)
+    ritmo = agenda.Ritmo(intervalo, janelas=cfg.get("janelas"), fixo=bool(cfg.get("fixo")))
+    return {"nome": cfg["nome"], "ciclo": ciclo, "intervalo": intervalo, "ritmo": ritmo}
+
+
+def executar(fontes: List[Dict]):
+    horarios = [(monotonic() + i * ESCALONAR_INICIO, i) for i in range(len(fontes))]
+    heapq.heapify(horarios)
+    indexar = True   # 1ª vez depois do 1º ciclo: não disputa CPU com a partida
+    while horarios:
+        quando, i = heapq.heappop(horarios)
+        espera = quando - monotonic()
+        if espera > 0:
+            sleep(espera)
+        f = fontes[i]
+        print(f">>> [{f['nome']}] iniciando ciclo — {datetime.now().strftime('%H:%M:%S')}")
+        novos = 0
+        try:
+            with metricas.tempo(f["nome"], "ciclo"):
+                novos = f["ciclo"]()
+            print(f"<<< [{f['nome']}] fim do ciclo ({novos or 0} novo(s))")
+            metricas.contar("ciclos", fonte=f["nome"], resultado="ok")
+            metricas.contar("novos", novos or 0, fonte=f["nome"])
+        except Exception as e:
+            print(f"Erro no ciclo [{f['nome']}]:", e)
+            metricas.contar("ciclos", fonte=f["nome"], resultado="erro")
+        if novos or indexar:
+            indice_pdf.em_segundo_plano()   # PDFs novos no índice de texto (processo à parte)
+            indexar = False
+        intervalo = f["ritmo"].proximo(novos)
+        metricas.definir("proximo_ciclo_segundos", intervalo, fonte=f["nome"])
+        metricas.gravar_jsonl()
+        print(f"⏰ [{f['nome']}] próximo ciclo em {intervalo:.0f}s")
+        heapq.heappush(horarios, (monotonic() + intervalo, i))
+
+
+def main(nomes: List[str]):
+    escolhidas = [c for c in FONTES if not nomes or c["nome"] in nomes]
+    if not escolhidas:
+        print("Nenhuma fonte com esses nomes:", ", ".join(nomes))
+        return
+    fontes = [carregar_fonte(c) for c in escolhidas]
+    metricas.servir()   # só se MONITOR_AL_METRICAS_PORTA estiver definida
+    print("📡 Fontes:", ", ".join(f"{f['nome']} ({f['intervalo']}s)" for f in fontes))
+    try:
+        executar(fontes)
+    except KeyboardInterrupt:
+        print("\nInterrompido pelo usuário.")
+    finally:
+        sender_servico.parar_daemon()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,90 +2,83 @@
 """
 Expediente ALECE — Android/Termux (Requests + BS4)
 Versão integrada com OneDrive:
-- Faz download da planilha antes de ler (rclone copy --update -v)
-- Faz upload após registrar novas publicações
+- Baixa a planilha antes de ler, só se ela mudou no OneDrive (sincronia.py)
+- Registro de enviados em SQLite; a planilha é exportada a cada upload
+- Faz upload (em segundo plano, um por ciclo) após registrar novas publicações
+- Download do PDF e envio rodam na esteira (fila.py), fora da varredura
 - Exibe logs do rclone em tempo real
-- Só salva se existir a palavra-chave (ex: "mensagem") e pelo menos um número
+- Só salva se casar com as REGRAS (padrão: a palavra-chave, ex: "mensagem") e tiver pelo menos um número
 """
 
-import os, re, shlex, subprocess, unicodedata
+import os, re, subprocess
 from time import sleep
 from datetime import datetime
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-import requests
-from bs4 import BeautifulSoup
-from openpyxl import Workbook, load_workbook
+from typing import List, Dict, Optional, Tuple, Union
+
+import agenda
+import cache_pdf
+import fila
+import sincronia
+import http_cliente
+import indice_pdf
+import metricas
+import parser_html
+import regras
+import registro
+import sender_servico
 
 # ======== CONFIGURAÇÕES ========
+INTERVALO_SEGUNDOS = 1800  # 30 min
 URL = "https://www.al.ce.gov.br/legislativo/ordem-do-dia/avulso-de-projeto"
 HEADERS = {"User-Agent": "Mozilla/5.0 (Linux; Android 13) Chrome Mobile Safari/537.36"}
 BASE_DIR = "/data/data/com.termux/files/home/storage/documents/escaner"
 PASTA_PDFS = os.path.join(BASE_DIR, "mensagens"); os.makedirs(PASTA_PDFS, exist_ok=True)
-ARQ_EXCEL = os.path.join(BASE_DIR, "mensagens_encontradas_avulso.xlsx")
+ARQ_REGISTRO = os.path.join(BASE_DIR, "mensagens_encontradas_avulso.sqlite3")
+ARQ_EXCEL = os.path.join(BASE_DIR, "mensagens_encontradas_avulso.xlsx")  # exportada p/ OneDrive
 ABA_EXCEL = "encontradas"
 NUMEROS_DESTINO = ["558588227227"]
 # NUMEROS_DESTINO = ["558588227227", "558597159955", "558587262526", "558596195560, 558581645454"]
+AGRUPAR_ENVIOS = 0  # s; >0 = modo resumo (uma mensagem por grupo de destinos, ver fila.py)
 SENDER_CANDIDATOS = ["/storage/emulated/0/Documents/escaner/sender_baileys.js"]
 
 # ======== PALAVRA-CHAVE ALTERÁVEL ========
 # Basta trocar o valor abaixo por "projeto", "decreto", "indicação", etc.
 PALAVRA_CHAVE = "mensagem"
+# Mais assuntos na mesma varredura: acrescente regras (ver regras.py).
+# Campo "texto" = texto do link + do elemento pai; regra sem "destinos" usa NUMEROS_DESTINO.
+REGRAS = [
+    {"nome": "avulso", "palavras": [PALAVRA_CHAVE], "campos": ["texto"]},
+]
 
 # ======== EXPRESSÕES REGULARES ========
 RX_NUM_ANO = re.compile(r"\b(\d{1,5})/(\d{4})\b")  # ex: 85/2025
 RX_MENSAGEM = re.compile(r"mensagem\s*n[º°]?\s*\.?\s*(\d{1,6})", re.IGNORECASE)
 
-# ======== SINCRONIZAÇÃO COM ONEDRIVE ========
-def executar_rclone(comando: str):
-    print("▶️ Executando:", comando)
-    proc = subprocess.Popen(comando, shell=True, text=True)
-    proc.communicate()
-    if proc.returncode == 0:
-        print("✅ rclone finalizado com sucesso.\n")
-    else:
-        print(f"⚠️ rclone terminou com código {proc.returncode}.\n")
+# ======== SINCRONIZAÇÃO COM ONEDRIVE (ver sincronia.py) ========
+REMOTO_DIR = "onedrive:/Gabinete/site/listas"
 
+@metricas.etapa("avulso", "sync")
 def baixar():
-    remote_dir = "onedrive:/Gabinete/site/listas"
-    print("📥 Baixando planilha do OneDrive...")
-    executar_rclone(f"rclone copy {remote_dir} {BASE_DIR} --update -v")
-    print("✅ Baixa finalizada.\n")
+    """Baixa as planilhas só se mudaram no OneDrive (uma listagem por ciclo)."""
+    sincronia.baixar_se_mudou(REMOTO_DIR, BASE_DIR)
+
+def exportar_planilha():
+    registro.exportar_excel(registro.abrir(ARQ_REGISTRO), ARQ_EXCEL, ABA_EXCEL, ("chave", "data"))
 
 def upload():
-    remote_dir = "onedrive:/Gabinete/site/listas"
-    print("📤 Enviando planilha para OneDrive...")
-    executar_rclone(f"rclone copy {ARQ_EXCEL} {remote_dir} --update -v")
-    print("✅ Upload finalizado.\n")
+    """Agenda o envio da planilha; roda em segundo plano, sem segurar os alertas."""
+    sincronia.pedir_upload(ARQ_EXCEL, REMOTO_DIR, exportar_planilha)
 
 # ======== FUNÇÕES DE APOIO ========
-def normalize(s: str) -> str:
-    if not s: return ""
-    t = unicodedata.normalize("NFD", s)
-    return "".join(c for c in t if unicodedata.category(c) != "Mn").lower()
-
-def excel_init():
-    p = Path(ARQ_EXCEL)
-    if p.exists():
-        wb = load_workbook(ARQ_EXCEL)
-        ws = wb[ABA_EXCEL] if ABA_EXCEL in wb.sheetnames else wb.create_sheet(ABA_EXCEL)
-    else:
-        wb = Workbook(); ws = wb.active
-        ws.title = ABA_EXCEL; ws.append(["chave", "data"])
-        wb.save(ARQ_EXCEL)
-    return wb, ws
-
-def enviados_carregar() -> set:
-    wb, ws = excel_init(); out = set()
-    for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row and row[0]:
-            out.add(str(row[0]).strip())
-    return out
+@metricas.etapa("avulso", "dedupe")
+def enviados_carregar():
+    reg = registro.abrir(ARQ_REGISTRO)
+    # mescla a planilha baixada do OneDrive (só relê se ela mudou)
+    registro.importar_excel(reg, ARQ_EXCEL, ABA_EXCEL)
+    return reg
 
 def enviados_salvar(chave: str):
-    wb, ws = excel_init()
-    ws.append([chave, datetime.now().strftime("%d/%m/%Y %H:%M")])
-    wb.save(ARQ_EXCEL)
+    registro.abrir(ARQ_REGISTRO).add(chave)
 
 def localizar_sender_js() -> Tuple[str, str]:
     for caminho in SENDER_CANDIDATOS:
@@ -101,46 +94,57 @@ def checar_node():
     except FileNotFoundError:
         raise RuntimeError("Instale Node: pkg install -y nodejs-lts")
 
-def enviar_mensagem(numeros: List[str], mensagem: str, caminho_pdf: Optional[str] = None):
-    checar_node()
+def enviar_mensagem(numeros: List[str], mensagem: str, caminho_pdf: Union[str, List[str], None] = None,
+                    id_envio: Optional[str] = None, resumo: Optional[Dict] = None):
+    """Um PDF ou vários (resumo); levanta sender_servico.EnvioFalhou se o envio não for confirmado."""
     sender_js, cwd = localizar_sender_js()
-    args = ["node", sender_js, ",".join(numeros), mensagem]
-    if caminho_pdf and os.path.isfile(caminho_pdf) and os.path.getsize(caminho_pdf) > 0:
-        args.append(caminho_pdf)
-    print("▶️ Enviando:", " ".join(shlex.quote(a) for a in args))
-    proc = subprocess.Popen(args, cwd=cwd)
-    proc.wait()
-    if proc.returncode != 0:
-        print(f"⚠️ enviar_mensagem.js saiu com código {proc.returncode}")
+    caminho_pdf = sender_servico.pdfs_validos(caminho_pdf)
+    try:
+        if not sender_servico.enviar(numeros, mensagem, caminho_pdf, cwd, id_envio, resumo):
+            raise sender_servico.EnvioFalhou("sender_daemon recusou o envio")
+        return
+    except sender_servico.SenderIndisponivel as e:
+        print("ℹ️ sender_daemon indisponível — usando processo único:", e)
+    checar_node()
+    sender_servico.processo_unico(sender_js, numeros, mensagem, caminho_pdf)
 
 def download_pdf(url, download_dir):
+    """PDF em download_dir pelo cache compartilhado (cache_pdf.py): streaming, e sem rede se já estiver lá."""
     from urllib.parse import urlparse
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=60)
-        if r.status_code != 200:
-            print(f"❌ HTTP {r.status_code} ao baixar {url}")
-            return None
-        os.makedirs(download_dir, exist_ok=True)
-        path = urlparse(url).path
-        parts = path.strip("/").split("/")
-        arq = parts[-1]
-        dest = os.path.join(download_dir, arq)
-        with open(dest, "wb") as f:
-            f.write(r.content)
-        if os.path.getsize(dest) <= 0:
-            print("⚠️ PDF 0B:", dest)
-            return None
+    arq = urlparse(url).path.strip("/").split("/")[-1]
+    dest = cache_pdf.baixar(url, os.path.join(download_dir, arq), HEADERS)
+    if dest:
         print("✅ Baixado:", dest)
-        return dest
-    except Exception as e:
-        print("⚠️ Exceção ao baixar:", e)
-        return None
+    return dest
+
+# ======== ESTEIRA (download + envio fora da varredura) ========
+def baixar_anexo(item: Dict) -> Optional[str]:
+    pdf = download_pdf(item["pdf_url"], PASTA_PDFS)
+    indice_pdf.aplicar_regras(item, pdf, REGRAS)  # regras com "campos": ["texto_pdf"]
+    return pdf
+
+def enviar_alerta(item: Dict, caminho_pdf: Union[str, List[str], None]):
+    enviar_mensagem(item["destinos"], item["mensagem"], caminho_pdf, item.get("id_envio"), item.get("resumo"))
+    print("✅ Enviado:", item["chave"])
+    sleep(2)
+
+def esteira() -> fila.Esteira:
+    return fila.obter("avulso", baixar_anexo, enviar_alerta, agrupar=AGRUPAR_ENVIOS)
 
 # ======== COLETA DE LINKS ========
-def coletar_mensagens() -> List[Dict]:
-    r = requests.get(URL, headers=HEADERS, timeout=60)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+@metricas.etapa("avulso", "busca")
+def baixar_pagina():
+    """Resposta da página, ou None se ela não mudou desde o último ciclo."""
+    return http_cliente.get_se_mudou(URL, headers=HEADERS)
+
+@metricas.etapa("avulso", "parse")
+def coletar_mensagens(html: Optional[str] = None, compiladas: Optional[Dict] = None) -> List[Dict]:
+    compiladas = compiladas or regras.compilar(REGRAS)
+    if html is None:
+        r = http_cliente.get(URL, headers=HEADERS)
+        r.raise_for_status()
+        html = r.text
+    soup = parser_html.soup(html)
 
     itens = []
     for a in soup.find_all("a", href=True):
@@ -151,8 +155,9 @@ def coletar_mensagens() -> List[Dict]:
         titulo = a.get_text(" ", strip=True)
         texto = titulo + " " + a.parent.get_text(" ", strip=True)
 
-        # Verifica se contém a palavra-chave configurada
-        if PALAVRA_CHAVE not in normalize(texto):
+        # Verifica as regras configuradas (todas numa passada)
+        casadas = regras.avaliar({"texto": texto}, compiladas)
+        if not casadas:
             continue
 
         # Extrai números principais e de "mensagem"
@@ -184,7 +189,7 @@ def coletar_mensagens() -> List[Dict]:
                 break
             if getattr(sib, "name", None) == "br":
                 continue
-            txt = BeautifulSoup(str(sib), "html.parser").get_text(" ", strip=True)
+            txt = parser_html.texto(sib)
             if txt:
                 descricao = txt
                 break
@@ -196,43 +201,63 @@ def coletar_mensagens() -> List[Dict]:
             "titulo": titulo,
             "descricao": descricao,
             "pdf_url": href,
-            "chave": chave
+            "chave": chave,
+            "regras": casadas
         })
 
     return itens
 
 # ======== LOOP PRINCIPAL ========
+def executar_ciclo() -> int:
+    """Uma varredura completa; devolve quantos alertas novos foram enfileirados."""
+    novos = 0
+    esteira()  # retoma o que ficou na fila da execução anterior
+    baixar()
+    enviados = enviados_carregar()
+    resp = baixar_pagina()
+    if resp is None:
+        print("⏸️ Página sem mudanças desde o último ciclo.")
+    itens = coletar_mensagens(resp.text) if resp is not None else []
+    print(f"🔎 Encontrados {len(itens)} links para as regras {[r['nome'] for r in REGRAS]}")
+
+    for it in itens:
+        chave = it["chave"]
+        if chave in enviados:
+            print("🔁 Já enviado:", chave)
+            continue
+
+        prefixo = regras.prefixo(it["regras"], "Votação do seguinte Projeto:")
+        mensagem = f"{prefixo} {it['titulo']} {it['descricao']}".strip()
+        # caixa de saída antes do registro: uma queda entre os dois não perde nem repete o alerta
+        if esteira().enfileirar(chave, {"mensagem": mensagem, "pdf_url": it["pdf_url"], "chave": chave,
+                                        "destinos": regras.destinos(it["regras"], NUMEROS_DESTINO)}):
+            novos += 1
+        enviados_salvar(chave)
+        print("📥 Na fila e registrado:", chave)
+
+    if novos:
+        upload()   # um por ciclo; a planilha sai do registro, que já tem os novos
+    if resp is not None:
+        http_cliente.confirmar(resp)
+    return novos
+
 def main_loop():
+    ritmo = agenda.Ritmo(INTERVALO_SEGUNDOS)   # adaptativo (ver agenda.py)
     while True:
+        novos = 0
         try:
-            baixar()
-            enviados = enviados_carregar()
-            itens = coletar_mensagens()
-            print(f"🔎 Encontrados {len(itens)} links contendo '{PALAVRA_CHAVE}'")
-
-            for it in itens:
-                chave = it["chave"]
-                if chave in enviados:
-                    print("🔁 Já enviado:", chave)
-                    continue
-
-                mensagem = f"Votação do seguinte Projeto: {it['titulo']} {it['descricao']}".strip()
-                caminho_pdf = download_pdf(it["pdf_url"], PASTA_PDFS)
-                enviar_mensagem(NUMEROS_DESTINO, mensagem, caminho_pdf)
-                enviados_salvar(chave)
-                upload()
-                print("✅ Enviado e registrado:", chave)
-                sleep(2)
-
+            novos = executar_ciclo()
         except KeyboardInterrupt:
             print("\nInterrompido.")
             return
         except Exception as e:
             print("Erro no loop:", e)
 
+        metricas.gravar_jsonl()
+        espera = ritmo.proximo(novos)
         hh = datetime.now().strftime("%H:%M:%S")
-        print(f"⏰ Horário: {hh} — dormindo 1800s\n")
-        sleep(1800)
+        print(f"⏰ Horário: {hh} — dormindo {espera:.0f}s\n")
+        sleep(espera)
 
 if __name__ == "__main__":
     main_loop()
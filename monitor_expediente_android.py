@@ -3,12 +3,13 @@
 """
 Expediente ALECE — Android/Termux (Requests + BS4)
 - Varre https://www.al.ce.gov.br/legislativo/expediente
-- Coleta TODOS os <a href> cujo texto contenha "Mensagem"
+- Coleta os <a href> cujo texto casa com as REGRAS (padrão: contém "Mensagem")
   (funciona para <b><a>…</a></b> e para <a><b>…</b></a>)
 - Extrai numero/ano (####/####) e descrição após o link
 - Baixa o PDF diretamente do href
 - Envia via sender_baileys.js (Node) com/sem anexo
-- Registra no Excel para não duplicar
+- Download e envio rodam na esteira (fila.py), fora da varredura
+- Registra no registro SQLite para não duplicar (Excel só como exportação)
 
 Dependências (uma vez):
   pkg update -y && pkg install -y python nodejs-lts
@@ -27,83 +28,82 @@ Dica: teste o sender sozinho antes:
   node sender_baileys.js "5585SEUNUMERO" "teste"
 """
 
-import os, re, shlex, subprocess, unicodedata
+import os, re, subprocess
 from time import sleep
 from datetime import datetime
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-import requests
-from bs4 import BeautifulSoup
-from openpyxl import Workbook, load_workbook
 
+import agenda
+import cache_pdf
+import fila
+import http_cliente
+import indice_pdf
+import metricas
+import normalizacao
+import parser_html
+import regras
+import registro
+import sender_servico
+
+INTERVALO_SEGUNDOS = 1800  # 30 min
 URL = "https://www.al.ce.gov.br/legislativo/expediente"
 HEADERS = {"User-Agent":"Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36"}
 
 BASE_DIR   = r"C:\Users\FABIO\OneDrive\Gabinete\site\listas"
 PASTA_PDFS = os.path.join(BASE_DIR, "mensagens"); os.makedirs(PASTA_PDFS, exist_ok=True)
+ARQ_REGISTRO = os.path.join(BASE_DIR, "mensagens_encontradas.sqlite3")
 ARQ_EXCEL  = os.path.join(BASE_DIR, "mensagens_encontradas.xlsx"); ABA_EXCEL="encontradas"
 #NUMEROS_DESTINO2 = ["558588227227"]
 NUMEROS_DESTINO2 = ["558588227227", "558597159955", "558596195560"]
 #NUMEROS_DESTINO = ["558588227227"]
 NUMEROS_DESTINO = ["558588227227", "558597159955", "558587262526", "558596195560"]
+AGRUPAR_ENVIOS = 0  # s; >0 = modo resumo (uma mensagem por grupo de destinos, ver fila.py)
 # SENDER_CANDIDATOS = [os.path.join(BASE_DIR, "enviar_mensagem.js"),
 #                       "/data/data/com.termux/files/home/bot/enviar_mensagem.js"]
 SENDER_CANDIDATOS = [
     r"C:\Users\FABIO\OneDrive\Gabinete\site\enviar_mensagem.js",                 # ~/bot
     "/storage/emulated/0/Documents/escaner/sender_baileys.js",               # sdcard/Documentos/escaner
 ] 
+# Regras de filtragem dos links (ver regras.py); campo "titulo" = texto do link.
+# Regra sem "destinos" usa NUMEROS_DESTINO (NUMEROS_DESTINO2 depois das 16h).
+REGRAS = [
+    {"nome": "mensagem", "palavras": ["mensagem"], "campos": ["titulo"]},
+]
 RX_NUM_ANO   = re.compile(r"\b(\d{2,5})/(\d{2,4})\b")
 RX_NUMERO2   = re.compile(r"\b(\d{1,2}\.\d{3}|\d{3,5})\b")
 
 def normalize(s:str)->str:
-    if not s: return ""
-    t = unicodedata.normalize("NFD", s)
-    return "".join(c for c in t if unicodedata.category(c)!="Mn").lower()
+    return normalizacao.dobrar(s)
 
 def tem_mensagem(txt:str)->bool:
-    return "mensagem" in normalize(txt)
-
-# ---- Excel
-def excel_init():
-    p=Path(ARQ_EXCEL)
-    if p.exists():
-        wb=load_workbook(ARQ_EXCEL)
-        ws=wb[ABA_EXCEL] if ABA_EXCEL in wb.sheetnames else wb.create_sheet(ABA_EXCEL)
-    else:
-        wb=Workbook(); ws=wb.active; ws.title=ABA_EXCEL; ws.append(["numero"]); wb.save(ARQ_EXCEL)
-    return wb,ws
-def enviados_carregar()->set:
-    wb,ws=excel_init(); out=set()
-    for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row and row[0]: out.add(str(row[0]).strip())
-    return out
+    return normalizacao.contem(txt, "mensagem")
+
+# ---- Registro (dedupe; Excel só como exportação)
+@metricas.etapa("expediente", "dedupe")
+def enviados_carregar():
+    reg=registro.abrir(ARQ_REGISTRO)
+    registro.importar_excel(reg, ARQ_EXCEL, ABA_EXCEL)  # migra a planilha antiga
+    return reg
 def enviados_salvar(num_ano:str):
-    wb,ws=excel_init(); ws.append([num_ano]); wb.save(ARQ_EXCEL)
+    registro.abrir(ARQ_REGISTRO).add(num_ano)
 
 # ---- sua função de download (baixa diretamente o href do <a>)
 def download_pdf(url, download_dir):
+    """PDF em download_dir pelo cache compartilhado (cache_pdf.py): streaming, e sem rede se já estiver lá."""
     from urllib.parse import urlparse
-    try:
-        r=requests.get(url, headers=HEADERS, timeout=60)
-        if r.status_code!=200:
-            print(f"❌ HTTP {r.status_code} ao baixar {url}"); return None
-        os.makedirs(download_dir, exist_ok=True)
-        path=urlparse(url).path  # /legislativo/tramit2025/9406.pdf
-        parts=path.strip("/").split("/")
-        ano=""
-        for p in parts:
-            if p.startswith("tramit") and p[6:].isdigit(): ano=p[6:]; break
-        arq=parts[-1]; numero=os.path.splitext(arq)[0]
-        nome=f"Mensagem_{ano}_{numero}.pdf" if ano else arq
-        dest=os.path.join(download_dir, nome)
-        with open(dest,"wb") as f: f.write(r.content)
-        if os.path.getsize(dest)<=0: print("⚠️ PDF 0B:",dest); return None
-        print("✅ Baixado:",dest); return dest
-    except Exception as e:
-        print("⚠️ Exceção ao baixar:",e); return None
+    path=urlparse(url).path  # /legislativo/tramit2025/9406.pdf
+    parts=path.strip("/").split("/")
+    ano=""
+    for p in parts:
+        if p.startswith("tramit") and p[6:].isdigit(): ano=p[6:]; break
+    arq=parts[-1]; numero=os.path.splitext(arq)[0]
+    nome=f"Mensagem_{ano}_{numero}.pdf" if ano else arq
+    dest=cache_pdf.baixar(url, os.path.join(download_dir, nome), HEADERS)
+    if dest: print("✅ Baixado:",dest)
+    return dest
 
 # ---- envio via Node
 def localizar_sender_js()->Tuple[str,str]:
@@ -116,20 +116,45 @@ def checar_node():
         if out.returncode!=0: raise RuntimeError(out.stderr.strip() or "Node indisponível")
     except FileNotFoundError:
         raise RuntimeError("Instale Node: pkg install -y nodejs-lts")
-def enviar_mensagem(numeros:List[str], mensagem:str, caminho_pdf:Optional[str]=None):
-    checar_node()
+def enviar_mensagem(numeros:List[str], mensagem:str, caminho_pdf:Union[str,List[str],None]=None, id_envio:Optional[str]=None, resumo:Optional[Dict]=None):
+    """Um PDF ou vários (resumo); levanta sender_servico.EnvioFalhou se o envio não for confirmado."""
     sender_js, cwd = localizar_sender_js()
-    args=["node", sender_js, ",".join(numeros), mensagem]
-    if caminho_pdf and os.path.isfile(caminho_pdf) and os.path.getsize(caminho_pdf)>0:
-        args.append(caminho_pdf)
-    print("▶️ Enviando:", " ".join(shlex.quote(a) for a in args))
-    proc=subprocess.Popen(args, cwd=cwd); proc.wait()
-    if proc.returncode!=0: print(f"⚠️ enviar_mensagem.js saiu com código {proc.returncode}")
-
-def coletar_mensagens() -> List[Dict]:
-    r = requests.get(URL, headers=HEADERS, verify=False, timeout=60)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+    caminho_pdf=sender_servico.pdfs_validos(caminho_pdf)
+    try:
+        if not sender_servico.enviar(numeros, mensagem, caminho_pdf, cwd, id_envio, resumo):
+            raise sender_servico.EnvioFalhou("sender_daemon recusou o envio")
+        return
+    except sender_servico.SenderIndisponivel as e:
+        print("ℹ️ sender_daemon indisponível — usando processo único:", e)
+    checar_node()
+    sender_servico.processo_unico(sender_js, numeros, mensagem, caminho_pdf)
+
+# ---- esteira: download e envio fora da varredura
+def baixar_anexo(item:Dict)->Optional[str]:
+    pdf=download_pdf(item["pdf_url"], PASTA_PDFS) if item.get("pdf_url") else None
+    indice_pdf.aplicar_regras(item, pdf, REGRAS)  # regras com "campos": ["texto_pdf"]
+    return pdf
+def enviar_alerta(item:Dict, caminho_pdf:Union[str,List[str],None]):
+    sleep(4)
+    enviar_mensagem(item["destinos"], item["mensagem"], caminho_pdf, item.get("id_envio"), item.get("resumo"))
+    print("✅ Enviado:", item["num_ano"])
+    sleep(2)
+def esteira()->fila.Esteira:
+    return fila.obter("expediente", baixar_anexo, enviar_alerta, agrupar=AGRUPAR_ENVIOS)
+
+@metricas.etapa("expediente", "busca")
+def baixar_pagina():
+    """Resposta da página, ou None se ela não mudou desde o último ciclo."""
+    return http_cliente.get_se_mudou(URL, headers=HEADERS, verify=False)
+
+@metricas.etapa("expediente", "parse")
+def coletar_mensagens(html: Optional[str] = None, compiladas: Optional[Dict] = None) -> List[Dict]:
+    compiladas = compiladas or regras.compilar(REGRAS)
+    if html is None:
+        r = http_cliente.get(URL, headers=HEADERS, verify=False)
+        r.raise_for_status()
+        html = r.text
+    soup = parser_html.soup(html)
 
     # ache o <h3> principal (o grande do expediente)
     
@@ -148,8 +173,9 @@ def coletar_mensagens() -> List[Dict]:
         titulo = a.get_text(" ", strip=True)  # já pega texto mesmo se houver <b> dentro
         if not titulo:
             continue
-        if "mensagem" not in normalize(titulo):
-            continue  # só links cujo texto contém 'Mensagem'
+        casadas = regras.avaliar({"titulo": titulo}, compiladas)
+        if not casadas:
+            continue  # só links que casam com alguma regra (padrão: texto com 'Mensagem')
 
         href = a["href"].strip()
 
@@ -177,7 +203,7 @@ def coletar_mensagens() -> List[Dict]:
                 break
             if getattr(sib, "name", None) == "br":
                 continue
-            txt = BeautifulSoup(str(sib), "html.parser").get_text(" ", strip=True)
+            txt = parser_html.texto(sib)
             if txt:
                 descricao = txt
                 break
@@ -192,60 +218,72 @@ def coletar_mensagens() -> List[Dict]:
             "titulo": titulo,
             "descricao": descricao,
             "pdf_url": href,
-            "numero2": numero2
+            "numero2": numero2,
+            "regras": casadas
         })
 
     return itens
 
 
 # ---- loop
+def executar_ciclo() -> int:
+    """Uma varredura completa; devolve quantos alertas novos foram enfileirados."""
+    novos = 0
+    esteira()  # retoma o que ficou na fila da execução anterior
+    enviados=enviados_carregar()
+    resp=baixar_pagina()
+    if resp is None: print("⏸️ Página sem mudanças desde o último ciclo.")
+    itens=coletar_mensagens(resp.text) if resp is not None else []
+    print(f"DEBUG: mensagens encontradas = {len(itens)}")
+    for it in itens:
+        print("-", it["numero"], it["ano"], "|", it["titulo"])
+    if not itens: print("Sem itens."); 
+
+    for it in itens:
+        num_ano=f"{it['numero']}/{it['ano']}"
+        if num_ano in enviados:
+            print("🔁 Já enviado:", num_ano); continue
+
+        mensagem=f"{regras.prefixo(it['regras'], 'Nova mensagem:')} {it['titulo']} {it['descricao']}".strip()
+        print("MSG:", mensagem)
+
+        num = NUMEROS_DESTINO
+        z = datetime.now()
+        zx = z.strftime('%H:%M:%S')
+        print(f'Horário: {zx}', end='\r')
+        # Verifica horários específicos
+        if zx >= '16:00:01':
+            print('NUMEROS_DESTINO2')
+            num = NUMEROS_DESTINO2
+        num = regras.destinos(it["regras"], num)
+
+        # PDF e envio ficam com a esteira; caixa de saída antes do registro
+        # (uma queda entre os dois não perde nem repete o alerta)
+        if esteira().enfileirar(num_ano, {"mensagem": mensagem, "destinos": num,
+                                          "pdf_url": it.get("pdf_url"), "num_ano": num_ano}):
+            novos += 1
+        enviados_salvar(num_ano)
+        print("📥 Na fila e registrado:", num_ano)
+
+    if resp is not None: http_cliente.confirmar(resp)
+    return novos
+
 def main_loop():
+    ritmo=agenda.Ritmo(INTERVALO_SEGUNDOS)  # adaptativo (ver agenda.py)
     while True:
+        novos=0
         try:
-            enviados=enviados_carregar()
-            itens=coletar_mensagens()
-            print(f"DEBUG: mensagens encontradas = {len(itens)}")
-            for it in itens:
-                print("-", it["numero"], it["ano"], "|", it["titulo"])
-            if not itens: print("Sem itens."); 
-
-            for it in itens:
-                num_ano=f"{it['numero']}/{it['ano']}"
-                if num_ano in enviados:
-                    print("🔁 Já enviado:", num_ano); continue
-
-                mensagem=f"Nova mensagem: {it['titulo']} {it['descricao']}".strip()
-                print("MSG:", mensagem)
-
-                caminho_pdf=None
-                if it.get("pdf_url"):
-                    caminho_pdf=download_pdf(it["pdf_url"], PASTA_PDFS)
-                num = NUMEROS_DESTINO
-                z = datetime.now()
-                zx = z.strftime('%H:%M:%S')
-                print(f'Horário: {zx}', end='\r')    
-                sleep(4)        
-                # Verifica horários específicos e chama a função scan_processos
-                if zx >= '16:00:01':
-                    print('NUMEROS_DESTINO2')
-                    num = NUMEROS_DESTINO2
-                if caminho_pdf:
-                    enviar_mensagem(num, mensagem, caminho_pdf)
-                else:
-                    enviar_mensagem(num, mensagem)
-
-                enviados_salvar(num_ano)
-                print("✅ Enviado e registrado:", num_ano)
-                sleep(2)
-
+            novos=executar_ciclo()
         except KeyboardInterrupt:
             print("\nInterrompido."); return
         except Exception as e:
             print("Erro no loop:", e)
 
+        metricas.gravar_jsonl()
+        espera=ritmo.proximo(novos)
         hh=datetime.now().strftime("%H:%M:%S")
-        print(f"Horário: {hh} — dormindo 1800s")
-        sleep(1800)
+        print(f"Horário: {hh} — dormindo {espera:.0f}s")
+        sleep(espera)
 
 if __name__=="__main__":
     main_loop()
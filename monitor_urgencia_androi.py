@@ -4,32 +4,59 @@
 # -*- coding: utf-8 -*-
 """
 ALECE PDR — Urgência (Android/Termux)
-- Detecta 'urgencia' no conteúdo
+- Filtra as linhas pelas REGRAS (padrão: 'urgencia' no conteúdo), cada uma com seus destinatários
+- FILTRO_SERVIDOR: a palavra vai já na consulta (palavra=...), o servidor devolve só as
+  linhas que interessam (muito menos páginas); as REGRAS continuam valendo no cliente.
+  A página 1 filtrada é conferida: se o servidor ignorar o filtro, ele é desligado
+  por REAVALIAR_FILTRO_HORAS. A varredura completa vai sem filtro; se achar linha
+  casada que o caminho filtrado deixou passar, o filtro também é desligado
 - Extrai números (AAAA/AAAA) (tenta Autor, depois Conteúdo; se nada, usa chave sintética)
 - Baixa PDF via consulta_plenario.php (POST com leg_id); se não vier PDF, procura link .pdf no HTML
 - Envia por WhatsApp via sender_baileys.js
-- Dedup em Excel
+- Download e envio rodam na esteira (fila.py): a varredura só enfileira
+- Dedup em registro SQLite (Excel só como exportação)
+- Marca d'água (maior leg_id já processado): o ciclo para de paginar ao chegar
+  em linhas já vistas; a cada VARREDURA_COMPLETA_HORAS refaz tudo até a data de corte
+- Backfill (histórico, sem alertas): python monitor_urgencia_androi.py backfill 2023 2024
+  percorre todas as páginas dos anos (ano_base) e só grava no registro o que casa
+  com as REGRAS; retoma de onde parou (ponto gravado a cada página). --refazer recomeça.
 """
 
 import os
 import re
-import shlex
+import sys
 import hashlib
 import subprocess
 from time import sleep
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Union
 from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
-from openpyxl import Workbook, load_workbook
-import unicodedata
+import agenda
+import cache_pdf
+import fila
+import http_cliente
+import indice_pdf
+import metricas
+import normalizacao
+import parser_html
+import regras
+import registro
+import sender_servico
+import varredura
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup   # carregado só no parse (parser_html)
 
 # =========== CONFIG ===========
 INTERVALO_SEGUNDOS = 600  # 5 min
+PAGINAS_ANTECIPADAS = 3   # páginas baixadas à frente da que está sendo processada
+VARREDURA_COMPLETA_HORAS = 24  # ignora a marca d'água e vai até a data de corte (rede de segurança)
+BACKFILL_ANTECIPAR = 8    # páginas baixadas à frente no backfill (concorrência: conexões do http_cliente)
 URL_BASE_LISTA = "https://www2.al.ce.gov.br/pdr/consultas.php"
 URL_PLENARIO   = "https://www2.al.ce.gov.br/pdr/consulta_plenario.php"  # POST com leg_id
+VALIDADE_PLENARIO = 30 * 24 * 3600   # s que vale a resolução leg_id -> link do PDF
+VALIDADE_SEM_PDF = 3600              # s até perguntar de novo por um leg_id que ainda não tinha PDF
 PARAM_FIXOS = {
     "opcao": "9",
     "palavra": "",
@@ -40,13 +67,20 @@ PARAM_FIXOS = {
     "situacao": "",
     "pg": "publico",
 }
+# Filtro no servidor (parâmetros de consultas.php somados a PARAM_FIXOS). Só é usado se
+# toda regra exigir a "palavra" (senão esconderia linhas de outras regras); "tipo" e
+# "situacao" também podem entrar aqui, por conta de quem configura. {} = desligado.
+FILTRO_SERVIDOR = {"palavra": "urgência"}
+MIN_CASADAS_FILTRO = 0.5      # fração mínima de linhas casadas na página 1 filtrada
+REAVALIAR_FILTRO_HORAS = 24   # servidor ignorou o filtro: tenta de novo depois disso
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36"
 }
 
 # Armazenamento seguro do Termux (aponta p/ sdcard)
 BASE_DIR = r"C:\Users\FABIO\OneDrive\Gabinete\site"
-ARQ_EXCEL   = os.path.join(BASE_DIR, "requerimentos_urgencia.xlsx")
+ARQ_REGISTRO = os.path.join(BASE_DIR, "requerimentos_urgencia.sqlite3")
+ARQ_EXCEL   = os.path.join(BASE_DIR, "requerimentos_urgencia.xlsx")  # só exportação
 ABA_EXCEL   = "dados"
 PASTA_ANEXO = os.path.join(BASE_DIR, "requerimentos_urgencia")
 os.makedirs(PASTA_ANEXO, exist_ok=True)
@@ -54,21 +88,23 @@ os.makedirs(PASTA_ANEXO, exist_ok=True)
 # Destinatários (TROQUE AQUI)
 #NUMEROS_DESTINO = ["558588227227"]
 NUMEROS_DESTINO = ["558588227227", "558597159955", "558587262526", "558596195560"]
+# Modo resumo: >0 junta os alertas prontos nessa janela (s) numa mensagem só por
+# grupo de destinatários, com os PDFs no mesmo envio (ver fila.py). 0 = um por um.
+AGRUPAR_ENVIOS = 0
+# Regras de filtragem (ver regras.py): uma varredura serve todos os assuntos.
+# Regra sem "destinos" usa NUMEROS_DESTINO. Campos: data, autor, conteudo.
+REGRAS = [
+    {"nome": "urgencia", "palavras": ["urgencia"], "campos": ["conteudo"]},
+    # {"nome": "saneamento", "palavras": ["saneamento", "agua"], "campos": ["conteudo"],
+    #  "destinos": ["558588227227"], "prefixo": "Saneamento:"},
+]
 # Onde procurar o sender (precisa ter node_modules na mesma pasta!)
 SENDER_CANDIDATOS = [
     r"C:\Users\FABIO\OneDrive\Gabinete\site\enviar_mensagem.js",                 # ~/bot
     "/storage/emulated/0/Documents/escaner/sender_baileys.js",               # sdcard/Documentos/escaner
 ]
 
-# =========== Normalização / Filtros ===========
-def contem_palavra(texto: str) -> bool:
-    """True se 'urgencia' (sem acento) estiver presente (case-insensitive)."""
-    if not texto:
-        return False
-    txt_norm = unicodedata.normalize('NFD', texto)
-    txt_sem_acento = ''.join(c for c in txt_norm if unicodedata.category(c) != 'Mn').lower()
-    return 'urgencia' in txt_sem_acento
-
+# =========== Filtros ===========
 RX_NUMEROS = re.compile(r'\b\d{4}/\d{4}\b')
 def extrair_numeros_proposicao(texto: str) -> List[str]:
     return RX_NUMEROS.findall(texto or "")
@@ -94,27 +130,126 @@ def chave_sintetica(data: str, autor: str, conteudo: str) -> str:
     h = hashlib.sha1(base).hexdigest()[:16]
     return f"K:{h}"
 
-# =========== Excel ===========
-def excel_init():
-    os.makedirs(BASE_DIR, exist_ok=True)
-    if not os.path.exists(ARQ_EXCEL):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = ABA_EXCEL
-        ws.append(["Id"])  # número 0000/0000 ou K:<hash>
-        wb.save(ARQ_EXCEL)
-
-def carregar_existentes() -> set:
-    excel_init()
-    wb = load_workbook(ARQ_EXCEL)
-    ws = wb[ABA_EXCEL]
-    return {str(row[0].value).strip() for row in ws.iter_rows(min_row=2) if row[0].value}
+def ids_da_linha(linha: Dict) -> List[str]:
+    """Números 0000/0000 (no Autor, senão no Conteúdo); sem número, a chave sintética."""
+    nums = extrair_numeros_proposicao(linha["autor"]) or extrair_numeros_proposicao(linha["conteudo"])
+    return nums or [chave_sintetica(linha["data"], linha["autor"], linha["conteudo"])]
+
+# =========== Registro (dedupe) ===========
+@metricas.etapa("urgencia", "dedupe")
+def carregar_existentes():
+    """Registro de ids já vistos (migra a planilha antiga na 1ª vez)."""
+    reg = registro.abrir(ARQ_REGISTRO)
+    registro.importar_excel(reg, ARQ_EXCEL, ABA_EXCEL)
+    return reg
 
 def salvar_novo(ident: str):
-    wb = load_workbook(ARQ_EXCEL)
-    ws = wb[ABA_EXCEL]
-    ws.append([ident])
-    wb.save(ARQ_EXCEL)
+    registro.abrir(ARQ_REGISTRO).add(ident)
+
+def exportar_excel():
+    """Gera a planilha (sob demanda) a partir do registro."""
+    return registro.exportar_excel(registro.abrir(ARQ_REGISTRO), ARQ_EXCEL, ABA_EXCEL, ("Id", "Data"))
+
+# =========== Marca d'água ===========
+# A lista vem da mais nova p/ a mais antiga e o leg_id cresce com o cadastro:
+# linhas com leg_id <= marca já foram processadas num ciclo anterior.
+META_MARCA = "marca_leg_id"
+META_COMPLETA = "varredura_completa"
+META_FILTRO = "filtro_servidor"         # "ok|<quando>" ou "ignorado|<quando>"
+META_BACKFILL = "backfill_pagina:"      # + ano: última página gravada
+META_BACKFILL_FIM = "backfill_fim:"     # + ano: quando terminou
+
+def leg_id_num(leg_id) -> Optional[int]:
+    try:
+        return int(leg_id)
+    except (TypeError, ValueError):
+        return None
+
+def ler_marca(reg) -> Optional[int]:
+    return leg_id_num(reg.meta(META_MARCA))
+
+def precisa_varredura_completa(reg) -> bool:
+    ultima = reg.meta(META_COMPLETA)
+    if not ultima:
+        return True
+    try:
+        return datetime.now() - datetime.fromisoformat(ultima) >= timedelta(hours=VARREDURA_COMPLETA_HORAS)
+    except ValueError:
+        return True
+
+def alcanca_marca(linhas: List[Dict], marca: Optional[int]) -> bool:
+    if marca is None:
+        return False
+    return any((n := leg_id_num(l.get("leg_id"))) is not None and n <= marca for l in linhas)
+
+# =========== Filtro no servidor ===========
+def filtro_cobre_regras() -> bool:
+    """Toda linha que alguma regra aceitaria contém a palavra do filtro?"""
+    palavra = normalizacao.dobrar(FILTRO_SERVIDOR.get("palavra") or "")
+    if not palavra:
+        return True
+    for r in REGRAS:
+        palavras = {normalizacao.dobrar(p) for p in r.get("palavras") or []}
+        if palavras != {palavra} and not (r.get("todas") and palavra in palavras):
+            return False
+    return True
+
+def filtro_ativo(reg) -> bool:
+    """Usar FILTRO_SERVIDOR? Não se não cobre as regras ou se o servidor o ignorou há pouco."""
+    if not FILTRO_SERVIDOR or not filtro_cobre_regras():
+        return False
+    situacao, _, quando = (reg.meta(META_FILTRO) or "").partition("|")
+    if situacao != "ignorado":
+        return True
+    try:
+        return datetime.now() - datetime.fromisoformat(quando) >= timedelta(hours=REAVALIAR_FILTRO_HORAS)
+    except ValueError:
+        return True
+
+def filtro_confirmado(reg) -> bool:
+    return (reg.meta(META_FILTRO) or "").startswith("ok|")
+
+def verificar_filtro(reg, linhas: List[Dict], compiladas: Dict) -> bool:
+    """
+    A página 1 filtrada mostra se o servidor respeitou o filtro: quase todas as
+    linhas casam com as REGRAS. Vazia, não prova nada: confere a página 1 sem
+    filtro (se lá há linhas que casam, o filtro escondeu o que não devia) e, se
+    também não houver, deixa para conferir no próximo ciclo. Grava a conclusão.
+    """
+    if linhas:
+        casadas = sum(1 for l in linhas if regras.avaliar(l, compiladas))
+        ok = casadas >= MIN_CASADAS_FILTRO * len(linhas)
+    else:
+        r = http_cliente.get(URL_BASE_LISTA, params=parametros(1), headers=HEADERS)
+        r.raise_for_status()
+        if not any(regras.avaliar(l, compiladas) for l in parse_linhas(r.text)):
+            print("ℹ️ Página 1 vazia com e sem filtro — filtro segue sem conferência")
+            return True
+        ok = False
+    reg.meta_gravar(META_FILTRO, f"{'ok' if ok else 'ignorado'}|{datetime.now().isoformat(timespec='seconds')}")
+    metricas.contar("filtro_servidor", resultado="ok" if ok else "ignorado")
+    if ok:
+        print("🎯 Filtro no servidor confirmado:", FILTRO_SERVIDOR)
+    else:
+        print(f"⚠️ Servidor não respeitou o filtro {FILTRO_SERVIDOR} — sem filtro por {REAVALIAR_FILTRO_HORAS}h")
+    return ok
+
+def conferir_perdidas(reg, enfileiradas: List[Dict], marca: Optional[int]) -> int:
+    """
+    Varredura completa (sem filtro) depois de ciclos filtrados: linha casada e
+    nova com leg_id <= marca d'água deveria ter vindo no caminho filtrado. Se
+    houver alguma, o filtro perde a confirmação e fica desligado por
+    REAVALIAR_FILTRO_HORAS. Devolve quantas faltaram.
+    """
+    if marca is None:
+        return 0
+    perdidas = [l for l in enfileiradas if (n := leg_id_num(l.get("leg_id"))) is not None and n <= marca]
+    if perdidas:
+        reg.meta_gravar(META_FILTRO, f"ignorado|{datetime.now().isoformat(timespec='seconds')}")
+        metricas.contar("filtro_servidor", resultado="perdeu_linhas")
+        print(f"⚠️ Filtro {FILTRO_SERVIDOR} escondeu {len(perdidas)} linha(s) "
+              f"(leg_id {', '.join(str(l['leg_id']) for l in perdidas)}) — sem filtro por {REAVALIAR_FILTRO_HORAS}h")
+    return len(perdidas)
 
 # =========== Sender (Node) ===========
 def localizar_sender() -> Tuple[str, str]:
@@ -141,55 +276,68 @@ def checar_dependencias_sender(cwd: str):
             "(em /storage/... use --no-bin-links)."
         )
 
-def chamar_sender(numeros: List[str], msg: str, caminho_pdf: Optional[str] = None):
-    checar_node()
+def chamar_sender(numeros: List[str], msg: str, caminho_pdf: Union[str, List[str], None] = None,
+                  id_envio: Optional[str] = None, resumo: Optional[Dict] = None):
+    """Envia (daemon ou processo único; um PDF ou vários); levanta sender_servico.EnvioFalhou se não confirmar."""
     sender_js, sender_cwd = localizar_sender()
+    try:
+        if not sender_servico.enviar(numeros, msg, caminho_pdf, sender_cwd, id_envio, resumo):
+            raise sender_servico.EnvioFalhou("sender_daemon recusou o envio")
+        return
+    except sender_servico.SenderIndisponivel as e:
+        print("ℹ️ sender_daemon indisponível — usando processo único:", e)
+    checar_node()
     checar_dependencias_sender(sender_cwd)
-    args = ["node", sender_js, ",".join(numeros), msg]
-    if caminho_pdf:
-        args.append(caminho_pdf)
-    print("▶️ Executando sender:", " ".join(shlex.quote(a) for a in args))
     print("📂 CWD:", sender_cwd)
-    proc = subprocess.Popen(args, cwd=sender_cwd)
-    proc.wait()
-    if proc.returncode != 0:
-        print(f"⚠️ sender saiu com código {proc.returncode}")
+    sender_servico.processo_unico(sender_js, numeros, msg, caminho_pdf)
 
 # =========== Download via PLENÁRIO (POST com leg_id) ===========
-def salvar_stream_em_pdf(resp: requests.Response, destino: str) -> Optional[str]:
-    tmp = destino + ".part"
-    with open(tmp, "wb") as f:
-        for chunk in resp.iter_content(8192):
-            if chunk:
-                f.write(chunk)
-    os.replace(tmp, destino)
-    if os.path.getsize(destino) <= 0:
-        try: os.remove(destino)
-        except: pass
-        return None
-    return destino
-
 def baixar_via_plenario(leg_id: str, nome_base: str) -> Optional[str]:
     """
-    Baixa o PDF via POST em consulta_plenario.php.
+    Baixa o PDF via POST em consulta_plenario.php, pelo cache compartilhado
+    (cache_pdf.py, chave "plenario:<leg_id>"): se já estiver lá, nem faz o POST.
     - Se o servidor devolver PDF direto, salva.
     - Se devolver HTML, procura <a href="*.pdf"> e baixa o primeiro.
+    O resultado do POST fica lembrado (cache_pdf.resolver): o link achado, por
+    VALIDADE_PLENARIO (se o PDF sair do cache, baixa do link sem POST), e o
+    "ainda sem PDF", por VALIDADE_SEM_PDF. Erro de rede não é lembrado.
     """
     if not leg_id:
         return None
+    chave = f"plenario:{leg_id}"
+    destino = os.path.join(PASTA_ANEXO, f"{nome_base}.pdf")
+    em_cache = cache_pdf.procurar(chave)
+    if em_cache:
+        print(f"  📦 PDF do cache (leg_id={leg_id})")
+        metricas.contar("plenario", resultado="pdf_em_cache")
+        return cache_pdf.materializar(em_cache, destino)
+    resolvido = cache_pdf.resolucao(chave)
+    if resolvido and resolvido["url"] is None:
+        print(f"  ⏭️ leg_id={leg_id} sem PDF na última consulta ({resolvido['quando']})")
+        metricas.contar("plenario", resultado="sem_pdf_em_cache")
+        return None
+    if resolvido and resolvido["url"] != URL_PLENARIO:
+        ok = cache_pdf.baixar(resolvido["url"], destino, HEADERS, chaves_extra=[chave])
+        if ok:
+            print(f"  ✓ PDF (link lembrado) salvo: {ok}")
+            metricas.contar("plenario", resultado="link_em_cache")
+            return ok
+        cache_pdf.esquecer(chave)   # link não serve mais: consulta de novo
+    metricas.contar("plenario", resultado="post")
     try:
         data = {"leg_id": str(leg_id), "pg": "publico", "visualizar": "Visualizar"}
         print(f"⇣ POST {URL_PLENARIO} leg_id={leg_id}")
-        with requests.post(URL_PLENARIO, data=data, headers=HEADERS, timeout=60,
-                           allow_redirects=True, stream=True) as r:
+        with http_cliente.post(URL_PLENARIO, data=data, headers=HEADERS,
+                               allow_redirects=True, stream=True) as r:
             r.raise_for_status()
             ctype = (r.headers.get("Content-Type") or "").lower()
 
             # Caso 1: já veio PDF
             if "pdf" in ctype:
-                destino = os.path.join(PASTA_ANEXO, f"{nome_base}.pdf")
-                ok = salvar_stream_em_pdf(r, destino)
+                ok = cache_pdf.guardar(r, [chave])
                 if ok:
+                    cache_pdf.resolver(chave, URL_PLENARIO, ctype, VALIDADE_PLENARIO)
+                    ok = cache_pdf.materializar(ok, destino)
                     print(f"  ✓ PDF (direto) salvo: {ok}")
                     return ok
                 print("  ✖️ Falha ao salvar PDF direto")
@@ -197,154 +345,311 @@ def baixar_via_plenario(leg_id: str, nome_base: str) -> Optional[str]:
 
             # Caso 2: veio HTML — procurar link .pdf
             html = r.text
-            soup = BeautifulSoup(html, "html.parser")
-            link = None
-            for a in soup.select('a[href]'):
-                href = a.get("href", "")
-                if ".pdf" in href.lower():
-                    link = urljoin(URL_PLENARIO, href)
-                    break
-            if not link:
-                print("  ⚠️ Nenhum link .pdf encontrado no HTML do plenário")
-                return None
-
-            print("  → Link PDF encontrado:", link)
-            with requests.get(link, headers=HEADERS, timeout=60, stream=True) as rb:
-                rb.raise_for_status()
-                if "pdf" not in (rb.headers.get("Content-Type") or "").lower():
-                    print("  ⚠️ Link não retornou PDF")
-                    return None
-                destino = os.path.join(PASTA_ANEXO, f"{nome_base}.pdf")
-                ok = salvar_stream_em_pdf(rb, destino)
-                if ok:
-                    print(f"  ✓ PDF (link) salvo: {ok}")
-                    return ok
-                print("  ✖️ Falha ao salvar PDF do link")
-                return None
+        soup = parser_html.soup(html)
+        link = None
+        for a in soup.select('a[href]'):
+            href = a.get("href", "")
+            if ".pdf" in href.lower():
+                link = urljoin(URL_PLENARIO, href)
+                break
+        if not link:
+            print("  ⚠️ Nenhum link .pdf encontrado no HTML do plenário")
+            cache_pdf.resolver(chave, None, None, VALIDADE_SEM_PDF)
+            return None
+
+        print("  → Link PDF encontrado:", link)
+        ok = cache_pdf.baixar(link, destino, HEADERS, chaves_extra=[chave])
+        if ok:
+            cache_pdf.resolver(chave, link, "application/pdf", VALIDADE_PLENARIO)
+            print(f"  ✓ PDF (link) salvo: {ok}")
+            return ok
+        print("  ✖️ Falha ao salvar PDF do link")
+        return None
     except Exception as e:
         print("  ✖️ baixar_via_plenario falhou:", e)
         return None
 
-# =========== Raspagem ===========
-def baixar_pagina(pagina: int) -> str:
-    params = dict(PARAM_FIXOS)
-    params["pagina"] = str(pagina)
-    r = requests.get(URL_BASE_LISTA, params=params, headers=HEADERS, timeout=60)
-    r.raise_for_status()
-    return r.text
+# =========== Esteira (download + envio) ===========
+def baixar_anexo(item: Dict) -> Optional[str]:
+    """Etapa de download: PDF via plenário (POST com leg_id); regras do corpo do PDF."""
+    pdf = baixar_via_plenario(item["leg_id"], item["nome_base"]) if item.get("leg_id") else None
+    indice_pdf.aplicar_regras(item, pdf, REGRAS)
+    return pdf
+
+def enviar_alerta(item: Dict, caminho_pdf: Union[str, List[str], None]):
+    """Etapa de envio (no modo resumo, item junta vários alertas e caminho_pdf é uma lista)."""
+    pdfs = sender_servico.pdfs_validos(caminho_pdf)
+    if pdfs:
+        print("→ enviando com PDF:", ", ".join(pdfs))
+    elif caminho_pdf:
+        print("⚠️ PDF inválido/0B — envio só texto:", caminho_pdf)
+    chamar_sender(item["destinos"], item["mensagem"], pdfs, item.get("id_envio"), item.get("resumo"))
+
+def esteira() -> fila.Esteira:
+    return fila.obter("urgencia", baixar_anexo, enviar_alerta, agrupar=AGRUPAR_ENVIOS)
 
-def extrair_leg_ids(soup: BeautifulSoup) -> List[str]:
+# =========== Raspagem ===========
+def parametros(pagina: int, ano: Optional[str] = None, filtrar: bool = False) -> Dict:
+    """Query de consultas.php: PARAM_FIXOS + página (+ ano_base, + FILTRO_SERVIDOR)."""
+    params = dict(PARAM_FIXOS, pagina=str(pagina))
+    if ano:
+        params["ano_base"] = str(ano)
+    if filtrar:
+        params.update(FILTRO_SERVIDOR)
+    return params
+
+@metricas.etapa("urgencia", "busca")
+def baixar_pagina(pagina: int, forcar: bool = False, filtrar: bool = False):
+    """Resposta da página, ou None se ela não mudou desde a última varredura."""
+    return http_cliente.get_se_mudou(URL_BASE_LISTA, params=parametros(pagina, filtrar=filtrar),
+                                     forcar=forcar, headers=HEADERS)
+
+def extrair_leg_ids(soup: "BeautifulSoup") -> List[str]:
     return [inp.get("value","") for inp in soup.select('input[name="leg_id"]')]
 
+@metricas.etapa("urgencia", "parse")
 def parse_linhas(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    leg_ids = extrair_leg_ids(soup)
+    # selectolax (C) quando instalado; senão BeautifulSoup com lxml/html.parser
+    arvore = parser_html.arvore_rapida(html)
+    if arvore is not None:
+        leg_ids = [inp.attributes.get("value") or "" for inp in arvore.css('input[name="leg_id"]')]
+        spans_por_tr = [[sp.text(strip=True) for sp in tr.css("td span")[:3]] for tr in arvore.css("table tr")]
+    else:
+        soup = parser_html.soup(html)
+        leg_ids = extrair_leg_ids(soup)
+        spans_por_tr = [[sp.get_text(strip=True) for sp in tr.select("td span")[:3]] for tr in soup.select("table tr")]
     resultados = []
-    trs = soup.select("table tr")
     idx_leg = 0
-    for tr in trs:
-        spans = tr.select("td span")
+    for spans in spans_por_tr:
         if len(spans) < 3:
             continue
-        data_txt  = spans[0].get_text(strip=True)
-        autor_txt = spans[1].get_text(strip=True)
-        cont_txt  = spans[2].get_text(strip=True)
+        data_txt, autor_txt, cont_txt = spans
         leg_id = leg_ids[idx_leg] if idx_leg < len(leg_ids) else None
         idx_leg += 1
         resultados.append({"data": data_txt, "autor": autor_txt, "conteudo": cont_txt, "leg_id": leg_id})
     return resultados
 
 # =========== Loop principal ===========
+@metricas.etapa("urgencia", "filtro")
+def processar_linhas(linhas: List[Dict], existentes, marca: Optional[int] = None,
+                     compiladas: Optional[Dict] = None,
+                     enfileiradas: Optional[List[Dict]] = None) -> Tuple[bool, int]:
+    """
+    Filtra, deduplica e envia as linhas de uma página. Devolve (encerrar, novos);
+    as linhas que viraram alerta vão também para enfileiradas, se dada.
+    """
+    compiladas = compiladas or regras.compilar(REGRAS)
+    novos = 0
+    for linha in linhas:
+        data = linha["data"]
+        autor = linha["autor"]
+        conteudo = linha["conteudo"]
+        leg_id = linha.get("leg_id")
+
+        # daqui p/ baixo tudo já foi processado num ciclo anterior
+        n = leg_id_num(leg_id)
+        if marca is not None and n is not None and n <= marca:
+            print(f"↩️ Chegou à marca d'água (leg_id {marca}) — encerrando paginação.")
+            return True, novos
+
+        # parar paginação quando a linha estiver antes da data de referência
+        if verificar_data_menor(data):
+            print("↩️ Encontrou data anterior à referência — encerrando paginação.")
+            return True, novos
+
+        # filtra pelas regras (todas numa passada só)
+        casadas = regras.avaliar(linha, compiladas)
+        if not casadas:
+            continue
+
+        # número 0000/0000 no Autor ou no Conteúdo; sem número, chave sintética (para não perder o envio)
+        ids_para_enviar = ids_da_linha(linha)
+        if ids_para_enviar[0].startswith("K:"):
+            print("ℹ️ Sem número 0000/0000 — usando chave sintética:", ids_para_enviar[0])
+
+        # dedupe (o registro só é gravado depois que o alerta está na caixa de saída)
+        novas = [ident for ident in ids_para_enviar if ident not in existentes]
+        for ident in ids_para_enviar:
+            print(f"📌 Nova ocorrência: {ident}" if ident in novas else f"🔁 Já registrada: {ident}")
+        if not novas:
+            continue
+
+        # mensagem
+        mensagem = f"{regras.prefixo(casadas, '')}\n\n{data}\n\n{autor}\n\n{conteudo}".strip()
+        destinos = regras.destinos(casadas, NUMEROS_DESTINO)
+        print("MSG:", mensagem)
+
+        # nome-base do arquivo (para salvar com sentido)
+        nome_base = insertt(ids_para_enviar[0]) if "/" in ids_para_enviar[0] else ids_para_enviar[0].replace("K:", "K_")
+
+        # PDF (plenário) e envio ficam com a esteira; a varredura segue.
+        # Caixa de saída antes do registro: uma queda entre os dois não perde o alerta
+        # (na próxima varredura a chave já está na caixa e só o registro é gravado)
+        if esteira().enfileirar(novas[0], {"mensagem": mensagem, "destinos": destinos,
+                                           "leg_id": leg_id, "nome_base": nome_base}):
+            novos += 1
+            if enfileiradas is not None:
+                enfileiradas.append(linha)
+        for ident in novas:
+            salvar_novo(ident)
+    return False, novos
+
+def executar_ciclo() -> int:
+    """Uma varredura; devolve quantos alertas novos foram enfileirados."""
+    esteira()  # retoma o que ficou na fila da execução anterior
+    existentes = carregar_existentes()
+    completa = precisa_varredura_completa(existentes)
+    marca = None if completa else ler_marca(existentes)
+    if completa:
+        print(">>> Iniciando varredura COMPLETA de urgência (até a data de corte)...")
+    else:
+        print(f">>> Iniciando varredura de urgência (marca d'água: leg_id {marca})...")
+    compiladas = regras.compilar(REGRAS)
+    # a varredura completa vai sem filtro e confere o que os ciclos filtrados deixaram passar
+    filtrou = filtro_ativo(existentes)
+    filtrar = filtrou and not completa
+    conferir = filtrar and not filtro_confirmado(existentes)
+    marca_filtrada = ler_marca(existentes) if completa and filtrou else None
+    enfileiradas: List[Dict] = []
+    sem_filtro_de_novo = False   # filtro escondeu linhas: refaz o ciclo sem ele
+    novos = 0
+    maior = None          # maior leg_id visto neste ciclo
+    concluida = False     # chegou ao fim por um motivo normal (não por falha de rede)
+    linhas_por_pagina: Dict[int, List[Dict]] = {}
+
+    def ler_linhas(pagina: int, resp) -> List[Dict]:
+        if pagina not in linhas_por_pagina:
+            linhas_por_pagina[pagina] = parse_linhas(resp.text)
+        return linhas_por_pagina[pagina]
+
+    def antecipar_se(pagina: int, resp) -> bool:
+        # página que já contém a marca é a última: não baixa as seguintes
+        linhas = ler_linhas(pagina, resp)
+        return bool(linhas) and not alcanca_marca(linhas, marca)
+
+    def processar(pagina: int, resp) -> bool:
+        nonlocal novos, maior, concluida, sem_filtro_de_novo
+        # lista é da mais nova p/ a mais antiga: página igual => nada novo daqui em diante
+        if resp is None:
+            print(f"⏸️ Página {pagina} sem mudanças — encerrando varredura.")
+            concluida = True
+            return False
+
+        linhas = ler_linhas(pagina, resp)
+        linhas_por_pagina.pop(pagina, None)
+        if conferir and pagina == 1 and not verificar_filtro(existentes, linhas, compiladas) and not linhas:
+            sem_filtro_de_novo = True
+            return False
+        if not linhas:
+            print("Sem linhas nesta página.")
+            concluida = True
+            return False
+        ids = [n for n in (leg_id_num(l.get("leg_id")) for l in linhas) if n is not None]
+        if ids:
+            maior = max(ids + ([maior] if maior is not None else []))
+
+        encerrar, n = processar_linhas(linhas, existentes, marca, compiladas, enfileiradas)
+        novos += n
+
+        # página processada sem erro: passa a valer como "última versão"
+        http_cliente.confirmar(resp)
+
+        if encerrar:
+            concluida = True
+            return False
+        return True
+
+    # as próximas páginas já vão sendo baixadas enquanto a atual é processada
+    buscar = lambda p: baixar_pagina(p, forcar=completa, filtrar=filtrar)
+    varredura.varrer_paginas(buscar, processar, PAGINAS_ANTECIPADAS, antecipar_se=antecipar_se)
+    if sem_filtro_de_novo:
+        return novos + executar_ciclo()
+
+    conferir_perdidas(existentes, enfileiradas, marca_filtrada)
+
+    # só avança a marca se a varredura não parou no meio por falha de rede
+    if concluida:
+        antiga = ler_marca(existentes)
+        if maior is not None and (antiga is None or maior > antiga):
+            existentes.meta_gravar(META_MARCA, str(maior))
+        if completa:
+            existentes.meta_gravar(META_COMPLETA, datetime.now().isoformat(timespec="seconds"))
+    return novos
+
+# =========== Backfill (histórico, sem alertas) ===========
+def baixar_pagina_ano(ano: str, pagina: int, filtrar: bool = False):
+    """Página de um ano_base qualquer (GET simples: não mexe no cache do GET condicional)."""
+    r = http_cliente.get(URL_BASE_LISTA, params=parametros(pagina, ano, filtrar), headers=HEADERS)
+    r.raise_for_status()
+    return r
+
+def backfill(anos: List[str], refazer: bool = False) -> int:
+    """
+    Percorre todas as páginas dos anos e grava no registro as chaves das linhas
+    que casam com as REGRAS, sem enfileirar alertas. Depois de cada página o
+    ponto de retomada vai para o registro; rodar de novo continua dali (a
+    última página é relida, para cobrir linhas que escorregaram de página).
+    Devolve quantas chaves novas entraram.
+    """
+    existentes = carregar_existentes()
+    compiladas = regras.compilar(REGRAS)
+    filtrar = filtro_ativo(existentes) and filtro_confirmado(existentes)   # só o já conferido pelo monitor
+    total = 0
+    for ano in anos:
+        if refazer:
+            existentes.meta_gravar(META_BACKFILL + ano, "0")
+            existentes.meta_gravar(META_BACKFILL_FIM + ano, "")
+        elif existentes.meta(META_BACKFILL_FIM + ano):
+            print(f"✔️ {ano}: backfill já concluído em {existentes.meta(META_BACKFILL_FIM + ano)} (--refazer para repetir)")
+            continue
+        feitas = int(existentes.meta(META_BACKFILL + ano) or 0)
+        print(f">>> Backfill {ano} a partir da página {max(feitas, 1)}...")
+
+        def processar(pagina: int, resp) -> bool:
+            nonlocal total
+            linhas = parse_linhas(resp.text)
+            if not linhas:
+                existentes.meta_gravar(META_BACKFILL_FIM + ano, datetime.now().isoformat(timespec="seconds"))
+                print(f"✔️ {ano}: fim na página {pagina - 1}")
+                return False
+            pares = [(ident, None) for l in linhas if regras.avaliar(l, compiladas) for ident in ids_da_linha(l)]
+            n = existentes.adicionar_varios(pares)
+            existentes.meta_gravar(META_BACKFILL + ano, str(pagina))
+            total += n
+            print(f"📚 {ano} p.{pagina}: {len(linhas)} linha(s), {len(pares)} casada(s), {n} nova(s)")
+            return True
+
+        varredura.varrer_paginas(lambda p: baixar_pagina_ano(ano, p, filtrar), processar, BACKFILL_ANTECIPAR,
+                                 primeira=max(feitas, 1))
+        if not existentes.meta(META_BACKFILL_FIM + ano):
+            print(f"⏸️ {ano}: parou depois da página {existentes.meta(META_BACKFILL + ano)} — rode de novo para continuar")
+    print(f"📚 Backfill: {total} chave(s) nova(s) no registro")
+    return total
+
 def main_loop():
+    ritmo = agenda.Ritmo(INTERVALO_SEGUNDOS)   # adaptativo (ver agenda.py)
     while True:
+        novos = 0
         try:
-            existentes = carregar_existentes()
-            print(">>> Iniciando varredura de urgência...")
-            pagina = 1
-            encerrar = False
-
-            while True:
-                try:
-                    html = baixar_pagina(pagina)
-                except Exception as e:
-                    print(f"Falha ao baixar página {pagina}:", e)
-                    break
-
-                linhas = parse_linhas(html)
-                if not linhas:
-                    print("Sem linhas nesta página.")
-                    break
-
-                for linha in linhas:
-                    data = linha["data"]
-                    autor = linha["autor"]
-                    conteudo = linha["conteudo"]
-                    leg_id = linha.get("leg_id")
-
-                    # parar paginação quando a linha estiver antes da data de referência
-                    if verificar_data_menor(data):
-                        encerrar = True
-                        break
-
-                    # filtra por 'urgencia' no conteúdo
-                    if not contem_palavra(conteudo):
-                        continue
-
-                    # tenta número 0000/0000 no Autor, depois no Conteúdo
-                    nums = extrair_numeros_proposicao(autor) or extrair_numeros_proposicao(conteudo)
-
-                    # se não há número, crie chave sintética (para não perder o envio)
-                    ids_para_enviar = nums if nums else [chave_sintetica(data, autor, conteudo)]
-                    if not nums:
-                        print("ℹ️ Sem número 0000/0000 — usando chave sintética:", ids_para_enviar[0])
-
-                    # dedupe
-                    nova = False
-                    for ident in ids_para_enviar:
-                        if ident not in existentes:
-                            salvar_novo(ident)
-                            existentes.add(ident)
-                            nova = True
-                            print(f"📌 Nova ocorrência: {ident}")
-                        else:
-                            print(f"🔁 Já registrada: {ident}")
-                    if not nova:
-                        continue
-
-                    # mensagem
-                    mensagem = f"{data}\n\n{autor}\n\n{conteudo}".strip()
-                    print("MSG:", mensagem)
-
-                    # nome-base do arquivo (para salvar com sentido)
-                    nome_base = insertt(ids_para_enviar[0]) if "/" in ids_para_enviar[0] else ids_para_enviar[0].replace("K:", "K_")
-
-                    # Baixar PDF via plenário (POST com leg_id)
-                    caminho_pdf = baixar_via_plenario(leg_id, nome_base) if leg_id else None
-
-                    # Envio
-                    if caminho_pdf and os.path.isfile(caminho_pdf) and os.path.getsize(caminho_pdf) > 0:
-                        print("→ enviando com PDF:", caminho_pdf)
-                        chamar_sender(NUMEROS_DESTINO, mensagem, caminho_pdf)
-                    else:
-                        if caminho_pdf:
-                            print("⚠️ PDF inválido/0B — envio só texto:", caminho_pdf)
-                        chamar_sender(NUMEROS_DESTINO, mensagem)
-
-                if encerrar:
-                    print("↩️ Encontrou data anterior à referência — encerrando paginação.")
-                    break
-
-                pagina += 1
-
+            novos = executar_ciclo()
         except KeyboardInterrupt:
             print("\nInterrompido pelo usuário.")
             return
         except Exception as e:
             print("Erro no loop:", e)
 
+        metricas.gravar_jsonl()
+        espera = ritmo.proximo(novos)
         hh = datetime.now().strftime("%H:%M:%S")
-        print(f"Horário: {hh} — dormindo {INTERVALO_SEGUNDOS}s")
-        sleep(INTERVALO_SEGUNDOS)
+        print(f"Horário: {hh} — dormindo {espera:.0f}s")
+        sleep(espera)
 
 if __name__ == "__main__":
-    main_loop()
+    if sys.argv[1:2] == ["backfill"]:
+        anos = [a for a in sys.argv[2:] if not a.startswith("--")] or [PARAM_FIXOS["ano_base"]]
+        try:
+            backfill(anos, refazer="--refazer" in sys.argv)
+        except KeyboardInterrupt:
+            print("\nInterrompido — rode de novo para continuar de onde parou.")
+    else:
+        main_loop()
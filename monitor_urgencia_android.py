@@ -4,7 +4,7 @@ Raspa a listagem pública (ALECE PDR) com Requests+BeautifulSoup,
 detecta 'urgencia' no conteúdo, extrai numeros (AAAA/AAAA) do autor,
 ( opcional ) baixa anexo via anexo.baixar(leg_id, numero_formatado),
 envia por WhatsApp via sender_baileys.js,
-e registra em Excel para não duplicar.
+e registra num registro SQLite para não duplicar (Excel só como exportação).
 
 Termux (uma vez):
   pkg update -y
@@ -24,13 +24,17 @@ import shlex
 import subprocess
 from time import sleep
 from datetime import datetime
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+
+import anexos
+import http_cliente
+import normalizacao
+import parser_html
+import registro
+import sender_servico
 
-import requests
-from bs4 import BeautifulSoup
-from openpyxl import Workbook, load_workbook
-import unicodedata
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup   # carregado só no parse (parser_html)
 
 # =========== CONFIG ===========
 INTERVALO_SEGUNDOS = 300  # 5 min
@@ -54,7 +58,8 @@ HEADERS = {
 # Use um caminho garantido do Termux para o armazenamento compartilhado (=/sdcard)
 BASE_DIR = "/data/data/com.termux/files/home/storage/documents/escaner"
 os.makedirs(BASE_DIR, exist_ok=True)
-ARQ_EXCEL  = os.path.join(BASE_DIR, "requerimentos_urgencia.xlsx")
+ARQ_REGISTRO = os.path.join(BASE_DIR, "requerimentos_urgencia.sqlite3")
+ARQ_EXCEL  = os.path.join(BASE_DIR, "requerimentos_urgencia.xlsx")  # só exportação
 ABA_EXCEL  = "dados"
 PASTA_ANEXO = os.path.join(BASE_DIR, "mensagens")
 os.makedirs(PASTA_ANEXO, exist_ok=True)
@@ -72,9 +77,7 @@ SENDER_CANDIDATOS = [
 def contem_palavra(texto: str) -> bool:
     if not texto:
         return False
-    txt_norm = unicodedata.normalize('NFD', texto)
-    txt_sem_acento = ''.join(c for c in txt_norm if unicodedata.category(c) != 'Mn').lower()
-    return 'urgencia' in txt_sem_acento
+    return normalizacao.contem(texto, 'urgencia')
 
 RX_NUMEROS = re.compile(r'\b\d{4}/\d{4}\b')
 def extrair_numeros_proposicao(texto: str):
@@ -97,26 +100,15 @@ def verificar_data_menor(texto_data: str) -> bool:
 def insertt(num: str) -> str:
     return (num or "").replace("/", "_")
 
-# =========== Excel helpers ===========
-def excel_init():
-    if not os.path.exists(ARQ_EXCEL):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = ABA_EXCEL
-        ws.append(["Numero"])
-        wb.save(ARQ_EXCEL)
-
-def carregar_existentes() -> set:
-    excel_init()
-    wb = load_workbook(ARQ_EXCEL)
-    ws = wb[ABA_EXCEL]
-    return {str(row[0].value).strip() for row in ws.iter_rows(min_row=2) if row[0].value}
+# =========== Registro (dedupe) ===========
+def carregar_existentes():
+    """Registro de números já vistos (migra a planilha antiga na 1ª vez)."""
+    reg = registro.abrir(ARQ_REGISTRO)
+    registro.importar_excel(reg, ARQ_EXCEL, ABA_EXCEL)
+    return reg
 
 def salvar_novo(numero: str):
-    wb = load_workbook(ARQ_EXCEL)
-    ws = wb[ABA_EXCEL]
-    ws.append([numero])
-    wb.save(ARQ_EXCEL)
+    registro.abrir(ARQ_REGISTRO).add(numero)
 
 # =========== Sender (Node) ===========
 def localizar_sender() -> Tuple[str, str]:
@@ -149,8 +141,14 @@ def checar_dependencias_sender(cwd: str):
         )
 
 def chamar_sender(numeros: List[str], msg: str, caminho_pdf: Optional[str] = None):
-    checar_node()
     sender_js, sender_cwd = localizar_sender()
+    try:
+        if not sender_servico.enviar(numeros, msg, caminho_pdf, sender_cwd):
+            raise sender_servico.EnvioFalhou("sender_daemon recusou o envio")
+        return
+    except sender_servico.SenderIndisponivel as e:
+        print("ℹ️ sender_daemon indisponível — usando processo único:", e)
+    checar_node()
     checar_dependencias_sender(sender_cwd)
 
     args = ["node", sender_js, ",".join(numeros), msg]
@@ -186,33 +184,36 @@ def tentar_baixar_anexo(leg_id: Optional[str], numero_fmt: str) -> Optional[str]
     return None
 
 # =========== Raspagem (Requests + BS4) ===========
-def baixar_pagina(pagina: int) -> str:
+def baixar_pagina(pagina: int):
+    """Resposta da página, ou None se ela não mudou desde a última varredura."""
     params = dict(PARAM_FIXOS)
     params["pagina"] = str(pagina)
-    r = requests.get(URL_BASE, params=params, headers=HEADERS, timeout=60)
-    r.raise_for_status()
-    return r.text
+    return http_cliente.get_se_mudou(URL_BASE, params=params, headers=HEADERS)
 
-def extrair_leg_ids(soup: BeautifulSoup) -> List[str]:
+def extrair_leg_ids(soup: "BeautifulSoup") -> List[str]:
     # Ordem dos inputs deve bater com a ordem visual
     return [inp.get("value","") for inp in soup.select('input[name="leg_id"]')]
 
 def parse_linhas(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")  # evita necessidade do lxml
-    leg_ids = extrair_leg_ids(soup)
+    # selectolax (C) quando instalado; senão BeautifulSoup com lxml/html.parser
+    arvore = parser_html.arvore_rapida(html)
+    if arvore is not None:
+        leg_ids = [inp.attributes.get("value") or "" for inp in arvore.css('input[name="leg_id"]')]
+        spans_por_tr = [[sp.text(strip=True) for sp in tr.css("td span")[:3]] for tr in arvore.css("table tr")]
+    else:
+        soup = parser_html.soup(html)
+        leg_ids = extrair_leg_ids(soup)
+        spans_por_tr = [[sp.get_text(strip=True) for sp in tr.select("td span")[:3]] for tr in soup.select("table tr")]
     resultados = []
 
-    trs = soup.select("table tr")
     # A página parece alternar linhas de conteúdo; vamos varrer todas
     idx_leg = 0
-    for tr in trs:
-        spans = tr.select("td span")
+    for spans in spans_por_tr:
         if len(spans) < 3:
             continue
 
-        data_txt  = spans[0].get_text(strip=True)  # <span><strong>DATA</strong></span>
-        autor_txt = spans[1].get_text(strip=True)  # <span><strong>AUTOR</strong></span>
-        cont_txt  = spans[2].get_text(strip=True)  # <span>CONTEUDO</span> (geralmente)
+        # <span><strong>DATA</strong></span> <span><strong>AUTOR</strong></span> <span>CONTEUDO</span>
+        data_txt, autor_txt, cont_txt = spans
 
         # pega um leg_id se houver na sequência
         leg_id = leg_ids[idx_leg] if idx_leg < len(leg_ids) else None
@@ -237,12 +238,17 @@ def main_loop():
 
             while True:
                 try:
-                    html = baixar_pagina(pagina)
+                    resp = baixar_pagina(pagina)
                 except Exception as e:
                     print(f"Falha ao baixar página {pagina}:", e)
                     break
 
-                linhas = parse_linhas(html)
+                # lista é da mais nova p/ a mais antiga: página igual => nada novo daqui em diante
+                if resp is None:
+                    print(f"⏸️ Página {pagina} sem mudanças — encerrando varredura.")
+                    break
+
+                linhas = parse_linhas(resp.text)
                 if not linhas:
                     print("Sem linhas nesta página.")
                     break
@@ -271,7 +277,6 @@ def main_loop():
                         if numero not in existentes:
                             print(f"📌 Nova proposição detectada: {numero}")
                             salvar_novo(numero)
-                            existentes.add(numero)
                             nova_detectada = True
                         else:
                             print(f"🔁 Já registrada: {numero}")
@@ -297,6 +302,9 @@ def main_loop():
                     else:
                         chamar_sender(NUMEROS_DESTINO, mensagem)
 
+                # página processada sem erro: passa a valer como "última versão"
+                http_cliente.confirmar(resp)
+
                 if encerrar:
                     print("↩️ Encontrou data anterior a hoje — encerrando paginação.")
                     break
@@ -324,15 +332,10 @@ import shlex
 import subprocess
 from time import sleep
 from datetime import datetime
-from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
-import requests
-from bs4 import BeautifulSoup
-from openpyxl import Workbook, load_workbook
-import unicodedata
-
 # =========== CONFIG ===========
+INTERVALO_SEGUNDOS = 3600  # 1 h
 URL = "https://www.al.ce.gov.br/legislativo/expediente"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36"
@@ -344,7 +347,8 @@ RX_PUBLICACAO2 = re.compile(r"\b(\d{1,2}\.\d{3})\b\s*-\s*.+")   # ex: 9.402 - ..
 BASE_DIR = r"C:\Users\FABIO\OneDrive\Gabinete\site"
 os.makedirs(BASE_DIR, exist_ok=True)
 
-ARQ_EXCEL  = os.path.join(BASE_DIR, "mensagens_encontradas.xlsx")
+ARQ_REGISTRO = os.path.join(BASE_DIR, "mensagens_encontradas.sqlite3")
+ARQ_EXCEL  = os.path.join(BASE_DIR, "mensagens_encontradas.xlsx")  # só exportação
 ABA_EXCEL  = "encontradas"
 PASTA_PDFS = os.path.join(BASE_DIR, "mensagens")
 os.makedirs(PASTA_PDFS, exist_ok=True)
@@ -360,46 +364,22 @@ SENDER_CANDIDATOS = [
 def contem_palavra(txt: str) -> bool:
     if not txt:
         return False
-    t = unicodedata.normalize("NFD", txt)
-    t = "".join(c for c in t if unicodedata.category(c) != "Mn").lower()
-    return "leitura" in t
+    return normalizacao.contem(txt, "leitura")
 
 def contem_palavra2(txt: str) -> bool:
     if not txt:
         return False
-    t = unicodedata.normalize("NFD", txt)
-    t = "".join(c for c in t if unicodedata.category(c) != "Mn").lower()
-    return "mensagem" in t
-
-# =========== Excel helpers ===========
-def excel_init():
-    p = Path(ARQ_EXCEL)
-    if p.exists():
-        wb = load_workbook(ARQ_EXCEL)
-        ws = wb[ABA_EXCEL] if ABA_EXCEL in wb.sheetnames else wb.create_sheet(ABA_EXCEL)
-    else:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = ABA_EXCEL
-        ws.append(["numero"])
-        wb.save(ARQ_EXCEL)
-    return wb, ws
-
-def carregar_numeros_enviados() -> set:
-    wb, ws = excel_init()
-    enviados = set()
-    for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
-        if not row:
-            continue
-        v = (row[0] or "").strip()
-        if v:
-            enviados.add(v)
-    return enviados
+    return normalizacao.contem(txt, "mensagem")
+
+# =========== Registro (dedupe) ===========
+def carregar_numeros_enviados():
+    """Registro de números já enviados (migra a planilha antiga na 1ª vez)."""
+    reg = registro.abrir(ARQ_REGISTRO)
+    registro.importar_excel(reg, ARQ_EXCEL, ABA_EXCEL)
+    return reg
 
 def salvar_numero_enviado(num_ano: str):
-    wb, ws = excel_init()
-    ws.append([num_ano])
-    wb.save(ARQ_EXCEL)
+    registro.abrir(ARQ_REGISTRO).add(num_ano)
 
 # =========== Localizar sender ===========
 def localizar_sender() -> Tuple[str, str]:
@@ -430,47 +410,35 @@ def checar_dependencias_sender(cwd: str):
 
 # =========== Download de PDF ===========
 def _pdf_candidates(ano: str, numero2: str) -> list:
-    ano = str(ano)
-    yy = ano[-2:]
-    n = str(numero2 or "").strip().replace(".", "")
-    nums = {n}
-    for w in (3, 4, 5):
-        nums.add(n.zfill(w))
-    prefixes = ["", "pl", "plc", "pdl", "msg", "au"]
-    urls = []
-    for num in nums:
-        urls.append(f"https://www2.al.ce.gov.br/legislativo/tramit{ano}/{num}.pdf")
-        urls.append(f"https://www2.al.ce.gov.br/legislativo/tramit{ano}/{num}_{yy}.pdf")
-        for p in prefixes[1:]:
-            urls.append(f"https://www2.al.ce.gov.br/legislativo/tramit{ano}/{p}{num}_{yy}.pdf")
-    seen = set(); uniq = []
-    for u in urls:
-        if u not in seen:
-            uniq.append(u); seen.add(u)
-    return uniq
+    # mesmos palpites de sempre, mas o modelo que mais acertou vem primeiro
+    return anexos.candidatos_pdf(ano, numero2, "mensagem")
 
 def try_download_first_pdf(urls: list, pasta_dest: str, headers: dict) -> Optional[str]:
-    for url in urls:
-        try:
-            print("⇣ Tentando:", url)
-            with requests.get(url, headers=headers, timeout=60, stream=True) as r:
-                r.raise_for_status()
-                ctype = (r.headers.get("Content-Type") or "").lower()
-                if "pdf" not in ctype:
-                    continue
-                nome = url.rstrip("/").split("/")[-1]
-                dest = os.path.join(pasta_dest, nome)
-                tmp = dest + ".part"
-                with open(tmp, "wb") as f:
-                    for chunk in r.iter_content(8192):
-                        if chunk:
-                            f.write(chunk)
-                os.replace(tmp, dest)
-                if os.path.getsize(dest) > 0:
-                    print(f"✓ PDF salvo: {dest}")
-                    return dest
-        except Exception:
-            continue
+    """
+    Se o 1º palpite vem de um modelo que já acertou, tenta só ele (1 GET);
+    senão sonda as candidatas em paralelo e baixa só a primeira que responder PDF.
+    """
+    restantes = list(urls)
+    if restantes and anexos.palpite_aprendido(restantes[0]):
+        url = restantes.pop(0)
+        print("⇣ Tentando (modelo aprendido):", url)
+        nome = url.rstrip("/").split("/")[-1]
+        dest = anexos.baixar_stream(url, os.path.join(pasta_dest, nome), headers)
+        if dest:
+            anexos.registrar_acerto(url)
+            print(f"✓ PDF salvo: {dest}")
+            return dest
+    while restantes:
+        url = anexos.primeiro_pdf(restantes, headers)
+        if not url:
+            return None
+        nome = url.rstrip("/").split("/")[-1]
+        dest = anexos.baixar_stream(url, os.path.join(pasta_dest, nome), headers)
+        if dest:
+            anexos.registrar_acerto(url)
+            print(f"✓ PDF salvo: {dest}")
+            return dest
+        restantes.remove(url)
     return None
 
 # =========== Raspar página ===========
@@ -483,10 +451,16 @@ def get_text_nodes_outside_b(h3) -> str:
                 parts.append(s)
     return " ".join(parts).strip()
 
-def raspar_itens() -> List[Dict]:
-    r = requests.get(URL, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+def baixar_pagina_expediente():
+    """Resposta da página, ou None se ela não mudou desde o último ciclo."""
+    return http_cliente.get_se_mudou(URL, headers=HEADERS)
+
+def raspar_itens(html: Optional[str] = None) -> List[Dict]:
+    if html is None:
+        r = http_cliente.get(URL, headers=HEADERS)
+        r.raise_for_status()
+        html = r.text
+    soup = parser_html.soup(html)
     itens = []
     for h3 in soup.select("main div div div h3"):
         titulo_b = (h3.b.get_text(" ", strip=True) if h3.b else "").strip()
@@ -512,8 +486,14 @@ def raspar_itens() -> List[Dict]:
 
 # =========== Envio ===========
 def chamar_sender(numeros: List[str], msg: str, caminho_pdf: Optional[str] = None):
-    checar_node()
     sender_js, sender_cwd = localizar_sender()
+    try:
+        if not sender_servico.enviar(numeros, msg, caminho_pdf, sender_cwd):
+            raise sender_servico.EnvioFalhou("sender_daemon recusou o envio")
+        return
+    except sender_servico.SenderIndisponivel as e:
+        print("ℹ️ sender_daemon indisponível — usando processo único:", e)
+    checar_node()
     checar_dependencias_sender(sender_cwd)
     args = ["node", sender_js, ",".join(numeros), msg]
     if caminho_pdf: args.append(caminho_pdf)
@@ -521,39 +501,51 @@ def chamar_sender(numeros: List[str], msg: str, caminho_pdf: Optional[str] = Non
     subprocess.run(args, cwd=sender_cwd)
 
 # =========== Main ===========
+def executar_ciclo() -> int:
+    """Uma varredura completa; devolve quantos alertas novos foram enviados."""
+    novos = 0
+    enviados = carregar_numeros_enviados()
+    resp = baixar_pagina_expediente()
+    if resp is None:
+        print("⏸️ Página sem mudanças desde o último ciclo.")
+    itens = raspar_itens(resp.text) if resp is not None else []
+    for it in itens:
+        if it["tipo"] != "mensagem":
+            continue
+        num_ano = f"{it['numero']}/{it['ano']}"
+        if num_ano in enviados:
+            continue
+        mensagem = "Nova mensagem: " + it["titulo_b"] + " " + it["texto_solto"]
+        print("MSG:", mensagem)
+        # checagem de data
+        if data_menor_que_referencia(it["titulo_b"] + " " + it["texto_solto"]):
+            print("⏭️ Ignorando item anterior à data de referência.")
+            continue
+        caminho_pdf = None
+        if it.get("ano") and it.get("numero2"):
+            cands = _pdf_candidates(it["ano"], it["numero2"])
+            caminho_pdf = try_download_first_pdf(cands, PASTA_PDFS, HEADERS)
+        if caminho_pdf:
+            chamar_sender(NUMEROS_DESTINO, mensagem, caminho_pdf)
+        else:
+            chamar_sender(NUMEROS_DESTINO, mensagem)
+        salvar_numero_enviado(num_ano)
+        print("✅ Enviado e registrado:", num_ano)
+        novos += 1
+    if resp is not None:
+        http_cliente.confirmar(resp)
+    return novos
+
 def main_loop():
     while True:
         try:
-            enviados = carregar_numeros_enviados()
-            itens = raspar_itens()
-            for it in itens:
-                if it["tipo"] != "mensagem":
-                    continue
-                num_ano = f"{it['numero']}/{it['ano']}"
-                if num_ano in enviados:
-                    continue
-                mensagem = "Nova mensagem: " + it["titulo_b"] + " " + it["texto_solto"]
-                print("MSG:", mensagem)
-                # checagem de data
-                if data_menor_que_referencia(it["titulo_b"] + " " + it["texto_solto"]):
-                    print("⏭️ Ignorando item anterior à data de referência.")
-                    continue
-                caminho_pdf = None
-                if it.get("ano") and it.get("numero2"):
-                    cands = _pdf_candidates(it["ano"], it["numero2"])
-                    caminho_pdf = try_download_first_pdf(cands, PASTA_PDFS, HEADERS)
-                if caminho_pdf:
-                    chamar_sender(NUMEROS_DESTINO, mensagem, caminho_pdf)
-                else:
-                    chamar_sender(NUMEROS_DESTINO, mensagem)
-                salvar_numero_enviado(num_ano)
-                print("✅ Enviado e registrado:", num_ano)
+            executar_ciclo()
         except KeyboardInterrupt:
             return
         except Exception as e:
             print("Erro:", e)
-        print("Dormindo 3600s...")
-        sleep(3600)
+        print(f"Dormindo {INTERVALO_SEGUNDOS}s...")
+        sleep(INTERVALO_SEGUNDOS)
 
 if __name__ == "__main__":
     main_loop()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Normalização de texto compartilhada pelos filtros de palavra-chave.
+
+- dobrar(s): minúsculas sem acento — o mesmo que o antigo
+  NFD + remover 'Mn' + lower(), mas sem o laço Python por caractere: ASCII
+  puro vai direto p/ lower(), o resto tira os acentos combinantes com um
+  regex pré-compilado; o resultado é memoizado por conteúdo
+- contem(s, palavra): a palavra (dobrada) aparece no texto dobrado
+- contem_alguma(s, palavras) / encontrar(s, palavras): várias palavras
+  numa passada só, com um único regex compilado (e guardado) por lista
+
+Texto com caracteres fora das FAIXAS (latim, acentos combinantes e
+pontuação geral — onde o NFD só gera acentos U+0300..U+036F) cai no
+caminho antigo, caractere a caractere.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+FAIXAS = ((0x0080, 0x0370), (0x1E00, 0x1F00), (0x2000, 0x20D0))
+MEMO = 8192   # textos dobrados guardados (títulos, linhas de tabela...)
+
+
+def _dobrar_lento(s: str) -> str:
+    t = unicodedata.normalize("NFD", s)
+    return "".join(c for c in t if unicodedata.category(c) != "Mn").lower()
+
+
+_COMBINANTES = re.compile("[\u0300-\u036f]+")
+_FORA = re.compile("[^\\x00-\\x7f%s]" % "".join("\\u%04x-\\u%04x" % (i, f - 1) for i, f in FAIXAS))
+
+
+@lru_cache(maxsize=MEMO)
+def dobrar(s: str) -> str:
+    """Minúsculas sem acento ('Urgência' -> 'urgencia')."""
+    if not s:
+        return ""
+    if s.isascii():
+        return s.lower()
+    if _FORA.search(s):
+        return _dobrar_lento(s)
+    return _COMBINANTES.sub("", unicodedata.normalize("NFD", s)).lower()
+
+
+def contem(s: str, palavra: str) -> bool:
+    return dobrar(palavra) in dobrar(s)
+
+
+@lru_cache(maxsize=64)
+def _compilar(palavras: Tuple[str, ...]):
+    """
+    Regexes de uma lista de palavras (mais longas primeiro): um p/ "alguma
+    aparece?" e outro com lookahead p/ achar todas, mesmo sobrepostas; mais
+    quais palavras cada uma contém.
+    """
+    dobradas = sorted({dobrar(p) for p in palavras if p}, key=len, reverse=True)
+    if not dobradas:
+        return None, None, {}
+    alternativas = "|".join(map(re.escape, dobradas))
+    contidas = {p: [q for q in dobradas if q != p and q in p] for p in dobradas}
+    return re.compile(alternativas), re.compile("(?=(%s))" % alternativas), contidas
+
+
+def contem_alguma(s: str, palavras: Iterable[str]) -> bool:
+    rx, _, _ = _compilar(tuple(palavras))
+    return rx is not None and rx.search(dobrar(s)) is not None
+
+
+def encontrar(s: str, palavras: Iterable[str]) -> List[str]:
+    """Palavras (dobradas) presentes no texto, na ordem da 1ª ocorrência."""
+    _, rx, contidas = _compilar(tuple(palavras))
+    if rx is None:
+        return []
+    achadas = {}
+    for m in rx.finditer(dobrar(s)):
+        p = m.group(1)
+        achadas.setdefault(p, m.start())
+        # na mesma posição o regex só devolve a mais longa: as contidas nela também estão no texto
+        for q in contidas[p]:
+            achadas.setdefault(q, m.start())
+    return sorted(achadas, key=achadas.get)
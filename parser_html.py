@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Parser HTML dos monitores: usa o backend mais rápido que estiver instalado.
+
+- soup(html): BeautifulSoup com lxml (C) se disponível, senão html.parser
+  (Python puro, o que vinha sendo usado em todo lugar)
+- arvore_rapida(html): árvore do selectolax (C, bem mais rápido) para os
+  parsers simples baseados só em seletores CSS; None se não estiver instalado
+- texto(no): texto de um nó (tag ou string) sem re-parsear o HTML dele
+
+O bs4 (e o lxml) só são importados no primeiro soup(): um ciclo em que a
+página não mudou (304) nem chega a carregá-los.
+
+Instalação opcional no Termux:  pip install lxml selectolax
+Forçar um backend (ex.: para comparar):  MONITOR_AL_PARSER=html.parser
+"""
+
+import os
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+FORCADO = os.environ.get("MONITOR_AL_PARSER") or None
+_padrao: Optional[str] = None
+
+
+def backends_disponiveis() -> List[str]:
+    saida = []
+    try:
+        import lxml  # noqa: F401
+        saida.append("lxml")
+    except ImportError:
+        pass
+    saida.append("html.parser")
+    return saida
+
+
+def backend_padrao() -> str:
+    global _padrao
+    if _padrao is None:
+        disponiveis = backends_disponiveis()
+        _padrao = FORCADO if FORCADO in disponiveis else disponiveis[0]
+    return _padrao
+
+
+def soup(html: str, backend: Optional[str] = None) -> "BeautifulSoup":
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, backend or backend_padrao())
+
+
+def arvore_rapida(html: str):
+    """HTMLParser do selectolax, ou None (sem selectolax ou backend forçado)."""
+    if FORCADO and FORCADO != "selectolax":
+        return None
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        try:
+            from selectolax.parser import HTMLParser  # selectolax < 0.3 (Modest)
+        except ImportError:
+            return None
+    return HTMLParser(html)
+
+
+def texto(no) -> str:
+    """Equivale a BeautifulSoup(str(no)).get_text(" ", strip=True), sem novo parse."""
+    if hasattr(no, "get_text"):
+        return no.get_text(" ", strip=True)
+    return str(no).strip()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de itens já vistos/enviados (dedupe) compartilhado pelos monitores.
+
+Substitui o ciclo load_workbook + append + save da planilha inteira a cada
+item novo. Dois backends com a mesma interface (`in`, add, len, chaves):
+- RegistroSQLite (.sqlite3/.db): tabela com a chave como PRIMARY KEY (indexada)
+- RegistroLog (qualquer outra extensão): log só-de-acréscimo, um item por
+  linha, lido uma única vez para um set em memória. Metadados ("#meta")
+  só são escritos quando mudam; linhas de meta vencidas são descartadas
+  ao abrir e a cada MAX_LINHAS_META escritas (o log é reescrito)
+
+Salvar um item é O(1) e consultar não relê nada do disco. A planilha Excel
+vira só exportação sob demanda (e importação, para migrar/mesclar a antiga):
+
+  python registro.py exportar <registro> <arquivo.xlsx> [aba]
+  python registro.py importar <registro> <arquivo.xlsx> [aba]
+"""
+
+import os
+import sys
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+import metricas
+
+FORMATO_DATA = "%d/%m/%Y %H:%M"
+MAX_LINHAS_META = 1000   # RegistroLog: linhas "#meta" acumuladas antes de compactar
+
+
+def _agora() -> str:
+    return datetime.now().strftime(FORMATO_DATA)
+
+
+class RegistroSQLite:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("CREATE TABLE IF NOT EXISTS itens (chave TEXT PRIMARY KEY, data TEXT)")
+        self._con.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+        self._con.commit()
+
+    def __contains__(self, chave: str) -> bool:
+        with self._lock:
+            cur = self._con.execute("SELECT 1 FROM itens WHERE chave = ?", (str(chave).strip(),))
+            return cur.fetchone() is not None
+
+    def add(self, chave: str, data: Optional[str] = None) -> bool:
+        """Registra a chave; True se era nova."""
+        with self._lock:
+            cur = self._con.execute("INSERT OR IGNORE INTO itens (chave, data) VALUES (?, ?)",
+                                    (str(chave).strip(), data or _agora()))
+            self._con.commit()
+            return cur.rowcount > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._con.execute("SELECT COUNT(*) FROM itens").fetchone()[0]
+
+    def chaves(self) -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            linhas = self._con.execute("SELECT chave, data FROM itens ORDER BY rowid").fetchall()
+        return iter(linhas)
+
+    def meta(self, k: str) -> Optional[str]:
+        with self._lock:
+            row = self._con.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+            return row[0] if row else None
+
+    def meta_gravar(self, k: str, v: str):
+        with self._lock:
+            self._con.execute("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", (k, v))
+            self._con.commit()
+
+    def adicionar_varios(self, pares) -> int:
+        with self._lock:
+            antes = self._con.total_changes
+            self._con.executemany("INSERT OR IGNORE INTO itens (chave, data) VALUES (?, ?)",
+                                  [(str(c).strip(), d or _agora()) for c, d in pares])
+            self._con.commit()
+            return self._con.total_changes - antes
+
+    def fechar(self):
+        with self._lock:
+            self._con.close()
+
+
+class RegistroLog:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._itens: Dict[str, str] = {}
+        self._meta: Dict[str, str] = {}
+        self._linhas_meta = 0   # linhas "#meta" no arquivo
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    partes = linha.rstrip("\n").split("\t")
+                    if len(partes) == 3 and partes[0] == "#meta":
+                        self._meta[partes[1]] = partes[2]
+                        self._linhas_meta += 1
+                    elif partes[0]:
+                        self._itens[partes[0]] = partes[1] if len(partes) > 1 else ""
+        self._f = open(caminho, "a", encoding="utf-8")
+        if self._linhas_meta > len(self._meta):
+            with self._lock:
+                self._compactar()
+
+    def __contains__(self, chave: str) -> bool:
+        return str(chave).strip() in self._itens
+
+    def _escrever(self, linha: str):
+        self._f.write(linha + "\n")
+        self._f.flush()
+
+    def _compactar(self):
+        """Reescreve o log: itens + o último valor de cada meta (troca atômica)."""
+        tmp = self.caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chave, data in self._itens.items():
+                f.write(f"{chave}\t{data}\n")
+            for k, v in self._meta.items():
+                f.write(f"#meta\t{k}\t{v}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._f.close()
+        os.replace(tmp, self.caminho)
+        self._f = open(self.caminho, "a", encoding="utf-8")
+        self._linhas_meta = len(self._meta)
+
+    def add(self, chave: str, data: Optional[str] = None) -> bool:
+        chave = str(chave).strip()
+        with self._lock:
+            if chave in self._itens:
+                return False
+            self._itens[chave] = data or _agora()
+            self._escrever(f"{chave}\t{self._itens[chave]}")
+            return True
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def chaves(self) -> Iterator[Tuple[str, str]]:
+        return iter(list(self._itens.items()))
+
+    def meta(self, k: str) -> Optional[str]:
+        return self._meta.get(k)
+
+    def meta_gravar(self, k: str, v: str):
+        with self._lock:
+            if self._meta.get(k) == v:
+                return
+            self._meta[k] = v
+            self._escrever(f"#meta\t{k}\t{v}")
+            self._linhas_meta += 1
+            if self._linhas_meta >= len(self._meta) + MAX_LINHAS_META:
+                self._compactar()
+
+    def adicionar_varios(self, pares) -> int:
+        return sum(1 for c, d in pares if self.add(c, d))
+
+    def fechar(self):
+        with self._lock:
+            self._f.close()
+
+
+_abertos: Dict[str, object] = {}
+
+
+def abrir(caminho: str):
+    """Abre (uma vez por processo) o registro; o backend vem da extensão."""
+    caminho = os.path.abspath(caminho)
+    reg = _abertos.get(caminho)
+    if reg is None:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        if caminho.endswith((".sqlite3", ".sqlite", ".db")):
+            reg = RegistroSQLite(caminho)
+        else:
+            reg = RegistroLog(caminho)
+        _abertos[caminho] = reg
+    return reg
+
+
+# =========== Excel (só sob demanda) ===========
+@metricas.etapa("registro", "planilha")
+def importar_excel(reg, arq_excel: str, aba: Optional[str] = None) -> int:
+    """
+    Mescla no registro as chaves da 1ª coluna da planilha (linha 1 = cabeçalho).
+    Só relê o arquivo se ele mudou desde a última importação.
+    """
+    if not os.path.exists(arq_excel):
+        return 0
+    marca = str(os.path.getmtime(arq_excel))
+    k = "excel_mtime:" + os.path.abspath(arq_excel)
+    if reg.meta(k) == marca:
+        return 0
+    from openpyxl import load_workbook
+    wb = load_workbook(arq_excel, read_only=True)
+    ws = wb[aba] if aba and aba in wb.sheetnames else wb.active
+    pares = []
+    for row in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+        if row and row[0]:
+            data = row[1] if len(row) > 1 and row[1] else None
+            if isinstance(data, datetime):
+                data = data.strftime(FORMATO_DATA)
+            pares.append((str(row[0]).strip(), str(data) if data else None))
+    wb.close()
+    novos = reg.adicionar_varios(pares)
+    reg.meta_gravar(k, marca)
+    if novos:
+        print(f"📥 {novos} chave(s) importada(s) de {arq_excel}")
+    return novos
+
+
+@metricas.etapa("registro", "planilha")
+def exportar_excel(reg, arq_excel: str, aba: str = "dados", cabecalho=("chave", "data")):
+    """Gera a planilha inteira a partir do registro (sobrescreve)."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(aba)
+    ws.append(list(cabecalho))
+    for chave, data in reg.chaves():
+        ws.append([chave, data][:len(cabecalho)])
+    tmp = arq_excel + ".tmp.xlsx"
+    wb.save(tmp)
+    os.replace(tmp, arq_excel)
+    # a planilha recém-gerada já está contida no registro
+    reg.meta_gravar("excel_mtime:" + os.path.abspath(arq_excel), str(os.path.getmtime(arq_excel)))
+    return arq_excel
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("exportar", "importar"):
+        print(__doc__)
+        sys.exit(1)
+    _reg = abrir(sys.argv[2])
+    _aba = sys.argv[4] if len(sys.argv) > 4 else None
+    if sys.argv[1] == "exportar":
+        print("✅ Exportado:", exportar_excel(_reg, sys.argv[3], _aba or "dados"))
+    else:
+        print("✅ Importadas:", importar_excel(_reg, sys.argv[3], _aba))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Regras de filtragem declarativas: uma busca e um parse por página servem
+qualquer número de assuntos vigiados.
+
+Cada regra é um dict (como as entradas de FONTES no monitor_al.py):
+
+  {"nome": "urgencia",
+   "palavras": ["urgência"],            # alguma delas (ou todas, com "todas": True)
+   "regex": [r"regime\\s+de\\s+urgencia"],  # opcional; todos precisam casar no texto dobrado
+   "excluir": ["retirada de pauta"],    # opcional; descarta o item se aparecer
+   "campos": ["conteudo"],              # campos do item; padrão: todo o texto do item
+   "destinos": ["5585..."],             # opcional; sem destinos = os do monitor
+   "prefixo": "Urgência:"}              # opcional; início da mensagem
+
+Regras com "campos": ["texto_pdf"] (CAMPO_PDF) olham o corpo do anexo:
+não casam na listagem; depois do download, indice_pdf.aplicar_regras()
+soma os destinos delas aos do item já escolhido (ex.: uma Mensagem que
+trata de um tema vigiado avisa também a equipe daquele tema).
+Elas só refinam: um item que nenhuma regra da listagem escolheu não é
+baixado, então uma regra de PDF sozinha nunca gera alerta. Para vigiar um
+tema só pelo corpo, combine-a com uma regra de listagem larga o bastante
+(ex.: a padrão, "Mensagem").
+
+compilar(regras) valida e prepara tudo uma vez (um regex de palavras por
+campo, com as palavras de todas as regras); avaliar(item, compiladas)
+dobra cada campo uma vez, acha todas as palavras numa passada e devolve as
+regras que casaram.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+import normalizacao
+
+TODOS = "*"   # campo especial: todo o texto do item
+CAMPO_PDF = "texto_pdf"   # corpo do PDF (ver indice_pdf.py)
+
+
+def compilar(regras: List[Dict]) -> Dict:
+    compiladas = []
+    palavras_por_campo: Dict[str, set] = {}
+    for r in regras:
+        nome = r.get("nome")
+        palavras = [normalizacao.dobrar(p) for p in r.get("palavras") or [] if p]
+        excluir = [normalizacao.dobrar(p) for p in r.get("excluir") or [] if p]
+        regex = [re.compile(x) for x in r.get("regex") or []]
+        if not nome or not (palavras or regex):
+            raise ValueError(f"regra inválida (precisa de nome e de palavras ou regex): {r!r}")
+        campos = list(r.get("campos") or [TODOS])
+        for c in campos:
+            palavras_por_campo.setdefault(c, set()).update(palavras + excluir)
+        compiladas.append({
+            "nome": nome, "palavras": set(palavras), "excluir": set(excluir), "regex": regex,
+            "todas": bool(r.get("todas")), "campos": campos,
+            "destinos": list(r.get("destinos") or []), "prefixo": r.get("prefixo"),
+        })
+    return {"regras": compiladas,
+            "palavras_por_campo": {c: tuple(sorted(p)) for c, p in palavras_por_campo.items()}}
+
+
+def _texto_do_campo(item: Dict, campo: str) -> str:
+    if campo == TODOS:
+        return " ".join(v for v in item.values() if isinstance(v, str))
+    v = item.get(campo)
+    return v if isinstance(v, str) else ""
+
+
+def avaliar(item: Dict, compiladas: Dict) -> List[Dict]:
+    """Regras (compiladas) que casam com o item, na ordem em que foram declaradas."""
+    dobrado, achadas = {}, {}
+    for campo, palavras in compiladas["palavras_por_campo"].items():
+        dobrado[campo] = normalizacao.dobrar(_texto_do_campo(item, campo))
+        achadas[campo] = set(normalizacao.encontrar(dobrado[campo], palavras)) if palavras else set()
+    casadas = []
+    for r in compiladas["regras"]:
+        presentes = set().union(*(achadas[c] for c in r["campos"]))
+        if presentes & r["excluir"]:
+            continue
+        if r["palavras"]:
+            ok = r["palavras"] <= presentes if r["todas"] else bool(r["palavras"] & presentes)
+        else:
+            ok = True
+        if ok and r["regex"]:
+            ok = all(any(rx.search(dobrado[c]) for c in r["campos"]) for rx in r["regex"])
+        if ok:
+            casadas.append(r)
+    return casadas
+
+
+def destinos(casadas: List[Dict], padrao: List[str]) -> List[str]:
+    """União dos destinatários das regras (sem repetir); regra sem destinos usa o padrão."""
+    saida = []
+    for r in casadas:
+        for n in r["destinos"] or padrao:
+            if n not in saida:
+                saida.append(n)
+    return saida
+
+
+def prefixo(casadas: List[Dict], padrao: str) -> str:
+    return next((r["prefixo"] for r in casadas if r["prefixo"]), padrao)
+
+
+def nomes(casadas: List[Dict]) -> List[str]:
+    return [r["nome"] for r in casadas]
+
+
+def do_pdf(regras: List[Dict]) -> List[Dict]:
+    """As regras (não compiladas) que olham o corpo do PDF."""
+    return [r for r in regras if CAMPO_PDF in (r.get("campos") or ())]
+
+
+def de_palavras(nome: str, palavras: Optional[List[str]], campos: Optional[List[str]] = None) -> List[Dict]:
+    """Regra única a partir de uma lista simples de palavras (configuração antiga)."""
+    return [{"nome": nome, "palavras": list(palavras), "campos": campos}] if palavras else []
@@ -0,0 +1,201 @@
+// sender_daemon.js — sender WhatsApp (Baileys) de longa duração
+//
+// Mantém UMA sessão do WhatsApp aberta e recebe pedidos dos monitores Python
+// por um socket TCP local (127.0.0.1), uma linha JSON por pedido:
+//
+//   {"op": "ping"}
+//     -> {"ok": true, "estado": "open" | "connecting" | "close"}
+//   {"op": "enviar", "numeros": ["5585..."], "texto": "...", "pdf": "/caminho/arquivo.pdf",
+//    "id": "urgencia:123/2025"}
+//     -> {"ok": true} | {"ok": false, "erro": "..."}
+//   ("pdfs": [...] no lugar de "pdf" manda vários anexos depois do texto)
+//   {"op": "enviar", "numeros": [...], "resumo": {"titulo": "📋 {n} novos itens",
+//    "separador": "...", "partes": [{"id": "urgencia:1/2025", "texto": "...", "pdf": "..."}]}}
+//     -> resumo (fila.py): para cada número, só as partes que ele ainda não
+//        recebeu, juntas numa mensagem (uma parte sozinha vai sem título)
+//
+// Com "id", cada número que já recebeu aquele id é pulado (reenvio seguro
+// depois de uma queda no meio do caminho); no resumo vale o id de cada parte,
+// então o mesmo item pode ser reenviado sozinho ou noutro resumo sem repetir.
+// Os ids entregues ficam em SENDER_ENTREGUES (os últimos MAX_ENTREGUES).
+// Um pedido repetido enquanto o primeiro ainda está saindo (o cliente
+// desistiu por timeout num PDF grande e mandou de novo) espera o envio em
+// curso do mesmo "id|numero" em vez de mandar outra vez.
+//
+// Iniciado automaticamente por sender_servico.py (não precisa rodar à mão).
+// Precisa das mesmas dependências do sender_baileys.js:
+//   npm i @whiskeysockets/baileys qrcode-terminal
+//
+// Variáveis de ambiente:
+//   SENDER_PORTA     porta local (padrão 8765)
+//   SENDER_AUTH_DIR  pasta da sessão do Baileys (padrão ./auth_info)
+//   SENDER_ENTREGUES arquivo dos ids entregues (padrão ./entregues.json)
+
+const net = require('net');
+const fs = require('fs');
+const path = require('path');
+const qrcode = require('qrcode-terminal');
+const {
+  default: makeWASocket,
+  useMultiFileAuthState,
+  DisconnectReason,
+} = require('@whiskeysockets/baileys');
+
+const PORTA = parseInt(process.env.SENDER_PORTA || '8765', 10);
+const AUTH_DIR = process.env.SENDER_AUTH_DIR || path.join(process.cwd(), 'auth_info');
+const ARQ_ENTREGUES = process.env.SENDER_ENTREGUES || path.join(process.cwd(), 'entregues.json');
+const MAX_ENTREGUES = 5000;
+
+let sock = null;
+let estado = 'close';
+
+// "id|numero" já entregues (ordem de inserção = mais antigos primeiro)
+const entregues = new Set();
+try {
+  for (const k of JSON.parse(fs.readFileSync(ARQ_ENTREGUES, 'utf8'))) entregues.add(k);
+} catch (e) { /* primeiro uso */ }
+
+function marcarEntregue(chave) {
+  entregues.add(chave);
+  while (entregues.size > MAX_ENTREGUES) entregues.delete(entregues.values().next().value);
+  const tmp = ARQ_ENTREGUES + '.tmp';
+  fs.writeFileSync(tmp, JSON.stringify([...entregues]));
+  fs.renameSync(tmp, ARQ_ENTREGUES);
+}
+
+async function conectar() {
+  const { state, saveCreds } = await useMultiFileAuthState(AUTH_DIR);
+  estado = 'connecting';
+  sock = makeWASocket({ auth: state, printQRInTerminal: false });
+  sock.ev.on('creds.update', saveCreds);
+  sock.ev.on('connection.update', (u) => {
+    if (u.qr) qrcode.generate(u.qr, { small: true });
+    if (u.connection === 'open') {
+      estado = 'open';
+      console.log('✅ Estado: open');
+    } else if (u.connection === 'close') {
+      estado = 'close';
+      const code = u.lastDisconnect && u.lastDisconnect.error &&
+        u.lastDisconnect.error.output && u.lastDisconnect.error.output.statusCode;
+      if (code === DisconnectReason.loggedOut) {
+        console.log('⚠️ Sessão deslogada — apague a pasta de auth e leia o QR de novo.');
+        process.exit(2);
+      }
+      console.log('↻ Conexão caiu, reconectando...');
+      setTimeout(() => conectar().catch((e) => console.log('Falha ao reconectar:', e)), 2000);
+    }
+  });
+}
+
+function lerPdfs(pdfs) {
+  return pdfs.map((pdf) => {
+    if (!fs.existsSync(pdf)) throw new Error(`PDF não encontrado: ${pdf}`);
+    return { pdf, doc: fs.readFileSync(pdf) };
+  });
+}
+
+async function mandar(jid, texto, docs) {
+  if (texto) await sock.sendMessage(jid, { text: texto });
+  for (const { pdf, doc } of docs) {
+    await sock.sendMessage(jid, {
+      document: doc,
+      mimetype: 'application/pdf',
+      fileName: path.basename(pdf),
+    });
+  }
+}
+
+// "id|numero" sendo enviados agora -> promessa do envio
+const emAndamento = new Map();
+
+async function esperarEmAndamento(chaves) {
+  let pendentes;
+  while ((pendentes = chaves.map((k) => emAndamento.get(k)).filter(Boolean)).length) {
+    await Promise.allSettled(pendentes);
+  }
+}
+
+function registrarEnvio(chaves, promessa) {
+  for (const k of chaves) emAndamento.set(k, promessa);
+  promessa.finally(() => {
+    for (const k of chaves) if (emAndamento.get(k) === promessa) emAndamento.delete(k);
+  }).catch(() => {});
+  return promessa;
+}
+
+async function enviarResumo(numeros, resumo) {
+  const partes = (resumo.partes || []).map((p) => ({ ...p, docs: lerPdfs(p.pdf ? [p.pdf] : []) }));
+  const sep = resumo.separador || '\n\n';
+  for (const numero of numeros) {
+    const n = String(numero).trim();
+    await esperarEmAndamento(partes.filter((p) => p.id).map((p) => `${p.id}|${n}`));
+    const faltam = partes.filter((p) => !(p.id && entregues.has(`${p.id}|${n}`)));
+    if (!faltam.length) {
+      console.log(`↩️ resumo já entregue a ${n} — pulando`);
+      continue;
+    }
+    const texto = faltam.length === 1 ? faltam[0].texto
+      : (resumo.titulo || '').replace('{n}', faltam.length) + sep + faltam.map((p) => p.texto).join(sep);
+    const chaves = faltam.filter((p) => p.id).map((p) => `${p.id}|${n}`);
+    await registrarEnvio(chaves, (async () => {
+      await mandar(`${n}@s.whatsapp.net`, texto, faltam.flatMap((p) => p.docs));
+      for (const k of chaves) marcarEntregue(k);
+    })());
+  }
+}
+
+async function enviar(pedido) {
+  if (estado !== 'open') throw new Error(`sessão não está aberta (estado=${estado})`);
+  const numeros = pedido.numeros || [];
+  if (pedido.resumo) return enviarResumo(numeros, pedido.resumo);
+  const texto = pedido.texto || '';
+  const docs = lerPdfs(pedido.pdfs || (pedido.pdf ? [pedido.pdf] : []));
+  for (const numero of numeros) {
+    const chave = pedido.id ? `${pedido.id}|${String(numero).trim()}` : null;
+    if (chave) await esperarEmAndamento([chave]);
+    if (chave && entregues.has(chave)) {
+      console.log(`↩️ ${chave} já entregue — pulando`);
+      continue;
+    }
+    await registrarEnvio(chave ? [chave] : [], (async () => {
+      await mandar(`${String(numero).trim()}@s.whatsapp.net`, texto, docs);
+      if (chave) marcarEntregue(chave);
+    })());
+  }
+}
+
+async function tratar(linha) {
+  const pedido = JSON.parse(linha);
+  if (pedido.op === 'ping') return { ok: true, estado };
+  if (pedido.op === 'enviar') {
+    await enviar(pedido);
+    return { ok: true };
+  }
+  return { ok: false, erro: `op desconhecida: ${pedido.op}` };
+}
+
+const servidor = net.createServer((conn) => {
+  let buf = '';
+  conn.setEncoding('utf8');
+  conn.on('data', (dados) => {
+    buf += dados;
+    let i;
+    while ((i = buf.indexOf('\n')) >= 0) {
+      const linha = buf.slice(0, i).trim();
+      buf = buf.slice(i + 1);
+      if (!linha) continue;
+      tratar(linha)
+        .then((r) => conn.write(JSON.stringify(r) + '\n'))
+        .catch((e) => conn.write(JSON.stringify({ ok: false, erro: String(e && e.message || e) }) + '\n'));
+    }
+  });
+  conn.on('error', () => {});
+});
+
+servidor.listen(PORTA, '127.0.0.1', () => {
+  console.log(`▶️ sender_daemon ouvindo em 127.0.0.1:${PORTA}`);
+  conectar().catch((e) => {
+    console.log('Falha ao conectar:', e);
+    process.exit(1);
+  });
+});
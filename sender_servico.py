@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente do sender WhatsApp persistente (sender_daemon.js).
+
+Em vez de abrir um `node sender_baileys.js` novo (e reconectar o Baileys)
+a cada alerta, os monitores falam com um único processo Node de longa
+duração por um socket TCP local, uma linha JSON por pedido.
+
+- enviar(numeros, texto, caminho_pdf, sender_cwd): garante o daemon de pé e envia
+- enviar_com_candidatos(...): localiza o sender e envia, com o fallback antigo
+- saudavel(): health check (ping -> estado "open")
+- caminho_pdf pode ser uma lista (resumo com vários anexos, ver fila.py):
+  vão todos no mesmo pedido ao daemon
+- id_envio: chave do alerta (ver fila.py); o daemon não entrega de novo a
+  um número o que já entregou com o mesmo id, então reenviar é seguro.
+  Sem id_envio, enviar() usa id_conteudo(...) (números + texto + PDFs): a
+  nova tentativa depois de uma queda do daemon também não duplica.
+- resumo: o item["resumo"] da fila.py (partes com o id de cada alerta); o
+  daemon monta a mensagem por número só com as partes ainda não entregues.
+- Se o daemon morrer, é reiniciado automaticamente no próximo envio.
+- Se não houver sender_daemon.js/Node, levanta SenderIndisponivel e o
+  monitor cai no modo antigo (um processo node por envio).
+
+O sender_daemon.js pode ficar na pasta do sender_baileys.js ou ao lado deste
+arquivo; as dependências (node_modules) são lidas da pasta do sender.
+"""
+
+import os
+import json
+import time
+import shlex
+import hashlib
+import socket
+import threading
+import subprocess
+from typing import List, Optional, Union
+
+import metricas
+
+HOST = "127.0.0.1"
+PORTA = int(os.environ.get("SENDER_PORTA", "8765"))
+NOME_DAEMON = "sender_daemon.js"
+ESPERA_ABERTURA = 90      # s até a sessão do WhatsApp abrir (QR na 1ª vez)
+TIMEOUT_PING = 3
+TIMEOUT_ENVIO = 180
+
+_proc: Optional[subprocess.Popen] = None
+_lock = threading.Lock()
+
+
+class SenderIndisponivel(RuntimeError):
+    """Não há como subir o daemon (sem Node ou sem sender_daemon.js)."""
+
+
+class EnvioFalhou(RuntimeError):
+    """O sender não confirmou a entrega (a caixa de saída tenta de novo)."""
+
+
+def pdfs_validos(caminho_pdf: Union[str, List[str], None]) -> List[str]:
+    """Um caminho, uma lista ou None -> só os PDFs que existem e não estão vazios."""
+    caminhos = [caminho_pdf] if isinstance(caminho_pdf, str) else list(caminho_pdf or [])
+    return [c for c in caminhos if c and os.path.isfile(c) and os.path.getsize(c) > 0]
+
+
+def _requisitar(pedido: dict, timeout: float) -> dict:
+    with socket.create_connection((HOST, PORTA), timeout=timeout) as s:
+        s.sendall((json.dumps(pedido, ensure_ascii=False) + "\n").encode("utf-8"))
+        with s.makefile("r", encoding="utf-8") as f:
+            linha = f.readline()
+    if not linha:
+        raise ConnectionError("daemon fechou a conexão sem responder")
+    return json.loads(linha)
+
+
+def estado() -> Optional[str]:
+    """Estado da sessão no daemon ('open', 'connecting', ...) ou None se não responde."""
+    try:
+        return _requisitar({"op": "ping"}, TIMEOUT_PING).get("estado")
+    except (OSError, ValueError):
+        return None
+
+
+def saudavel() -> bool:
+    return estado() == "open"
+
+
+def localizar_daemon(sender_cwd: str) -> str:
+    for caminho in (os.path.join(sender_cwd, NOME_DAEMON),
+                    os.path.join(os.path.dirname(os.path.abspath(__file__)), NOME_DAEMON)):
+        if os.path.isfile(caminho):
+            return caminho
+    raise SenderIndisponivel(f"{NOME_DAEMON} não encontrado (nem em {sender_cwd})")
+
+
+def iniciar_daemon(sender_cwd: str):
+    global _proc
+    daemon_js = localizar_daemon(sender_cwd)
+    env = dict(os.environ)
+    env["SENDER_PORTA"] = str(PORTA)
+    env["NODE_PATH"] = os.path.join(sender_cwd, "node_modules")
+    print("▶️ Iniciando sender_daemon:", daemon_js)
+    print("📂 CWD:", sender_cwd)
+    try:
+        # logs do Node (QR, Estado: open, ...) continuam no terminal
+        _proc = subprocess.Popen(["node", daemon_js], cwd=sender_cwd, env=env)
+    except FileNotFoundError:
+        raise SenderIndisponivel("Node.js não encontrado. Instale com: pkg install -y nodejs-lts")
+
+
+def garantir_daemon(sender_cwd: str):
+    """Health check; sobe (ou ressobe) o daemon e espera a sessão abrir."""
+    if saudavel():
+        return
+    if estado() is None and (_proc is None or _proc.poll() is not None):
+        if _proc is not None:
+            print(f"⚠️ sender_daemon saiu com código {_proc.returncode} — reiniciando")
+        iniciar_daemon(sender_cwd)
+    limite = time.monotonic() + ESPERA_ABERTURA
+    while time.monotonic() < limite:
+        if saudavel():
+            return
+        if _proc is not None and _proc.poll() is not None:
+            raise SenderIndisponivel(f"sender_daemon saiu com código {_proc.returncode}")
+        time.sleep(1)
+    raise SenderIndisponivel("sessão do WhatsApp não abriu a tempo")
+
+
+def id_conteudo(numeros: List[str], texto: str, pdfs: List[str]) -> str:
+    """Id de envio derivado do conteúdo (mesmos números, texto e PDFs -> mesmo id)."""
+    h = hashlib.sha1(json.dumps([sorted(numeros), texto], ensure_ascii=False).encode("utf-8"))
+    for caminho in pdfs:
+        try:
+            with open(caminho, "rb") as f:
+                for pedaco in iter(lambda: f.read(65536), b""):
+                    h.update(pedaco)
+        except OSError:
+            h.update(caminho.encode("utf-8"))
+    return "conteudo:" + h.hexdigest()[:20]
+
+
+def enviar(numeros: List[str], texto: str, caminho_pdf: Union[str, List[str], None] = None,
+           sender_cwd: Optional[str] = None, id_envio: Optional[str] = None,
+           resumo: Optional[dict] = None) -> bool:
+    """Envia pelo daemon (um PDF ou vários, ou um resumo). True se o daemon confirmou o envio."""
+    pedido = {"op": "enviar", "numeros": list(numeros), "texto": texto}
+    pdfs = [caminho_pdf] if isinstance(caminho_pdf, str) else list(caminho_pdf or [])
+    if len(pdfs) == 1:
+        pedido["pdf"] = os.path.abspath(pdfs[0])
+    elif pdfs:
+        pedido["pdfs"] = [os.path.abspath(c) for c in pdfs]
+    # sempre com id, antes da 1ª tentativa: o reenvio abaixo não duplica o que já saiu
+    pedido["id"] = id_envio or id_conteudo(pedido["numeros"], texto, pdfs)
+    if resumo:
+        partes = [dict(p, pdf=next((os.path.abspath(c) for c in pdfs_validos(p.get("pdf"))), None))
+                  for p in resumo["partes"]]
+        pedido["resumo"] = dict(resumo, partes=partes)
+    with _lock:
+        garantir_daemon(sender_cwd or os.getcwd())
+        print("▶️ Enviando (daemon):", texto[:80].replace("\n", " "))
+        try:
+            resp = _requisitar(pedido, TIMEOUT_ENVIO)
+        except (OSError, ValueError):
+            # daemon caiu (nova tentativa com respawn) ou demorou mais que TIMEOUT_ENVIO:
+            # o daemon pula o que já entregou e espera o envio do mesmo id ainda em curso
+            garantir_daemon(sender_cwd or os.getcwd())
+            resp = _requisitar(pedido, TIMEOUT_ENVIO)
+    if not resp.get("ok"):
+        print("⚠️ sender_daemon recusou o envio:", resp.get("erro"))
+        return False
+    return True
+
+
+def processo_unico(sender_js: str, numeros: List[str], texto: str,
+                   caminho_pdf: Union[str, List[str], None] = None):
+    """
+    Modo antigo: `node sender_baileys.js numeros texto [pdf]`. Com vários
+    PDFs, uma execução por PDF (o texto vai na primeira; nas outras, o nome
+    do arquivo). Levanta EnvioFalhou se alguma execução falhar.
+    """
+    sender_cwd = os.path.dirname(sender_js)
+    pdfs = [caminho_pdf] if isinstance(caminho_pdf, str) else list(caminho_pdf or [])
+    execucoes = [(texto, pdfs[0] if pdfs else None)] + [(os.path.basename(p), p) for p in pdfs[1:]]
+    for msg, pdf in execucoes:
+        args = ["node", sender_js, ",".join(numeros), msg]
+        if pdf:
+            args.append(pdf)
+        print("▶️ Executando sender:", " ".join(shlex.quote(a) for a in args))
+        proc = subprocess.Popen(args, cwd=sender_cwd)
+        proc.wait()
+        if proc.returncode != 0:
+            raise EnvioFalhou(f"sender saiu com código {proc.returncode}")
+
+
+def enviar_com_candidatos(numeros: List[str], texto: str, caminho_pdf: Union[str, List[str], None],
+                          candidatos: List[str], id_envio: Optional[str] = None,
+                          resumo: Optional[dict] = None):
+    """
+    Localiza o sender_baileys.js entre os candidatos e envia pelo daemon;
+    sem daemon, cai no modo antigo (um `node sender_baileys.js` por envio).
+    Levanta EnvioFalhou se nenhum dos dois confirmar.
+    """
+    sender_js = next((c for c in candidatos if os.path.isfile(c)), None)
+    if not sender_js:
+        raise FileNotFoundError("sender_baileys.js não encontrado nos caminhos:\n- " + "\n- ".join(candidatos))
+    sender_cwd = os.path.dirname(sender_js)
+    try:
+        if not enviar(numeros, texto, caminho_pdf, sender_cwd, id_envio, resumo):
+            metricas.contar("sender", modo="daemon", resultado="recusado")
+            raise EnvioFalhou("sender_daemon recusou o envio")
+        metricas.contar("sender", modo="daemon", resultado="ok")
+        return
+    except SenderIndisponivel as e:
+        print("ℹ️ sender_daemon indisponível — usando processo único:", e)
+    try:
+        processo_unico(sender_js, numeros, texto, caminho_pdf)
+    except EnvioFalhou:
+        metricas.contar("sender", modo="processo_unico", resultado="falhou")
+        raise
+    metricas.contar("sender", modo="processo_unico", resultado="ok")
+
+
+def parar_daemon():
+    global _proc
+    if _proc is not None and _proc.poll() is None:
+        _proc.terminate()
+        try:
+            _proc.wait(10)
+        except subprocess.TimeoutExpired:
+            _proc.kill()
+    _proc = None
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Sincronização das planilhas com o OneDrive (rclone), fora do caminho dos alertas.
+
+- baixar_se_mudou(remoto, local): UMA listagem barata (rclone lsjson, com
+  tamanho, data e hash) e download só dos arquivos cuja assinatura mudou
+  desde a última vez — em vez de um `rclone copy` da pasta a cada ciclo.
+- pedir_upload(arquivo, remoto, preparar): não envia na hora; marca o
+  arquivo e uma thread em segundo plano envia depois de ESPERA_UPLOAD s sem
+  novos pedidos (vários pedidos no mesmo ciclo = um upload). preparar()
+  (ex.: exportar a planilha do registro) roda logo antes do envio.
+- O que nós mesmos enviamos não volta no próximo baixar_se_mudou: a
+  assinatura nova do remoto é adotada sem download.
+- aguardar(): força os uploads pendentes e espera (também na saída do processo).
+
+Assinaturas em "sincronia.sqlite3" na pasta de estado.
+"""
+
+import os
+import json
+import atexit
+import tempfile
+import threading
+import subprocess
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
+
+import estado
+import metricas
+
+ESPERA_UPLOAD = 20        # s sem novos pedidos antes de enviar
+TIMEOUT_RCLONE = 300
+
+_con = None
+_lock = threading.Lock()
+_cond = threading.Condition()
+_pendentes: Dict[Tuple[str, str], Optional[Callable[[], None]]] = {}
+_ultimo_pedido = 0.0
+_forcar = False
+_ocupado = False
+_trabalhador: Optional[threading.Thread] = None
+
+
+def rclone(args: List[str]) -> Tuple[int, str]:
+    """Roda `rclone <args>`; devolve (código, stdout). O log (-v) vai para o terminal."""
+    print("▶️ Executando: rclone", " ".join(args))
+    try:
+        with metricas.tempo("sincronia", "sync"):
+            proc = subprocess.run(["rclone"] + args, stdout=subprocess.PIPE, text=True, timeout=TIMEOUT_RCLONE)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print("⚠️ rclone falhou:", e)
+        metricas.contar("rclone", comando=args[0], codigo=-1)
+        return -1, ""
+    metricas.contar("rclone", comando=args[0], codigo=proc.returncode)
+    if proc.returncode != 0:
+        print(f"⚠️ rclone terminou com código {proc.returncode}.")
+    return proc.returncode, proc.stdout
+
+
+def _db():
+    global _con
+    if _con is None:
+        con = estado.conectar("sincronia.sqlite3")
+        con.execute("""CREATE TABLE IF NOT EXISTS remotos (
+                           caminho TEXT PRIMARY KEY, assinatura TEXT, adotar INTEGER DEFAULT 0)""")
+        con.commit()
+        _con = con
+    return _con
+
+
+def _assinatura(entrada: Dict) -> str:
+    hashes = entrada.get("Hashes") or {}
+    return json.dumps([entrada.get("Size"), entrada.get("ModTime"), sorted(hashes.items())])
+
+
+# =========== Download ===========
+def baixar_se_mudou(remoto: str, local: str, arquivos: Optional[List[str]] = None) -> List[str]:
+    """
+    Baixa de `remoto` (pasta) para `local` só o que mudou no remoto. arquivos
+    limita aos nomes dados. Devolve os nomes baixados.
+    """
+    codigo, saida = rclone(["lsjson", remoto, "--files-only", "--hash"])
+    if codigo != 0:
+        return []
+    try:
+        entradas = json.loads(saida or "[]")
+    except ValueError:
+        print("⚠️ Listagem do rclone ilegível")
+        return []
+    mudaram, assinaturas = [], {}
+    with _lock:
+        for e in entradas:
+            nome = e.get("Path") or e.get("Name")
+            if not nome or (arquivos is not None and nome not in arquivos):
+                continue
+            chave = remoto.rstrip("/") + "/" + nome
+            assinaturas[nome] = (chave, _assinatura(e))
+            linha = _db().execute("SELECT assinatura, adotar FROM remotos WHERE caminho = ?", (chave,)).fetchone()
+            if linha and linha[1]:          # mudança nossa (upload): só adota
+                _db().execute("UPDATE remotos SET assinatura = ?, adotar = 0 WHERE caminho = ?",
+                              (assinaturas[nome][1], chave))
+                continue
+            faltando = not os.path.isfile(os.path.join(local, nome))
+            if faltando or not linha or linha[0] != assinaturas[nome][1]:
+                mudaram.append(nome)
+        _db().commit()
+    if not mudaram:
+        print("☁️ OneDrive sem mudanças.")
+        return []
+    print(f"📥 Baixando do OneDrive: {', '.join(mudaram)}")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(mudaram) + "\n")
+    try:
+        codigo, _ = rclone(["copy", remoto, local, "--files-from", f.name, "--update", "-v"])
+    finally:
+        os.remove(f.name)
+    if codigo != 0:
+        return []
+    with _lock:
+        _db().executemany("INSERT OR REPLACE INTO remotos (caminho, assinatura, adotar) VALUES (?, ?, 0)",
+                          [assinaturas[n] for n in mudaram])
+        _db().commit()
+    return mudaram
+
+
+# =========== Upload em segundo plano ===========
+def pedir_upload(arquivo: str, remoto: str, preparar: Optional[Callable[[], None]] = None):
+    """Agenda o envio de `arquivo` para a pasta `remoto` (junta pedidos seguidos)."""
+    global _ultimo_pedido, _trabalhador
+    with _cond:
+        _pendentes[(arquivo, remoto)] = preparar
+        _ultimo_pedido = monotonic()
+        if _trabalhador is None:
+            _trabalhador = threading.Thread(target=_trabalhar, name="sincronia-upload", daemon=True)
+            _trabalhador.start()
+        _cond.notify_all()
+
+
+def _enviar(arquivo: str, remoto: str, preparar: Optional[Callable[[], None]]):
+    try:
+        if preparar:
+            preparar()
+        print("📤 Enviando para OneDrive:", os.path.basename(arquivo))
+        codigo, _ = rclone(["copy", arquivo, remoto, "--update", "-v"])
+    except Exception as e:
+        print("⚠️ Upload falhou:", e)
+        return
+    if codigo == 0:
+        with _lock:
+            _db().execute("""INSERT INTO remotos (caminho, assinatura, adotar) VALUES (?, NULL, 1)
+                             ON CONFLICT (caminho) DO UPDATE SET adotar = 1""",
+                          (remoto.rstrip("/") + "/" + os.path.basename(arquivo),))
+            _db().commit()
+
+
+def _trabalhar():
+    global _forcar, _ocupado
+    while True:
+        with _cond:
+            while not _pendentes:
+                _cond.wait()
+            while not _forcar and monotonic() - _ultimo_pedido < ESPERA_UPLOAD:
+                _cond.wait(ESPERA_UPLOAD - (monotonic() - _ultimo_pedido))
+            lote = list(_pendentes.items())
+            _pendentes.clear()
+            _forcar = False
+            _ocupado = True
+        try:
+            for (arquivo, remoto), preparar in lote:
+                _enviar(arquivo, remoto, preparar)
+        finally:
+            with _cond:
+                _ocupado = False
+                _cond.notify_all()
+
+
+def aguardar(timeout: Optional[float] = None) -> bool:
+    """Envia já o que estiver pendente e espera terminar. False se o tempo acabou."""
+    global _forcar
+    with _cond:
+        if _pendentes:
+            _forcar = True
+            _cond.notify_all()
+        return _cond.wait_for(lambda: not _pendentes and not _ocupado, timeout)
+
+
+atexit.register(aguardar, 60)
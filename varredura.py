@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura paginada assíncrona (consultas.php?pagina=1,2,3...).
+
+Enquanto a página N é processada, as próximas `antecipar` páginas já estão
+sendo baixadas. As páginas são sempre processadas em ordem; quando o
+processamento pede para parar (data de corte, página sem mudanças, erro),
+um Event compartilhado é marcado e nenhuma busca começa depois disso (ele
+é conferido antes de cada requisição, já dentro da thread). As que já
+estavam na rede não têm como ser interrompidas: terminam, e a varredura só
+retorna depois delas — no máximo min(antecipar, max_concorrencia)
+requisições além da última página útil. Se a página baixada vier
+None (sem mudanças), ou se antecipar_se(pagina, resp) disser que ela já é
+a última (ex.: contém a marca d'água), nada é antecipado.
+
+As requisições rodam em threads (asyncio.to_thread) pelo http_cliente,
+aproveitando o mesmo pool keep-alive, as novas tentativas e o GET
+condicional; a concorrência fica limitada às conexões por host do pool.
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import http_cliente
+
+ANTECIPAR = 3
+MAX_CONCORRENCIA = http_cliente.MAX_CONEXOES_POR_HOST
+
+
+async def _varrer(buscar: Callable[[int], Any], processar: Callable[[int, Any], bool],
+                  antecipar: int, max_concorrencia: int, primeira: int,
+                  antecipar_se: Optional[Callable[[int, Any], bool]]) -> int:
+    sem = asyncio.Semaphore(max(1, max_concorrencia))
+    parar = threading.Event()
+
+    def buscar_se(pagina: int):
+        # a thread pode começar depois da parada: confere de novo antes da requisição
+        return None if parar.is_set() else buscar(pagina)
+
+    async def baixar(pagina: int):
+        async with sem:
+            if parar.is_set():
+                return None
+            return await asyncio.to_thread(buscar_se, pagina)
+
+    tarefas: Dict[int, asyncio.Task] = {}
+    agendadas = primeira - 1
+
+    def agendar(ate: int):
+        nonlocal agendadas
+        for p in range(agendadas + 1, ate + 1):
+            tarefas[p] = asyncio.create_task(baixar(p))
+        agendadas = max(agendadas, ate)
+
+    pagina = primeira
+    try:
+        while True:
+            agendar(pagina)
+            try:
+                resp = await tarefas.pop(pagina)
+            except Exception as e:
+                print(f"Falha ao baixar página {pagina}:", e)
+                return pagina - 1
+            # só antecipa quando há o que processar (página sem mudanças => 1 requisição só)
+            if resp is not None and (antecipar_se is None or antecipar_se(pagina, resp)):
+                agendar(pagina + antecipar)
+            if not processar(pagina, resp):
+                return pagina
+            pagina += 1
+    finally:
+        parar.set()
+        for t in tarefas.values():
+            t.cancel()
+        # as que ainda esperavam vaga saem já; as que estão na rede terminam antes do asyncio.run voltar
+        await asyncio.gather(*tarefas.values(), return_exceptions=True)
+
+
+def varrer_paginas(buscar: Callable[[int], Any], processar: Callable[[int, Any], bool],
+                   antecipar: int = ANTECIPAR, max_concorrencia: int = MAX_CONCORRENCIA,
+                   primeira: int = 1,
+                   antecipar_se: Optional[Callable[[int, Any], bool]] = None) -> int:
+    """
+    buscar(pagina) baixa uma página (bloqueante); processar(pagina, resp)
+    devolve False para encerrar. Retorna a última página processada.
+    antecipar_se(pagina, resp), opcional, devolve False quando não vale a
+    pena baixar as próximas páginas antes de processar esta.
+    """
+    return asyncio.run(_varrer(buscar, processar, antecipar, max_concorrencia, primeira, antecipar_se))